@@ -0,0 +1,170 @@
+"""Замер обходов на локальном mockapi: без сети и без расхода квоты.
+
+Каждый режим поиска запускается до целевого числа каналов на чистой базе, затем
+обновление подписчиков проходит сохранённые каналы дважды (второй раз — с ETag).
+Для каждого прогона выводятся время, HTTP-запросы, единицы квоты, байты ответов
+и принятые каналы на 100 единиц.
+
+Пример: python benchmarks/crawl_bench.py --target 300 --latency 0.02 > bench_output.txt
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ytparse.cache import ResponseCache, SearchPageCache  # noqa: E402
+from ytparse.checkpoint import CheckpointStore  # noqa: E402
+from ytparse.config import MODE_GRAPH, MODE_NAME, MODE_TAGS, MODE_VIDEOS  # noqa: E402
+from ytparse.crawler import Crawler  # noqa: E402
+from ytparse.fetch import API_ENDPOINT_ENV, DEFAULT_WORKERS  # noqa: E402
+from ytparse.mockapi import MockApiServer, RecordedWorld, SyntheticWorld  # noqa: E402
+from ytparse.ratelimit import AdaptiveRateLimiter  # noqa: E402
+from ytparse.refresh import SubscriberRefresher  # noqa: E402
+from ytparse.scheduler import ADAPTIVE, ROUND_ROBIN  # noqa: E402
+from ytparse.store import ChannelStore  # noqa: E402
+from ytparse.usage import UsageAccumulator  # noqa: E402
+
+BENCH_KEY = 'bench-key'
+QUERIES = ['python', 'programming', 'coding tech', 'gaming', 'music', 'cooking', 'travel', 'science']
+SEARCH_RUNS = [
+    (MODE_NAME, ADAPTIVE), (MODE_NAME, ROUND_ROBIN),
+    (MODE_TAGS, ADAPTIVE), (MODE_TAGS, ROUND_ROBIN),
+    (MODE_VIDEOS, ADAPTIVE), (MODE_VIDEOS, ROUND_ROBIN),
+    (MODE_GRAPH, None),
+]
+GRAPH_SEEDS = 20
+COLUMNS = ('run', 'status', 'accepted', 'seconds', 'http_calls', 'units', 'kbytes', 'per_100_units', 'errors')
+
+
+class Workspace:
+    """Временная база, кэш и учёт квоты одного прогона"""
+
+    def __init__(self, root, name):
+        self.dir = os.path.join(root, name)
+        os.makedirs(self.dir)
+        db = os.path.join(self.dir, 'channels.db')
+        cache = os.path.join(self.dir, 'cache.db')
+        self.channel_store = ChannelStore(db)
+        self.checkpoint_store = CheckpointStore(db)
+        self.response_cache = ResponseCache(cache)
+        self.search_cache = SearchPageCache(cache)
+        self.usage_tracker = UsageAccumulator(os.path.join(self.dir, 'usage.json'))
+
+
+def measure(server, name, run):
+    """Выполняет run() и собирает метрики сервера за время прогона"""
+    server.reset_stats()
+    started = time.perf_counter()
+    status, accepted = run()
+    seconds = time.perf_counter() - started
+    stats = server.stats()
+    return {
+        'run': name,
+        'status': status,
+        'accepted': accepted,
+        'seconds': round(seconds, 2),
+        'http_calls': stats['http_calls'],
+        'units': stats['units'],
+        'kbytes': round(stats['bytes'] / 1024, 1),
+        'per_100_units': round(100 * accepted / stats['units'], 2) if stats['units'] else None,
+        'errors': stats['injected_errors'],
+    }
+
+
+def crawl_run(workspace, mode, scheduler, queries, args):
+    params = {
+        'max_results': args.max_results,
+        'min_subscribers': args.min_subscribers,
+        'max_subscribers': 0,
+        'target': args.target,
+    }
+    if scheduler:
+        params['scheduler'] = scheduler
+    if mode == MODE_GRAPH:
+        params['max_depth'] = args.max_depth
+    checkpoint = workspace.checkpoint_store.start(mode, queries, params)
+    crawler = Crawler(
+        BENCH_KEY,
+        workspace.channel_store,
+        workspace.checkpoint_store,
+        workspace.response_cache,
+        workspace.search_cache,
+        workspace.usage_tracker,
+        rate_limiter=AdaptiveRateLimiter(max_rate=args.max_rate),
+        fetch_workers=args.workers,
+        stream_to_store=True,
+    )
+
+    def run():
+        return crawler.run(checkpoint), len(crawler.accepted)
+
+    return run
+
+
+def refresh_run(workspace, args):
+    refresher = SubscriberRefresher(BENCH_KEY, workspace.channel_store, workspace.usage_tracker, max_age=0,
+                                    rate_limiter=AdaptiveRateLimiter(max_rate=args.max_rate), fetch_workers=args.workers)
+
+    def run():
+        return refresher.run(), refresher.refreshed + refresher.not_modified
+
+    return run
+
+
+def print_table(rows, out):
+    widths = {col: max(len(col), *(len(str(row[col])) for row in rows)) for col in COLUMNS}
+    print('  '.join(col.ljust(widths[col]) for col in COLUMNS), file=out)
+    for row in rows:
+        print('  '.join(str(row[col]).ljust(widths[col]) for col in COLUMNS), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер обходов на локальном mockapi")
+    parser.add_argument('--target', type=int, default=200, help="Целевое число каналов в каждом прогоне")
+    parser.add_argument('--max-results', type=int, default=25)
+    parser.add_argument('--min-subscribers', type=int, default=100000)
+    parser.add_argument('--max-depth', type=int, default=3, help="Глубина обхода связанных каналов")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--max-rate', type=float, default=AdaptiveRateLimiter().max_rate,
+                        help="Предел запросов в секунду на клиенте (как в приложении); время прогонов включает его")
+    parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа сервера, с")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Случайная добавка к задержке, с")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Доля ответов 503")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Доля ответов 403 rateLimitExceeded")
+    parser.add_argument('--quota', type=int, default=None, help="Квота ключа на прогон (по умолчанию без лимита)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fixtures', help="Файл записанных ответов вместо синтетических данных")
+    parser.add_argument('--only', action='append', help="Запустить только прогоны, в названии которых есть подстрока")
+    args = parser.parse_args(argv)
+
+    world = RecordedWorld(args.fixtures) if args.fixtures else SyntheticWorld(seed=args.seed)
+    server = MockApiServer(world, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    rows = []
+    with server, tempfile.TemporaryDirectory(prefix='ytparse-bench-') as root:
+        os.environ[API_ENDPOINT_ENV] = server.url
+        for mode, scheduler in SEARCH_RUNS:
+            name = f"{mode} / {scheduler}" if scheduler else mode
+            if args.only and not any(part in name for part in args.only):
+                continue
+            # Расход квоты на сервере обнуляется в measure(), поэтому --quota действует на каждый прогон отдельно
+            server.quota = args.quota
+            workspace = Workspace(root, f"run{len(rows)}")
+            queries = QUERIES
+            if mode == MODE_GRAPH:
+                # Исходные каналы — из выдачи первого запроса
+                queries = [item['snippet']['channelId'] for item in world.search_items(QUERIES[0], 'channel')[:GRAPH_SEEDS]]
+            rows.append(measure(server, name, crawl_run(workspace, mode, scheduler, queries, args)))
+            if mode == MODE_NAME and scheduler == ADAPTIVE:
+                server.quota = None
+                rows.append(measure(server, "Обновление подписчиков", refresh_run(workspace, args)))
+                rows.append(measure(server, "Обновление подписчиков (ETag)", refresh_run(workspace, args)))
+    print_table(rows, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,92 +1,122 @@
 import streamlit as st
-import pandas as pd
 import json
 import os
-from googleapiclient.discovery import build
 import time
-import re
-from datetime import datetime, timedelta
+from ytparse.cache import SEARCH_PAGE_RETENTION, ResponseCache, SearchPageCache
+from ytparse.store import CHANNEL_FIELDS, ChannelStore
+from ytparse.checkpoint import CheckpointStore, found_count
+from ytparse.export import FORMATS, available_formats, csv_text, export_channels
+from ytparse.files import read_json_cached
+from ytparse.config import API_KEYS_FILE, API_USAGE_FILE, CACHE_FILE, DATA_FILE, DB_FILE, MODE_GRAPH, SEARCH_MODES
+from ytparse.crawler import DEFAULT_GRAPH_DEPTH, DONE, EXHAUSTED, FAILED, QUOTA_EXHAUSTED, STOPPED, parse_channel_ids
+from ytparse.jobs import CRAWL, DEFAULT_MAX_PARALLEL, INTERRUPTED, QUEUED, REFRESH, RUNNING, JobRunner, JobStore
+from ytparse.usage import UsageAccumulator, day_entry, day_total, next_reset, quota_day
+from ytparse.keys import KeyPool, key_label
+from ytparse.fetch import DEFAULT_WORKERS
+from ytparse.ratelimit import AdaptiveRateLimiter
+from ytparse.refresh import DEFAULT_MAX_AGE
+from ytparse.querystats import QueryStatsStore, plan_crawl
+from ytparse.scheduler import ADAPTIVE, ROUND_ROBIN
 
 # Настройки приложения
 st.set_page_config(page_title="YouTube Channel Parser", page_icon="📺", layout="wide")
 
-# Файл для хранения данных
-DATA_FILE = "youtube_channels.json"
-API_KEYS_FILE = "api_keys.json"
-API_USAGE_FILE = "api_usage.json"
+AUTO_KEY_OPTION = "🔄 Автовыбор (ключ с наибольшим остатком)"
+JOBS_POLL_INTERVAL = 2  # секунды между обновлениями прогресса задач
+CHANNELS_PAGE_SIZES = [25, 50, 100, 200]
+CHANNEL_SORT_OPTIONS = {
+    "По релевантности поиска": ('rank', False),  # без поискового запроса — по дате добавления
+    "Дата добавления (старые сначала)": ('added_at', False),
+    "Дата добавления (новые сначала)": ('added_at', True),
+    "Подписчики (по убыванию)": ('subscribers', True),
+    "Подписчики (по возрастанию)": ('subscribers', False),
+    "Название (А–Я)": ('title', False),
+}
+QUERY_SCHEDULERS = {"Адаптивный (по отдаче)": ADAPTIVE, "По очереди": ROUND_ROBIN}
+VIEWED_FILTERS = {"Все": None, "Непросмотренные": False, "Просмотренные": True}
+JOB_STATUS_LABELS = {
+    QUEUED: "⏳ В очереди",
+    RUNNING: "🔄 Выполняется",
+    DONE: "✅ Цель достигнута",
+    EXHAUSTED: "🏁 Все запросы пройдены",
+    STOPPED: "⏹️ Остановлена",
+    QUOTA_EXHAUSTED: "❌ Квота исчерпана",
+    FAILED: "❌ Ошибка",
+    INTERRUPTED: "⚠️ Прервана",
+}
 
 # Глобальная переменная для логирования API запросов
 if 'api_logs' not in st.session_state:
     st.session_state.api_logs = []
-if 'current_api_key' not in st.session_state:
-    st.session_state.current_api_key = ""
-
-# Функция для загрузки данных из JSON
-def load_channels():
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            st.error(f"Ошибка декодирования JSON: {e}. Проверьте файл {DATA_FILE}.")
-            return []
-    return []
-
-# Функция для сохранения данных в JSON
-def save_channels(channels):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(channels, f, ensure_ascii=False, indent=2)
-
-# Функция для загрузки API-ключей
+# Кэш ответов channels.list / videos.list (общий файл, счётчики — на сессию)
+if 'response_cache' not in st.session_state:
+    st.session_state.response_cache = ResponseCache(CACHE_FILE)
+if 'search_cache' not in st.session_state:
+    st.session_state.search_cache = SearchPageCache(CACHE_FILE)
+
+# Хранилище каналов (SQLite) с однократным импортом из старого JSON
+if 'channel_store' not in st.session_state:
+    st.session_state.channel_store = ChannelStore(DB_FILE)
+    try:
+        imported_count = st.session_state.channel_store.import_json_once(DATA_FILE)
+        if imported_count:
+            st.toast(f"📦 Импортировано {imported_count} каналов из {DATA_FILE}")
+    except json.JSONDecodeError as e:
+        st.error(f"Ошибка декодирования JSON: {e}. Проверьте файл {DATA_FILE}.")
+channel_store = st.session_state.channel_store
+if 'checkpoint_store' not in st.session_state:
+    st.session_state.checkpoint_store = CheckpointStore(DB_FILE)
+checkpoint_store = st.session_state.checkpoint_store
+# Отдача поисковых запросов по всем запускам (для планирования квоты)
+if 'query_stats' not in st.session_state:
+    st.session_state.query_stats = QueryStatsStore(DB_FILE)
+query_stats = st.session_state.query_stats
+
+# Функция для загрузки API-ключей (файл перечитывается, только если изменился)
 def load_api_keys():
-    if os.path.exists(API_KEYS_FILE):
-        try:
-            with open(API_KEYS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
-    return []
+    return read_json_cached(API_KEYS_FILE, [])
 
 # Функция для сохранения API-ключей
 def save_api_keys(keys):
     with open(API_KEYS_FILE, 'w', encoding='utf-8') as f:
         json.dump(keys, f, ensure_ascii=False, indent=2)
 
-# Функция для загрузки использования API
+# Учёт расхода квоты копится в памяти и сбрасывается в API_USAGE_FILE пачками
+if 'usage_tracker' not in st.session_state:
+    st.session_state.usage_tracker = UsageAccumulator(API_USAGE_FILE)
+usage_tracker = st.session_state.usage_tracker
+
+# Функция для загрузки использования API (вместе с ещё не сброшенными счётчиками)
 def load_api_usage():
-    if os.path.exists(API_USAGE_FILE):
-        try:
-            with open(API_USAGE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-# Функция для сохранения использования API
-def save_api_usage(usage_data):
-    with open(API_USAGE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(usage_data, f, ensure_ascii=False, indent=2)
-
-# Функция для логирования API запросов
-def log_api_request(request_type, query, cost=1):
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    log_entry = f"[{timestamp}] {request_type}: '{query}' (стоимость: {cost})"
-    st.session_state.api_logs.append(log_entry)
-    if len(st.session_state.api_logs) > 50:  # Ограничиваем размер лога
-        st.session_state.api_logs.pop(0)
-    
-    # Обновляем статистику использования
-    usage_data = load_api_usage()
-    today = datetime.now().strftime("%Y-%m-%d")
-    key = st.session_state.current_api_key[:10] + "..." if st.session_state.current_api_key else "unknown"
-    
-    if key not in usage_data:
-        usage_data[key] = {}
-    if today not in usage_data[key]:
-        usage_data[key][today] = 0
-    
-    usage_data[key][today] += cost
-    save_api_usage(usage_data)
+    return usage_tracker.snapshot()
+
+# Общий ограничитель частоты запросов сессии: замедляется, только когда API этого требует
+if 'rate_limiter' not in st.session_state:
+    st.session_state.rate_limiter = AdaptiveRateLimiter()
+rate_limiter = st.session_state.rate_limiter
+
+# Пул ключей: выбор ключа с наибольшим остатком квоты и переключение при исчерпании
+if 'key_pool' not in st.session_state:
+    st.session_state.key_pool = KeyPool([], usage_tracker)
+key_pool = st.session_state.key_pool
+key_pool.set_keys(load_api_keys())
+
+# Фоновые задачи поиска: каждая выполняется в своём потоке и сразу сохраняет найденные каналы
+if 'job_runner' not in st.session_state:
+    st.session_state.job_runner = JobRunner(
+        JobStore(DB_FILE), channel_store, checkpoint_store, st.session_state.response_cache,
+        st.session_state.search_cache, usage_tracker, key_pool, rate_limiter, query_stats=query_stats
+    )
+job_runner = st.session_state.job_runner
+
+# Выборки сохранённых каналов кэшируются до следующего изменения базы (modified_at входит в ключ)
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_channels_page(_store, modified_at, filters, order_by, descending, page_size, page):
+    return _store.query(**filters, order_by=order_by, descending=descending, limit=page_size, offset=(page - 1) * page_size)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def count_channels(_store, modified_at, filters):
+    return _store.count(**filters)
 
 # Заголовок
 st.title("📺 YouTube Channel Parser")
@@ -96,21 +126,13 @@ st.markdown("Введите настройки для поиска канало
 tab1, tab2, tab3 = st.tabs(["🔍 Поиск каналов", "📋 Сохранённые каналы", "🔑 API-ключи"])
 
 with tab1:
-    # Состояние для остановки поиска
-    if 'stop_search' not in st.session_state:
-        st.session_state.stop_search = False
-    if 'channels_data' not in st.session_state:
-        st.session_state.channels_data = []
-    if 'search_started' not in st.session_state:
-        st.session_state.search_started = False
-
     # Форма для ввода параметров
     st.sidebar.header("Настройки поиска")
     
     # Режим поиска
     search_mode = st.sidebar.selectbox(
         "🔍 Режим поиска:",
-        ["По названию канала", "По тегам канала", "По видео"],
+        SEARCH_MODES,
         key="search_mode",
         help="Выберите способ поиска каналов"
     )
@@ -133,6 +155,23 @@ with tab1:
         )
         search_queries = [q.strip() for q in search_input.split('|') if q.strip()]
     
+    elif search_mode == MODE_GRAPH:
+        search_input = st.sidebar.text_area(
+            "Исходные каналы (ID или ссылки, пусто — крупнейшие сохранённые):",
+            value="",
+            key="search_input_graph",
+            help="Пример: https://www.youtube.com/channel/UC... — от них обход идёт по связанным каналам (1 ед. квоты на канал вместо 100 за страницу поиска)"
+        )
+        search_queries = parse_channel_ids(search_input.replace('|', '\n').split())
+        graph_max_depth = st.sidebar.number_input(
+            "Глубина обхода:",
+            min_value=1,
+            max_value=5,
+            value=DEFAULT_GRAPH_DEPTH,
+            key="graph_max_depth",
+            help="1 — только каналы, связанные с исходными; 2 — ещё и связанные с ними, и т. д."
+        )
+
     else:  # По видео
         search_input = st.sidebar.text_area(
             "Темы видео для поиска (одно на строку или через |):",
@@ -176,11 +215,85 @@ with tab1:
         help="Поиск продолжится, пока не найдётся столько каналов"
     )
 
+    query_scheduler = st.sidebar.selectbox(
+        "Порядок запросов:",
+        list(QUERY_SCHEDULERS),
+        key="query_scheduler",
+        help="Адаптивный чередует запросы и отдаёт страницы тем, что чаще приносят новые каналы; "
+             "запросы, выдающие в основном уже известные каналы, исключаются"
+    )
+
+    fetch_workers = st.sidebar.number_input(
+        "Параллельных запросов к API:",
+        min_value=1,
+        max_value=16,
+        value=DEFAULT_WORKERS,
+        key="fetch_workers",
+        help="Сколько запросов channels.list / videos.list выполнять одновременно (1 — последовательно)"
+    )
+
+    # Настройки кэша ответов API
+    with st.sidebar.expander("🗄️ Кэш ответов API"):
+        cache_stats_ttl_hours = st.number_input(
+            "Срок жизни подписчиков (часы):",
+            min_value=0,
+            value=6,
+            key="cache_stats_ttl",
+            help="Через сколько часов заново запрашивать статистику канала"
+        )
+        cache_snippet_ttl_days = st.number_input(
+            "Срок жизни названий, описаний и тегов (дни):",
+            min_value=0,
+            value=30,
+            key="cache_snippet_ttl",
+            help="Эти данные меняются редко, их можно хранить дольше"
+        )
+        cache_max_entries = st.number_input(
+            "Макс. записей в кэше:",
+            min_value=1000,
+            value=100000,
+            step=1000,
+            key="cache_max_entries",
+            help="При превышении удаляются записи, к которым дольше всего не обращались"
+        )
+        search_cache_hours = st.number_input(
+            "Срок жизни страниц поиска (часы, 0 = без кэша):",
+            min_value=0,
+            max_value=SEARCH_PAGE_RETENTION // 3600,
+            value=24,
+            key="search_cache_hours",
+            help="Повторный поиск по тем же запросам берёт страницы из кэша и не тратит 100 единиц квоты"
+        )
+    response_cache = st.session_state.response_cache
+    response_cache.ttl.update({
+        'statistics': cache_stats_ttl_hours * 3600,
+        'snippet': cache_snippet_ttl_days * 86400,
+        'brandingSettings': cache_snippet_ttl_days * 86400,
+    })
+    response_cache.max_entries = cache_max_entries
+    search_cache = st.session_state.search_cache
+    search_cache.max_age = search_cache_hours * 3600
+
     # Выбор API-ключа
     api_keys = load_api_keys()
+    auto_rotate_keys = False
     if api_keys:
-        selected_key = st.sidebar.selectbox("Выберите API-ключ:", [k['key'] for k in api_keys], key="select_key")
-        api_key = next((k['key'] for k in api_keys if k['key'] == selected_key), "")
+        selected_key = st.sidebar.selectbox(
+            "Выберите API-ключ:",
+            [AUTO_KEY_OPTION] + [k['key'] for k in api_keys],
+            key="select_key",
+            help="В режиме автовыбора берётся ключ с наибольшим остатком квоты, а при исчерпании поиск переключается на следующий"
+        )
+        if selected_key == AUTO_KEY_OPTION:
+            auto_rotate_keys = True
+            api_key = key_pool.best_key() or ""
+            if api_key:
+                best = next(k for k in key_pool.capacity() if k['key'] == api_key)
+                st.sidebar.caption(f"🔑 {best['name']}: осталось {best['remaining']} ед. (всего по ключам: {key_pool.total_remaining()})")
+            else:
+                st.sidebar.warning(f"⚠️ Квота исчерпана на всех ключах. Обнуление: {next_reset().astimezone():%d.%m %H:%M}")
+        else:
+            api_key = next((k['key'] for k in api_keys if k['key'] == selected_key), "")
     else:
         api_key = st.sidebar.text_input(
             "YouTube API Key:",
@@ -190,377 +303,236 @@ with tab1:
             help="Ваш ключ из Google Cloud Console"
         )
 
+    max_parallel_jobs = st.sidebar.number_input(
+        "Одновременных обходов:",
+        min_value=1,
+        max_value=8,
+        value=DEFAULT_MAX_PARALLEL,
+        key="max_parallel_jobs",
+        help="Сколько задач поиска выполнять параллельно (в режиме автовыбора — по возможности на разных ключах); остальные ждут в очереди"
+    )
+    job_runner.max_parallel = max_parallel_jobs
+
+    # План расхода квоты по прошлой отдаче запросов
+    if search_queries:
+        crawl_plan = plan_crawl(query_stats, search_mode, search_queries, target_channels, max_results_per_query)
+        available_units = key_pool.total_remaining() if auto_rotate_keys else (key_pool.remaining(api_key) if api_key else 0)
+        plan_basis = {'queries': "по истории этих запросов", 'mode': "по истории режима", 'default': "без истории, грубо"}[crawl_plan['basis']]
+        if crawl_plan['units'] is None:
+            st.sidebar.warning("⚠️ Эти запросы раньше не дали ни одного подходящего канала — смените запросы или фильтры")
+        elif crawl_plan['units'] > available_units:
+            st.sidebar.warning(
+                f"⚠️ Для {target_channels} каналов нужно ≈{crawl_plan['units']} ед. квоты ({plan_basis}), "
+                f"доступно {available_units}. Уменьшите цель или добавьте ключи."
+            )
+        else:
+            st.sidebar.caption(
+                f"📐 План: ≈{crawl_plan['units']} ед. квоты, ≈{crawl_plan['pages']} страниц поиска "
+                f"({crawl_plan['per_100_units']} каналов на 100 ед., {plan_basis}); доступно {available_units}"
+            )
+
     # Кнопки запуска и остановки
     col1, col2 = st.sidebar.columns(2)
     with col1:
         start_pressed = st.button("Запустить поиск", key="start_button")
     with col2:
-        stop_pressed = st.button("Стоп", key="stop_button")
-
-    if start_pressed:
-        st.session_state.stop_search = False
-        st.session_state.search_started = True
-        st.session_state.channels_data = []
+        stop_pressed = st.button("Стоп", key="stop_button", help="Остановить все задачи поиска")
+
+    # Незавершённый поиск (квота, закрытая вкладка, ошибка) можно продолжить с последней страницы
+    resume_pressed = False
+    pending_checkpoint = checkpoint_store.latest(exclude=job_runner.active_crawl_ids())
+    if pending_checkpoint and pending_checkpoint['mode'] == MODE_GRAPH:
+        st.sidebar.info(
+            f"⏸️ Незавершённый обход «{pending_checkpoint['mode']}»: раскрыто каналов {len(pending_checkpoint.get('expanded', []))}, "
+            f"в очереди {len(pending_checkpoint.get('frontier') or [])}, "
+            f"найдено {found_count(pending_checkpoint)} из {pending_checkpoint['params']['target']}"
+        )
+    elif pending_checkpoint:
+        pending_queries = pending_checkpoint['queries']
+        pending_query = pending_queries[pending_checkpoint['query_index'] % len(pending_queries)]
+        st.sidebar.info(
+            f"⏸️ Незавершённый поиск «{pending_checkpoint['mode']}»: запрос {pending_checkpoint['query_index'] + 1}/{len(pending_queries)} "
+            f"«{pending_query}», страница {pending_checkpoint['page_count'] + 1}, "
+            f"найдено {found_count(pending_checkpoint)} из {pending_checkpoint['params']['target']}"
+        )
+    if pending_checkpoint:
+        resume_pressed = st.sidebar.button("▶️ Продолжить поиск", key="resume_button")
 
     if stop_pressed:
-        st.session_state.stop_search = True
-        # Сохранение уже найденных каналов при остановке
-        if st.session_state.channels_data:
-            existing_channels = load_channels()
-            existing_titles = {ch.get('title', '').lower() for ch in existing_channels}
-            added_count = 0
-            duplicates_count = 0
-            for ch in st.session_state.channels_data:
-                if ch['title'].lower() not in existing_titles:
-                    existing_channels.append(ch)
-                    existing_titles.add(ch['title'].lower())
-                    added_count += 1
-                else:
-                    duplicates_count += 1
-            if added_count > 0:
-                save_channels(existing_channels)
-                st.success(f"✅ Сохранено {added_count} новых каналов при остановке. Дубликатов: {duplicates_count}")
+        # Задачи останавливаются сразу; найденные каналы уже сохранены, позиция — в контрольной точке
+        job_runner.cancel_all()
+        usage_tracker.flush()
+
+    if start_pressed or resume_pressed:
+        job_key = api_key
+        if auto_rotate_keys:
+            # Параллельные обходы по возможности идут на разных ключах
+            job_key = key_pool.best_key(exclude=job_runner.busy_keys()) or key_pool.best_key()
+        if not job_key:
+            st.sidebar.warning("⚠️ Укажите API-ключ с остатком квоты")
+        elif start_pressed and not search_queries and (search_mode != MODE_GRAPH or not channel_store.count()):
+            st.sidebar.warning("⚠️ Введите хотя бы один запрос" if search_mode != MODE_GRAPH
+                               else "⚠️ Укажите исходные каналы — сохранённых каналов пока нет")
+        else:
+            if start_pressed:
+                crawl_params = {
+                    'max_results': max_results_per_query,
+                    'min_subscribers': min_subscribers,
+                    'max_subscribers': max_subscribers,
+                    'target': target_channels,
+                    'scheduler': QUERY_SCHEDULERS[query_scheduler],
+                }
+                if search_mode == MODE_GRAPH:
+                    crawl_params['max_depth'] = graph_max_depth
+                job_checkpoint = checkpoint_store.start(search_mode, search_queries, crawl_params,
+                                                        keep_active=job_runner.active_crawl_ids())
             else:
-                st.warning(f"⚠️ Все каналы — дубликаты ({duplicates_count}). Ничего не добавлено.")
-            st.session_state.channels_data = []  # Очистка после сохранения
-
-    if api_key and search_queries and st.session_state.search_started:
-        # Устанавливаем текущий API ключ для логирования
-        st.session_state.current_api_key = api_key
-        
-        with st.spinner("Поиск каналов... Это может занять время (учтите квоту API)"):
-            try:
-                youtube = build('youtube', 'v3', developerKey=api_key)
-                existing_channels = load_channels()
-                existing_channel_ids = {ch.get('channel_id', '') for ch in existing_channels if ch.get('channel_id')}
-                existing_titles = {ch.get('title', '').lower() for ch in existing_channels}
-
-                def get_channel_details(channel_id):
-                    log_api_request("Получение данных канала", f"Channel ID: {channel_id}", 1)
-                    request = youtube.channels().list(part='snippet,statistics,brandingSettings', id=channel_id)
-                    response = request.execute()
-                    if response['items']:
-                        item = response['items'][0]
-                        title = item['snippet']['title']
-                        description = item['snippet']['description']
-                        subscribers = int(item['statistics'].get('subscriberCount', 0))
-                        
-                        # Получаем теги канала
-                        channel_tags = []
-                        if 'brandingSettings' in item and 'channel' in item['brandingSettings']:
-                            keywords = item['brandingSettings']['channel'].get('keywords', '')
-                            if keywords:
-                                channel_tags = [tag.strip() for tag in keywords.split(',')]
-                        
-                        contacts = extract_contacts(description)
-                        return {
-                            'title': title,
-                            'channel_id': channel_id,  # Добавляем ID канала для точной проверки дубликатов
-                            'channel_url': f"https://www.youtube.com/channel/{channel_id}",
-                            'subscribers': subscribers,
-                            'description': description,
-                            'contacts': contacts.get('contacts', 'Не найдено'),
-                            'viewed': False,
-                            'tags': ', '.join(channel_tags) if channel_tags else 'Нет тегов'
-                        }
-                    return None
-
-                def extract_contacts(description):
-                    contacts = {'contacts': 'Не найдено'}
-                    if description:
-                        email = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', description)
-                        links = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', description)
-                        telegram = re.findall(r'@[\w]+', description)
-                        
-                        contacts_list = []
-                        if email:
-                            contacts_list.append(f"Email: {email.group()}")
-                        if links:
-                            contacts_list.extend([f"Ссылка: {link}" for link in links])
-                        if telegram:
-                            contacts_list.extend([f"Telegram: {t}" for t in telegram])
-                        
-                        if contacts_list:
-                            contacts = {'contacts': '; '.join(contacts_list)}
-                    return contacts
-
-                def search_channels_by_name(queries, max_results, target):
-                    current_query_index = 0
-                    processed_channels = set()
-                    
-                    while len(st.session_state.channels_data) < target and not st.session_state.stop_search:
-                        query = queries[current_query_index].strip()
-                        if not query:
-                            current_query_index = (current_query_index + 1) % len(queries)
-                            continue
-                        st.write(f"🔍 Поиск каналов по названию: '{query}' (найдено: {len(st.session_state.channels_data)})")
-                        
-                        next_page_token = None
-                        page_count = 0
-                        while next_page_token is not None or page_count == 0:
-                            if len(st.session_state.channels_data) >= target or st.session_state.stop_search:
-                                break
-                            
-                            log_api_request("Поиск каналов", query, 100)
-                            request = youtube.search().list(
-                                part='snippet',
-                                q=query,
-                                type='channel',
-                                maxResults=max_results,
-                                pageToken=next_page_token
-                            )
-                            try:
-                                response = request.execute()
-                                for item in response['items']:
-                                    if len(st.session_state.channels_data) >= target or st.session_state.stop_search:
-                                        break
-                                    channel_id = item['snippet']['channelId']
-                                    if channel_id not in processed_channels and channel_id not in existing_channel_ids:
-                                        channel_details = get_channel_details(channel_id)
-                                        if channel_details and channel_details['subscribers'] >= min_subscribers:
-                                            if max_subscribers > 0 and channel_details['subscribers'] > max_subscribers:
-                                                continue
-                                            st.session_state.channels_data.append(channel_details)
-                                            processed_channels.add(channel_id)
-                                            st.write(f"✅ {channel_details['title']} ({channel_details['subscribers']} подписчиков)")
-                                
-                                next_page_token = response.get('nextPageToken')
-                                page_count += 1
-                                time.sleep(1)
-                            except Exception as e:
-                                if 'quotaExceeded' in str(e):
-                                    st.error("❌ Квота API исчерпана! Подождите 24 часа или увеличьте квоту.")
-                                    return
-                                else:
-                                    st.error(f"Ошибка API: {e}")
-                                    return
-                        
-                        current_query_index = (current_query_index + 1) % len(queries)
-                        if current_query_index == 0:
-                            st.warning("Обход всех запросов завершён. Больше каналов не найдено.")
-                            break
-
-                def search_channels_by_tags(queries, max_results, target):
-                    current_query_index = 0
-                    processed_channels = set()
-                    
-                    while len(st.session_state.channels_data) < target and not st.session_state.stop_search:
-                        query = queries[current_query_index].strip()
-                        if not query:
-                            current_query_index = (current_query_index + 1) % len(queries)
-                            continue
-                        st.write(f"🔍 Поиск каналов по тегам: '{query}' (найдено: {len(st.session_state.channels_data)})")
-                        
-                        next_page_token = None
-                        page_count = 0
-                        while next_page_token is not None or page_count == 0:
-                            if len(st.session_state.channels_data) >= target or st.session_state.stop_search:
-                                break
-                            
-                            log_api_request("Поиск по тегам", query, 100)
-                            request = youtube.search().list(
-                                part='snippet',
-                                q=query,
-                                type='channel',
-                                maxResults=max_results,
-                                pageToken=next_page_token
-                            )
-                            try:
-                                response = request.execute()
-                                for item in response['items']:
-                                    if len(st.session_state.channels_data) >= target or st.session_state.stop_search:
-                                        break
-                                    channel_id = item['snippet']['channelId']
-                                    if channel_id not in processed_channels and channel_id not in existing_channel_ids:
-                                        channel_details = get_channel_details_with_tags(channel_id, query)
-                                        if channel_details and channel_details['subscribers'] >= min_subscribers:
-                                            if max_subscribers > 0 and channel_details['subscribers'] > max_subscribers:
-                                                continue
-                                            st.session_state.channels_data.append(channel_details)
-                                            processed_channels.add(channel_id)
-                                            st.write(f"✅ {channel_details['title']} ({channel_details['subscribers']} подписчиков)")
-                                
-                                next_page_token = response.get('nextPageToken')
-                                page_count += 1
-                                time.sleep(1)
-                            except Exception as e:
-                                if 'quotaExceeded' in str(e):
-                                    st.error("❌ Квота API исчерпана! Подождите 24 часа или увеличьте квоту.")
-                                    return
-                                else:
-                                    st.error(f"Ошибка API: {e}")
-                                    return
-                        
-                        current_query_index = (current_query_index + 1) % len(queries)
-                        if current_query_index == 0:
-                            st.warning("Обход всех тегов завершён. Больше каналов не найдено.")
-                            break
-
-                def search_channels_by_videos(queries, max_results, target):
-                    current_query_index = 0
-                    processed_channels = set()
-                    
-                    while len(st.session_state.channels_data) < target and not st.session_state.stop_search:
-                        query = queries[current_query_index].strip()
-                        if not query:
-                            current_query_index = (current_query_index + 1) % len(queries)
-                            continue
-                        st.write(f"🔍 Поиск каналов через видео: '{query}' (найдено: {len(st.session_state.channels_data)})")
-                        
-                        next_page_token = None
-                        page_count = 0
-                        while next_page_token is not None or page_count == 0:
-                            if len(st.session_state.channels_data) >= target or st.session_state.stop_search:
-                                break
-                            
-                            log_api_request("Поиск видео", query, 100)
-                            request = youtube.search().list(
-                                part='snippet',
-                                q=query,
-                                type='video',
-                                maxResults=max_results,
-                                pageToken=next_page_token,
-                                order='relevance'
-                            )
-                            try:
-                                response = request.execute()
-                                for item in response['items']:
-                                    if len(st.session_state.channels_data) >= target or st.session_state.stop_search:
-                                        break
-                                    channel_id = item['snippet']['channelId']
-                                    if channel_id not in processed_channels and channel_id not in existing_channel_ids:
-                                        # Получаем теги видео
-                                        video_tags = get_video_tags(item['id']['videoId'])
-                                        channel_details = get_channel_details(channel_id)
-                                        if channel_details and channel_details['subscribers'] >= min_subscribers:
-                                            if max_subscribers > 0 and channel_details['subscribers'] > max_subscribers:
-                                                continue
-                                            # Добавляем информацию о видео и его тегах
-                                            channel_details['found_via_video'] = item['snippet']['title'][:80] + "..."
-                                            channel_details['video_tags'] = video_tags
-                                            
-                                            st.session_state.channels_data.append(channel_details)
-                                            processed_channels.add(channel_id)
-                                            st.write(f"✅ {channel_details['title']} ({channel_details['subscribers']} подписчиков) - через видео: {item['snippet']['title'][:50]}...")
-                                
-                                next_page_token = response.get('nextPageToken')
-                                page_count += 1
-                                time.sleep(1)
-                            except Exception as e:
-                                if 'quotaExceeded' in str(e):
-                                    st.error("❌ Квота API исчерпана! Подождите 24 часа или увеличьте квоту.")
-                                    return
-                                else:
-                                    st.error(f"Ошибка API: {e}")
-                                    return
-                        
-                        current_query_index = (current_query_index + 1) % len(queries)
-                        if current_query_index == 0:
-                            st.warning("Обход всех тем видео завершён. Больше каналов не найдено.")
-                            break
-
-                def get_video_tags(video_id):
-                    """Получает теги видео"""
-                    try:
-                        log_api_request("Получение тегов видео", f"Video ID: {video_id}", 1)
-                        request = youtube.videos().list(part='snippet', id=video_id)
-                        response = request.execute()
-                        if response['items']:
-                            tags = response['items'][0]['snippet'].get('tags', [])
-                            return ', '.join(tags[:10]) if tags else 'Нет тегов'  # Первые 10 тегов
-                        return 'Нет тегов'
-                    except Exception as e:
-                        return 'Ошибка получения тегов'
-
-                def get_channel_details_with_tags(channel_id, search_tag):
-                    """Получает детали канала и проверяет соответствие тегам"""
-                    log_api_request("Получение данных канала с тегами", f"Channel ID: {channel_id}", 1)
-                    request = youtube.channels().list(part='snippet,statistics,brandingSettings', id=channel_id)
-                    response = request.execute()
-                    if response['items']:
-                        item = response['items'][0]
-                        title = item['snippet']['title']
-                        description = item['snippet']['description']
-                        subscribers = int(item['statistics'].get('subscriberCount', 0))
-                        
-                        # Получаем теги канала (keywords)
-                        channel_tags = []
-                        if 'brandingSettings' in item and 'channel' in item['brandingSettings']:
-                            keywords = item['brandingSettings']['channel'].get('keywords', '')
-                            if keywords:
-                                channel_tags = [tag.strip() for tag in keywords.split(',')]
-                        
-                        # Проверяем, содержит ли канал искомый тег
-                        search_tag_lower = search_tag.lower()
-                        tag_match = any(search_tag_lower in tag.lower() for tag in channel_tags) or search_tag_lower in description.lower()
-                        
-                        if tag_match:
-                            contacts = extract_contacts(description)
-                            return {
-                                'title': title,
-                                'channel_id': channel_id,
-                                'channel_url': f"https://www.youtube.com/channel/{channel_id}",
-                                'subscribers': subscribers,
-                                'description': description,
-                                'contacts': contacts.get('contacts', 'Не найдено'),
-                                'viewed': False,
-                                'tags': ', '.join(channel_tags) if channel_tags else 'Нет тегов'
-                            }
-                    
-                    return None
-
-                # Запуск поиска в зависимости от выбранного режима
-                if search_mode == "По названию канала":
-                    search_channels_by_name(search_queries, max_results_per_query, target_channels)
-                elif search_mode == "По тегам канала":
-                    search_channels_by_tags(search_queries, max_results_per_query, target_channels)
-                else:  # По видео
-                    search_channels_by_videos(search_queries, max_results_per_query, target_channels)
-
-                # Сохранение при завершении поиска
-                if st.session_state.channels_data:
-                    # Исправленная проверка дубликатов - используем channel_id для точного сравнения
-                    existing_channels = load_channels()
-                    existing_channel_ids = {ch.get('channel_id', '') for ch in existing_channels if ch.get('channel_id')}
-                    
-                    added_count = 0
-                    duplicates_count = 0
-                    for ch in st.session_state.channels_data:
-                        channel_id = ch.get('channel_id', '')
-                        if channel_id and channel_id not in existing_channel_ids:
-                            existing_channels.append(ch)
-                            existing_channel_ids.add(channel_id)
-                            added_count += 1
-                        else:
-                            duplicates_count += 1
-
-                    if added_count > 0:
-                        save_channels(existing_channels)
-                        st.success(f"✅ Сохранено {added_count} новых каналов. Дубликатов: {duplicates_count}")
-                    else:
-                        st.warning(f"⚠️ Все каналы — дубликаты ({duplicates_count}). Ничего не добавлено.")
-                    
-                    # Отображение новых результатов
-                    df_new = pd.DataFrame(st.session_state.channels_data)
-                    st.subheader("Новые найденные каналы:")
-                    st.dataframe(df_new, use_container_width=True)
-                    
-                    # Скачивание CSV новых
-                    csv_new = df_new.to_csv(index=False, encoding='utf-8')
+                # При продолжении режим, запросы и фильтры берутся из контрольной точки
+                job_checkpoint = pending_checkpoint
+            job_runner.submit(job_checkpoint, job_key, auto_rotate_keys=auto_rotate_keys, fetch_workers=fetch_workers)
+
+    def render_jobs():
+        """Прогресс задач поиска; пока есть активные задачи, перерисовывается по таймеру"""
+        active_count = len(job_runner.active_jobs())
+        # Задача завершилась — перезапускаем всю страницу, чтобы обновить базу и статистику
+        if active_count < st.session_state.get('active_jobs_count', 0):
+            st.session_state.active_jobs_count = active_count
+            st.rerun()
+        st.session_state.active_jobs_count = active_count
+
+        for job in job_runner.jobs.values():
+            st.session_state.api_logs.extend(job.drain_api_log())
+        del st.session_state.api_logs[:-50]  # Ограничиваем размер лога
+
+        if not job_runner.jobs:
+            return
+        st.subheader("Задачи")
+        for job in list(job_runner.jobs.values()):
+            with st.container():
+                st.markdown(
+                    f"**{job.title}** — {JOB_STATUS_LABELS.get(job.status, job.status)} "
+                    f"(ключ {key_label(job.api_key)})"
+                )
+                if job.kind == REFRESH:
+                    progress_text = f"Проверено {job.found} из {job.target}, обновлено: {job.saved}"
+                else:
+                    progress_text = f"Найдено {job.found} из {job.target}, сохранено новых: {job.saved}"
+                st.progress(min(1.0, job.found / job.target) if job.target else 0.0, text=progress_text)
+                if job.status in (QUOTA_EXHAUSTED, FAILED) and job.message:
+                    st.error(job.message)
+                elif job.events:
+                    st.caption(job.events[-1][1])
+                with st.expander("📜 Журнал задачи", expanded=False):
+                    st.text('\n'.join(message for _, message in list(job.events)[-30:]))
+
+                if job.active:
+                    if st.button("⏹️ Остановить", key=f"cancel_{job.job_id}", disabled=job.cancel_event.is_set()):
+                        job.cancel()
+                    continue
+
+                if job.accepted:
+                    # Отображение новых результатов (список записей, без pandas)
+                    st.dataframe(job.accepted, use_container_width=True)
+
+                    # Скачивание CSV новых (собирается один раз на задачу, а не при каждом опросе)
+                    job_exports = st.session_state.setdefault('job_exports', {})
+                    if job.job_id not in job_exports:
+                        job_exports[job.job_id] = csv_text(job.accepted)
                     st.download_button(
                         label="📥 Скачать новые CSV",
-                        data=csv_new,
-                        file_name=f'new_youtube_channels_{added_count}.csv',
-                        mime='text/csv'
+                        data=job_exports[job.job_id],
+                        file_name=f'new_youtube_channels_{job.saved}.csv',
+                        mime='text/csv',
+                        key=f"download_{job.job_id}"
                     )
-                    st.session_state.channels_data = []  # Очистка после сохранения
-                else:
+                elif job.kind == CRAWL and job.status in (DONE, EXHAUSTED, STOPPED):
                     st.warning("⚠️ Каналы не найдены. Попробуйте другие ключевые слова или уменьшите мин. подписчиков.")
+                if st.button("✖️ Убрать из списка", key=f"forget_{job.job_id}"):
+                    job_runner.forget(job.job_id)
+                    st.rerun()
+
+    # Streamlit без fragment: прогресс обновляется по кнопке
+    poll_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    if poll_fragment:
+        poll_fragment(run_every=JOBS_POLL_INTERVAL if job_runner.active_jobs() else None)(render_jobs)()
+    else:
+        render_jobs()
+        if job_runner.active_jobs() and st.button("🔄 Обновить прогресс", key="refresh_jobs"):
+            st.rerun()
 
-            except Exception as e:
-                st.error(f"Общая ошибка: {e}")
+    # История запусков из таблицы задач — в том числе других сессий и CLI
+    with st.expander("🗂️ История запусков", expanded=False):
+        recent_jobs = job_runner.job_store.recent()
+        if recent_jobs:
+            st.dataframe([
+                {
+                    'Запуск': time.strftime("%d.%m.%Y %H:%M", time.localtime(job['created_at'])),
+                    'Задача': job['mode'],
+                    'Статус': JOB_STATUS_LABELS.get(job['status'], job['status']),
+                    'Найдено': job['found'],
+                    'Сохранено': job['saved'],
+                    'Ключ': job['api_key'],
+                    'Сообщение': job['message'],
+                }
+                for job in recent_jobs
+            ], use_container_width=True, hide_index=True)
+        else:
+            st.info("Запусков пока не было")
     
+    # Статистика кэша ответов API
+    with st.expander("🗄️ Кэш ответов API", expanded=False):
+        cache_stats = response_cache.stats()
+        cache_col1, cache_col2, cache_col3, cache_col4 = st.columns(4)
+        with cache_col1:
+            st.metric("✅ Попаданий", cache_stats['hits'])
+        with cache_col2:
+            st.metric("❌ Промахов", cache_stats['misses'])
+        with cache_col3:
+            st.metric("🎯 Доля попаданий", f"{cache_stats['hit_rate'] * 100:.1f}%")
+        with cache_col4:
+            st.metric("📦 Записей", cache_stats['entries'])
+        search_stats = search_cache.stats()
+        st.caption(
+            f"Страницы поиска: попаданий {search_stats['hits']}, промахов {search_stats['misses']}, "
+            f"сэкономлено ~{search_stats['hits'] * 100} единиц квоты, страниц в кэше {search_stats['entries']}"
+        )
+        st.caption(
+            f"Отклонённые фильтрами каналы: в индексе {channel_store.rejected_count()}, "
+            f"проверено без запроса к API: {job_runner.rejected_skipped()}"
+        )
+        if st.button("🗑️ Очистить кэш", key="clear_cache"):
+            response_cache.clear()
+            search_cache.clear()
+            channel_store.clear_rejected()
+            st.rerun()
+
+    # Какие запросы окупают свои 100 единиц за страницу поиска
+    with st.expander("📊 Отдача запросов", expanded=False):
+        query_table = query_stats.table(search_mode)
+        if query_table:
+            # pandas импортируется долго — только когда таблица действительно строится
+            import pandas as pd
+            st.dataframe(
+                pd.DataFrame(query_table).drop(columns=['mode', 'updated_at']).rename(columns={
+                    'query': "Запрос", 'pages': "Страниц", 'cached_pages': "Из кэша", 'units': "Единиц",
+                    'hits': "Результатов", 'duplicates': "Повторов", 'rejected': "Отклонено",
+                    'accepted': "Принято", 'per_100_units': "Каналов на 100 ед.",
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            if st.button("🗑️ Сбросить статистику", key="clear_query_stats"):
+                query_stats.clear()
+                st.rerun()
+        else:
+            st.caption("Статистика появится после первого поиска в этом режиме")
+
     # Консоль с логами API запросов
+    if rate_limiter.throttle_events or rate_limiter.retries:
+        st.caption(
+            f"⏱️ Темп запросов: {rate_limiter.rate:.1f}/с, замедлений по требованию API: "
+            f"{rate_limiter.throttle_events}, повторов: {rate_limiter.retries}"
+        )
     if st.session_state.api_logs:
         with st.expander("📊 Консоль API запросов", expanded=False):
             st.text_area("Лог запросов:", value='\n'.join(st.session_state.api_logs[-20:]), height=200, disabled=True)
@@ -571,9 +543,9 @@ with tab1:
 with tab2:
     st.header("📋 Сохранённые каналы")
     
-    existing_channels = load_channels()
+    total_count = channel_store.count()
     
-    if existing_channels:
+    if total_count:
         # Создаем красивую панель управления с кнопками
         st.markdown("### 🎛️ Панель управления")
         
@@ -589,23 +561,86 @@ with tab2:
         
         # Статистика в правой части
         with stats_col:
-            df = pd.DataFrame(existing_channels)
-            viewed_count = df.get('viewed', pd.Series([False] * len(df))).sum()
-            total_count = len(df)
-            st.metric("📊 Статистика", f"{viewed_count}/{total_count} просмотрено")
+            st.metric("📊 Статистика", f"{channel_store.viewed_count()}/{total_count} просмотрено")
 
         st.divider()  # Красивый разделитель
 
         if refresh_button:
             st.rerun()  # Перезагрузка страницы для обновления данных
 
+        # Фильтры и сортировка выполняются в SQLite, в таблицу загружается только текущая страница
+        filter_col1, filter_col2, filter_col3, filter_col4, filter_col5 = st.columns([2, 1.5, 1.2, 1.2, 1.2])
+        with filter_col1:
+            filter_search = st.text_input(
+                "🔎 Поиск по названию, описанию, тегам, контактам:",
+                key="channels_filter_search",
+                help="Ищутся все слова (как начала слов), результаты — по релевантности"
+            )
+        with filter_col2:
+            filter_tag = st.text_input("🏷️ Тег канала или видео:", key="channels_filter_tag")
+        with filter_col3:
+            filter_viewed = st.selectbox("👁️ Статус:", list(VIEWED_FILTERS), key="channels_filter_viewed")
+        with filter_col4:
+            filter_min_subscribers = st.number_input("👥 Подписчиков от:", min_value=0, value=0, step=1000, key="channels_filter_min")
+        with filter_col5:
+            filter_max_subscribers = st.number_input("👥 до (0 — без лимита):", min_value=0, value=0, step=1000, key="channels_filter_max")
+        channel_filters = {
+            'search': filter_search.strip(),
+            'tag': filter_tag.strip(),
+            'viewed': VIEWED_FILTERS[filter_viewed],
+            'min_subscribers': filter_min_subscribers,
+            'max_subscribers': filter_max_subscribers,
+        }
+
+        sort_col, size_col, page_col = st.columns([2, 1, 1])
+        with sort_col:
+            sort_option = st.selectbox("↕️ Сортировка:", list(CHANNEL_SORT_OPTIONS), key="channels_sort")
+        with size_col:
+            page_size = st.selectbox("Строк на странице:", CHANNELS_PAGE_SIZES, index=1, key="channels_page_size")
+
+        store_modified_at = channel_store.modified_at()
+        matched_count = count_channels(channel_store, store_modified_at, channel_filters)
+        pages_count = max(1, -(-matched_count // page_size))
+        # При смене фильтров, сортировки или размера страницы возвращаемся на первую страницу
+        view_signature = (tuple(channel_filters.values()), sort_option, page_size)
+        if st.session_state.get('channels_view') != view_signature:
+            st.session_state.channels_view = view_signature
+            st.session_state.channels_page = 1
+            st.session_state.channels_editor_version = st.session_state.get('channels_editor_version', 0) + 1
+        st.session_state.channels_page = min(st.session_state.get('channels_page', 1), pages_count)
+        with page_col:
+            page = st.number_input(f"Страница (из {pages_count}):", min_value=1, max_value=pages_count, key="channels_page")
+
+        order_by, descending = CHANNEL_SORT_OPTIONS[sort_option]
+        page_channels = load_channels_page(channel_store, store_modified_at, channel_filters, order_by, descending, page_size, page)
+        # Ключ редактора меняется вместе со страницей и после сохранения, чтобы правки не переносились на другие строки
+        editor_key = f"channels_editor_{st.session_state.get('channels_editor_version', 0)}_{page}"
+        # Пока в редакторе есть несохранённые правки, показываем те же строки, что и при их вводе:
+        # фоновые задачи добавляют каналы, и номера строк указывали бы уже на другие каналы
+        editor_pages = st.session_state.setdefault('channels_editor_pages', {})
+        if st.session_state.get(editor_key, {}).get('edited_rows') and editor_key in editor_pages:
+            page_channels = editor_pages[editor_key]
+        else:
+            editor_pages.clear()
+            editor_pages[editor_key] = page_channels
+        first_row = (page - 1) * page_size
+        st.caption(
+            f"Показаны {first_row + 1 if page_channels else 0}–{first_row + len(page_channels)} "
+            f"из {matched_count} под фильтром (всего в базе: {total_count})"
+        )
+
+        # pandas импортируется долго — только когда в базе есть каналы для таблицы
+        import pandas as pd
+        df = pd.DataFrame(page_channels, columns=CHANNEL_FIELDS)
+
         # Добавляем колонку для удаления (чекбокс)
         df['delete'] = False
         
         # Редактируемая таблица с чекбоксом для "viewed", "delete" и ссылкой
         st.subheader("📋 Таблица каналов")
-        edited_df = st.data_editor(
+        st.data_editor(
             df,
+            key=editor_key,
             column_config={
                 "channel_url": st.column_config.LinkColumn(
                     "🔗 Ссылка",
@@ -631,40 +666,138 @@ with tab2:
                 "video_tags": st.column_config.TextColumn("🎬 Теги видео", width="medium")
             },
             use_container_width=True,
-            hide_index=False,
+            hide_index=True,
             column_order=["title", "channel_url", "subscribers", "viewed", "delete", "description", "contacts", "tags", "found_via_video", "video_tags"]
         )
         
+        # Правки редактора: {номер строки: {колонка: новое значение}} — записываются только они.
+        # Номер строки сопоставляется с каналом по строкам, показанным при вводе правок
+        edited_rows = st.session_state[editor_key].get('edited_rows', {})
+        editor_ids = [channel['channel_id'] for channel in editor_pages[editor_key]]
+        row_changes = {editor_ids[int(row)]: dict(changes) for row, changes in edited_rows.items()}
+        to_delete = [channel_id for channel_id, changes in row_changes.items() if changes.get('delete')]
+
         # Логика сохранения изменений
         if save_button:
-            updated_df = edited_df.drop(columns=['delete'])
-            updated_channels = updated_df.to_dict('records')
-            save_channels(updated_channels)
-            st.success("✅ Изменения сохранены!")
-            st.rerun()
+            field_changes = {channel_id: {k: v for k, v in changes.items() if k != 'delete'}
+                             for channel_id, changes in row_changes.items() if channel_id not in to_delete}
+            updated_count = channel_store.update_fields(field_changes)
+            if updated_count:
+                st.session_state.channels_editor_version = st.session_state.get('channels_editor_version', 0) + 1
+                st.toast(f"✅ Изменения сохранены: {updated_count} строк")
+                st.rerun()
+            else:
+                st.info("ℹ️ Нет изменений для сохранения")
         
         # Логика удаления выбранных строк
         if delete_button:
-            to_delete = edited_df[edited_df['delete'] == True]
-            if not to_delete.empty:
-                updated_df = edited_df[~edited_df['delete']].drop(columns=['delete'])
-                updated_channels = updated_df.to_dict('records')
-                save_channels(updated_channels)
-                st.success(f"✅ Удалено {len(to_delete)} каналов!")
+            if to_delete:
+                deleted_count = channel_store.delete_many(to_delete)
+                st.session_state.channels_editor_version = st.session_state.get('channels_editor_version', 0) + 1
+                st.toast(f"✅ Удалено {deleted_count} каналов!")
                 st.rerun()
             else:
                 st.warning("⚠️ Не выбраны каналы для удаления!")
         
-        # Скачивание полного CSV
+        # Обновление подписчиков: пачки по 50 каналов, начиная с давно не обновлявшихся
+        st.markdown("### 📈 Обновление подписчиков")
+        refresh_col1, refresh_col2, refresh_col3 = st.columns([1.5, 1.5, 2])
+        with refresh_col1:
+            refresh_max_age_days = st.number_input(
+                "Обновлять старше (дни):",
+                min_value=0,
+                value=DEFAULT_MAX_AGE // 86400,
+                key="refresh_max_age_days",
+                help="Каналы, статистика которых обновлялась позже, пропускаются"
+            )
+        with refresh_col2:
+            refresh_budget = st.number_input(
+                "Лимит квоты (0 — без лимита):",
+                min_value=0,
+                value=0,
+                step=100,
+                key="refresh_budget",
+                help="1 единица квоты обновляет до 50 каналов; остальные обновятся при следующем запуске"
+            )
+        stale_count = channel_store.stale_count(refresh_max_age_days * 86400)
+        refresh_running = any(job.kind == REFRESH for job in job_runner.active_jobs())
+        with refresh_col3:
+            st.metric("Требуют обновления", stale_count, help=f"≈{-(-stale_count // 50)} ед. квоты")
+        if st.button("📈 Обновить подписчиков", key="refresh_subscribers", disabled=refresh_running or not stale_count):
+            refresh_key = api_key
+            if auto_rotate_keys:
+                refresh_key = key_pool.best_key(exclude=job_runner.busy_keys()) or key_pool.best_key()
+            if refresh_key:
+                job_runner.submit_refresh(
+                    refresh_key,
+                    refresh_max_age_days * 86400,
+                    max_units=refresh_budget or None,
+                    fetch_workers=fetch_workers
+                )
+                st.toast("📈 Обновление запущено, прогресс — на вкладке поиска")
+            else:
+                st.warning("⚠️ Укажите API-ключ с остатком квоты")
+
+        # Динамика подписчиков каналов текущей страницы
+        with st.expander("📊 Динамика подписчиков", expanded=False):
+            titles_by_id = {channel['channel_id']: channel['title'] for channel in page_channels}
+            chart_ids = st.multiselect(
+                "Каналы текущей страницы:",
+                list(titles_by_id),
+                format_func=titles_by_id.get,
+                max_selections=10,
+                key="history_channels"
+            )
+            history = channel_store.subscriber_history(chart_ids)
+            if history:
+                chart_df = pd.DataFrame([
+                    {'Дата': pd.to_datetime(fetched_at, unit='s'), 'Канал': titles_by_id[cid], 'Подписчики': subscribers}
+                    for cid, points in history.items() for fetched_at, subscribers in points
+                ])
+                st.line_chart(chart_df, x='Дата', y='Подписчики', color='Канал')
+            elif chart_ids:
+                st.info("ℹ️ Для выбранных каналов ещё нет истории")
+
+        # Экспорт: файл собирается только по кнопке, потоково пачками из базы
         st.markdown("### 📥 Экспорт данных")
-        csv_full = edited_df.drop(columns=['delete']).to_csv(index=False, encoding='utf-8')
-        st.download_button(
-            label="📄 Скачать все каналы (CSV)",
-            data=csv_full,
-            file_name=f'youtube_channels_{total_count}_records.csv',
-            mime='text/csv',
-            use_container_width=True
-        )
+        export_col1, export_col2, export_col3, export_col4 = st.columns([1.2, 1.5, 1.5, 1.8])
+        with export_col1:
+            export_format = st.selectbox(
+                "Формат:",
+                available_formats(),
+                format_func=lambda fmt: FORMATS[fmt][0],
+                key="export_format",
+                help="Parquet доступен при установленном pyarrow"
+            )
+        with export_col2:
+            export_unviewed = st.checkbox("Только непросмотренные", key="export_unviewed")
+        with export_col3:
+            export_with_contacts = st.checkbox("Только с контактами", key="export_with_contacts")
+        with export_col4:
+            export_use_filters = st.checkbox("С фильтрами таблицы", value=True, key="export_use_filters")
+        if st.button("📦 Подготовить файл", key="prepare_export", use_container_width=True):
+            export_filters = dict(channel_filters) if export_use_filters else {}
+            if export_unviewed:
+                export_filters['viewed'] = False
+            if export_with_contacts:
+                export_filters['has_contacts'] = True
+            with st.spinner("Выгрузка каналов..."):
+                export_path, export_count = export_channels(channel_store, export_format, **export_filters)
+            format_name, mime, extension = FORMATS[export_format]
+            # Кнопка скачивания только в этом прогоне: Streamlit читает файл кнопки в память
+            # при каждом перезапуске скрипта, где она показана. Сам файл после этого не нужен
+            try:
+                with open(export_path, 'rb') as export_file:
+                    st.download_button(
+                        label=f"💾 Скачать {export_count} каналов ({format_name})",
+                        data=export_file,
+                        file_name=f"youtube_channels_{export_count}_records.{extension}",
+                        mime=mime,
+                        use_container_width=True
+                    )
+            finally:
+                os.remove(export_path)
+            st.caption("Кнопка пропадёт после следующего действия на странице — тогда подготовьте файл заново")
         
     else:
         st.info("📭 Пока нет сохранённых каналов. Запустите поиск в первой вкладке!")
@@ -700,6 +833,8 @@ with tab3:
     api_keys = load_api_keys()
     
     if api_keys:
+        # pandas импортируется долго — только когда есть ключи для таблиц
+        import pandas as pd
         st.markdown("### 📋 Список API-ключей")
         
         # Панель управления ключами
@@ -718,7 +853,8 @@ with tab3:
         if usage_data:
             usage_df = []
             for key_short, dates in usage_data.items():
-                for date, requests in dates.items():
+                for date, day_usage in dates.items():
+                    requests = day_total(day_usage)
                     usage_df.append({
                         'API ключ': key_short,
                         'Дата': date,
@@ -731,8 +867,8 @@ with tab3:
                 st.dataframe(df_usage, use_container_width=True, hide_index=True)
                 
                 # Показываем сводную статистику за сегодня
-                today = datetime.now().strftime("%Y-%m-%d")
-                today_usage = sum(dates.get(today, 0) for dates in usage_data.values())
+                today = quota_day()
+                today_usage = sum(day_total(dates.get(today, 0)) for dates in usage_data.values())
                 
                 col_usage1, col_usage2, col_usage3 = st.columns(3)
                 with col_usage1:
@@ -742,11 +878,39 @@ with tab3:
                 with col_usage3:
                     quota_percent = min(100, (today_usage/10000)*100)
                     st.metric("📊 Квота использована", f"{quota_percent:.1f}%")
+
+                # Разбивка сегодняшнего расхода по типам запросов
+                today_types = {}
+                for dates in usage_data.values():
+                    for request_type, units in day_entry(dates.get(today)).get('types', {}).items():
+                        today_types[request_type] = today_types.get(request_type, 0) + units
+                if today_types:
+                    with st.expander("🧾 Расход за сегодня по типам запросов"):
+                        st.dataframe(
+                            pd.DataFrame(
+                                sorted(today_types.items(), key=lambda x: -x[1]),
+                                columns=['Тип запроса', 'Единиц квоты']
+                            ),
+                            use_container_width=True,
+                            hide_index=True
+                        )
             else:
                 st.info("Нет данных об использовании API")
         else:
             st.info("Нет данных об использовании API")
         
+        # Остаток квоты по каждому ключу за текущие квотные сутки
+        st.markdown("### 🔋 Остаток квоты по ключам")
+        capacity_df = pd.DataFrame([{
+            'Название': k['name'],
+            'API ключ': key_label(k['key']),
+            'Использовано': k['used'],
+            'Осталось': k['remaining'],
+            'Статус': '⛔ Исчерпан' if k['exhausted'] or k['remaining'] == 0 else '✅ Доступен'
+        } for k in key_pool.capacity()])
+        st.dataframe(capacity_df, use_container_width=True, hide_index=True)
+        st.caption(f"Квота обнуляется в полночь по тихоокеанскому времени — {next_reset().astimezone():%d.%m %H:%M} по местному.")
+
         # Добавляем колонку для удаления
         keys_df = pd.DataFrame(api_keys)
         keys_df['delete'] = False
@@ -796,6 +960,6 @@ with st.expander("ℹ️ Инструкции"):
        `streamlit run app.py`
     3. **API-ключ**: Получите в [Google Cloud Console](https://console.cloud.google.com/) (включите YouTube Data API v3).
     4. **Квота**: Учитывайте лимит 10k единиц/день. Для большего — запросите увеличение.
-    5. **Сохранение**: Данные хранятся в `youtube_channels.json`. Дубликаты пропускаются по названию.
+    5. **Сохранение**: Данные хранятся в `youtube_channels.db` (SQLite); при первом запуске каналы импортируются из `youtube_channels.json`. Дубликаты пропускаются по ID канала.
     6. **Локально**: Приложение работает в браузере (localhost:8501), без сервера.
     """)
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""Общие фикстуры: локальный mockapi вместо YouTube API и временные хранилища.
+
+Запуск: python -m pytest tests (нужны pytest и google-api-python-client, сеть и ключи не нужны).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ytparse.cache import ResponseCache, SearchPageCache  # noqa: E402
+from ytparse.checkpoint import CheckpointStore  # noqa: E402
+from ytparse.crawler import Crawler  # noqa: E402
+from ytparse.fetch import API_ENDPOINT_ENV  # noqa: E402
+from ytparse.mockapi import MockApiServer, SyntheticWorld  # noqa: E402
+from ytparse.ratelimit import AdaptiveRateLimiter  # noqa: E402
+from ytparse.store import ChannelStore  # noqa: E402
+from ytparse.usage import UsageAccumulator  # noqa: E402
+
+API_KEY = 'test-key-a-0001'
+QUERIES = ['python', 'programming', 'coding tech', 'gaming']
+
+
+class Workspace:
+    """База каналов, кэши и учёт квоты во временном каталоге"""
+
+    def __init__(self, root):
+        db = str(root / 'channels.db')
+        cache = str(root / 'cache.db')
+        self.db = db
+        self.channel_store = ChannelStore(db)
+        self.checkpoint_store = CheckpointStore(db)
+        self.response_cache = ResponseCache(cache)
+        self.search_cache = SearchPageCache(cache)
+        self.usage_tracker = UsageAccumulator(str(root / 'usage.json'))
+
+    def crawler(self, api_key=API_KEY, **kwargs):
+        kwargs.setdefault('rate_limiter', fast_limiter())
+        kwargs.setdefault('stream_to_store', True)
+        return Crawler(api_key, self.channel_store, self.checkpoint_store, self.response_cache, self.search_cache,
+                       self.usage_tracker, **kwargs)
+
+
+def fast_limiter():
+    """Ограничитель без пауз: тестам не нужна вежливость к API"""
+    return AdaptiveRateLimiter(max_rate=1000.0, burst=1000)
+
+
+def channel(channel_id, title='Канал', subscribers=1000, **fields):
+    """Запись канала в формате ChannelStore"""
+    record = {
+        'title': title,
+        'channel_id': channel_id,
+        'channel_url': f"https://www.youtube.com/channel/{channel_id}",
+        'subscribers': subscribers,
+        'description': '',
+        'contacts': 'Не найдено',
+        'viewed': False,
+        'tags': 'Нет тегов',
+    }
+    record.update(fields)
+    return record
+
+
+def crawl_params(target, **overrides):
+    params = {'max_results': 25, 'min_subscribers': 100000, 'max_subscribers': 0, 'target': target}
+    params.update(overrides)
+    return params
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    with MockApiServer(SyntheticWorld(seed=0)) as server:
+        monkeypatch.setenv(API_ENDPOINT_ENV, server.url)
+        yield server
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    return Workspace(tmp_path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChannelStore(str(tmp_path / 'channels.db'))
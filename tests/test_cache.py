@@ -0,0 +1,30 @@
+from ytparse.cache import SEARCH_PAGE_RETENTION, SearchPageCache
+
+PAGE = {'items': [{'snippet': {'channelId': 'UC' + 'a' * 22, 'title': 'python'}}], 'nextPageToken': 'CAUQAA'}
+
+
+def age_pages(path, seconds):
+    cache = SearchPageCache(path)
+    with cache._connect() as conn:
+        conn.execute("UPDATE search_pages SET fetched_at = fetched_at - ?", (seconds,))
+
+
+def test_short_window_does_not_purge_pages_of_longer_windows(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    long_window = SearchPageCache(path, max_age=7 * 86400)
+    long_window.put('python', 'channel', None, 25, None, PAGE)
+    age_pages(path, 2 * 3600)
+
+    short_window = SearchPageCache(path, max_age=3600)
+    assert short_window.get('python', 'channel', None, 25, None) is None
+    short_window.put('gaming', 'channel', None, 25, None, PAGE)
+    assert long_window.get('python', 'channel', None, 25, None) == PAGE
+
+
+def test_pages_past_retention_are_purged(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SearchPageCache(path, max_age=SEARCH_PAGE_RETENTION)
+    cache.put('python', 'channel', None, 25, None, PAGE)
+    age_pages(path, SEARCH_PAGE_RETENTION + 60)
+    cache.put('gaming', 'channel', None, 25, None, PAGE)
+    assert cache.size() == 1
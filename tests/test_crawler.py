@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from conftest import API_KEY, QUERIES, crawl_params
+from ytparse.__main__ import EventLog
+from ytparse.config import MODE_GRAPH, MODE_NAME, MODE_VIDEOS
+from ytparse.crawler import DONE, QUOTA_EXHAUSTED, STOPPED
+from ytparse.keys import DAILY_QUOTA, SEARCH_COST, KeyPool, key_label
+from ytparse.querystats import QueryStatsStore
+from ytparse.scheduler import ADAPTIVE, ROUND_ROBIN
+
+SECOND_KEY = 'test-key-b-0002'  # key_label() различает ключи по первым 10 символам
+
+
+@pytest.mark.parametrize('scheduler', [ROUND_ROBIN, ADAPTIVE])
+def test_resume_honours_target(mock_api, workspace, scheduler):
+    checkpoint = workspace.checkpoint_store.start(MODE_NAME, QUERIES, crawl_params(60, scheduler=scheduler))
+    first = workspace.crawler(should_stop=lambda: len(first.accepted) >= 19)
+    assert first.run(checkpoint) == STOPPED
+    found_first = workspace.channel_store.count()
+    assert 19 <= found_first < 60
+
+    checkpoint = workspace.checkpoint_store.latest()
+    assert checkpoint['found_count'] == found_first
+    second = workspace.crawler()
+    assert second.run(checkpoint) == DONE
+    assert len(second.accepted) == 60 - found_first
+    assert second.found_total() == 60
+    assert workspace.channel_store.count() == 60
+    assert workspace.checkpoint_store.latest() is None
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_cancel_during_backoff(mock_api, workspace, workers):
+    cancel = threading.Event()
+
+    def on_event(kind, message='', **data):
+        # Поиск проходит, а единственная пачка channels.list получает 503 и уходит в повторы
+        if kind == 'api_request' and data['request_type'] == "Статистика каналов":
+            mock_api.error_rate = 1.0
+            threading.Timer(0.3, cancel.set).start()
+
+    checkpoint = workspace.checkpoint_store.start(MODE_NAME, QUERIES, crawl_params(10))
+    crawler = workspace.crawler(fetch_workers=workers, on_event=on_event, should_stop=cancel.is_set)
+    started = time.monotonic()
+    assert crawler.run(checkpoint) == STOPPED
+    assert time.monotonic() - started < 2
+    assert mock_api.stats()['injected_errors'] >= 1
+
+
+def test_survivors_statistics_are_not_requested_twice(mock_api, workspace):
+    # Даже без кэша статистики её берут из первой пачки, а не запрашивают повторно
+    workspace.response_cache.ttl['statistics'] = 0
+    checkpoint = workspace.checkpoint_store.start(MODE_NAME, QUERIES, crawl_params(20))
+    crawler = workspace.crawler()
+    assert crawler.run(checkpoint) == DONE
+    stats = mock_api.stats()
+    assert stats['parts']['channels.snippet'] >= 1
+    assert stats['parts']['channels.statistics'] + stats['parts']['channels.snippet'] == stats['calls']['channels']
+    assert all(channel['subscribers'] >= 100000 for channel in crawler.accepted)
+
+
+def test_video_tags_quota_error_rotates_key(mock_api, workspace):
+    # Первому ключу хватает на поиск и каналы страницы, но не на videos.list
+    mock_api.quota = SEARCH_COST + 2
+    key_pool = KeyPool([{'key': API_KEY}, {'key': SECOND_KEY}], workspace.usage_tracker)
+    checkpoint = workspace.checkpoint_store.start(MODE_VIDEOS, QUERIES, crawl_params(5))
+    crawler = workspace.crawler(key_pool=key_pool, auto_rotate_keys=True)
+    assert crawler.run(checkpoint) == DONE
+    assert crawler.api_key == SECOND_KEY
+    assert key_pool.is_exhausted(API_KEY)
+    channels = workspace.channel_store.query()
+    assert len(channels) == 5
+    assert all(channel['video_tags'] != 'Ошибка получения тегов' for channel in channels)
+
+
+def test_graph_mode_keeps_out_of_query_stats(mock_api, workspace):
+    query_stats = QueryStatsStore(workspace.db)
+    seeds = [item['snippet']['channelId'] for item in mock_api.world.search_items('python', 'channel')[:10]]
+    checkpoint = workspace.checkpoint_store.start(MODE_GRAPH, seeds, crawl_params(20, max_depth=3))
+    assert workspace.crawler(query_stats=query_stats).run(checkpoint) == DONE
+    assert workspace.channel_store.count() == 20
+    assert query_stats.table() == []
+
+
+def test_search_quota_rotates_key_and_stops_when_pool_is_empty(mock_api, workspace, tmp_path):
+    mock_api.quota = 3 * SEARCH_COST
+    key_pool = KeyPool([{'key': API_KEY}, {'key': SECOND_KEY}], workspace.usage_tracker)
+    checkpoint = workspace.checkpoint_store.start(MODE_NAME, QUERIES, crawl_params(10000))
+    event_log = EventLog(str(tmp_path / 'events.jsonl'), quiet=True)
+    crawler = workspace.crawler(key_pool=key_pool, auto_rotate_keys=True, on_event=event_log)
+    assert crawler.run(checkpoint) == QUOTA_EXHAUSTED
+    event_log.close()
+    assert key_pool.is_exhausted(API_KEY) and key_pool.is_exhausted(SECOND_KEY)
+    assert key_pool.best_key() is None
+    # Каналы, найденные обоими ключами, сохранены, позиция — в контрольной точке
+    assert workspace.channel_store.count() == crawler.found_total() > 0
+    assert workspace.checkpoint_store.latest()['found_count'] == crawler.found_total()
+    assert mock_api.stats()['calls']['search'] > 3
+    # В журнал событий попадает только сокращённое имя ключа
+    events = (tmp_path / 'events.jsonl').read_text(encoding='utf-8')
+    assert '"event": "key_rotated"' in events
+    assert SECOND_KEY not in events
+
+
+def test_low_key_is_switched_before_search_without_being_exhausted(mock_api, workspace):
+    workspace.usage_tracker.add(key_label(API_KEY), "Поиск каналов", DAILY_QUOTA - SEARCH_COST // 2)
+    key_pool = KeyPool([{'key': API_KEY}, {'key': SECOND_KEY}], workspace.usage_tracker)
+    checkpoint = workspace.checkpoint_store.start(MODE_NAME, QUERIES, crawl_params(10))
+    crawler = workspace.crawler(key_pool=key_pool, auto_rotate_keys=True)
+    assert crawler.run(checkpoint) == DONE
+    assert crawler.api_key == SECOND_KEY
+    assert not key_pool.is_exhausted(API_KEY)
+    assert key_pool.remaining(API_KEY) == SEARCH_COST // 2
+
+
+def test_low_key_is_kept_when_no_other_key_has_room(mock_api, workspace):
+    workspace.usage_tracker.add(key_label(API_KEY), "Поиск каналов", DAILY_QUOTA - SEARCH_COST // 2)
+    key_pool = KeyPool([{'key': API_KEY}], workspace.usage_tracker)
+    checkpoint = workspace.checkpoint_store.start(MODE_NAME, QUERIES, crawl_params(10))
+    crawler = workspace.crawler(key_pool=key_pool, auto_rotate_keys=True)
+    assert crawler.run(checkpoint) == DONE
+    assert crawler.api_key == API_KEY
+    assert not key_pool.is_exhausted(API_KEY)
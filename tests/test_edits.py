@@ -0,0 +1,25 @@
+from conftest import channel
+
+
+def test_update_fields_writes_only_given_fields(store):
+    store.merge_many([channel('UC1', description='Из API', subscribers=5000), channel('UC2')])
+    # Служебная колонка редактора и channel_id не записываются
+    assert store.update_fields({
+        'UC1': {'viewed': True, 'tags': 'python', 'delete': True, 'channel_id': 'UC9'},
+        'UC3': {'viewed': True},
+        'UC2': {},
+    }) == 1
+    records = {ch['channel_id']: ch for ch in store.all()}
+    assert set(records) == {'UC1', 'UC2'}
+    assert records['UC1']['viewed'] is True
+    assert records['UC1']['tags'] == 'python'
+    assert records['UC1']['description'] == 'Из API'
+    assert records['UC1']['subscribers'] == 5000
+    assert records['UC2']['viewed'] is False
+
+
+def test_delete_many_drops_channels_and_history(store):
+    store.merge_many([channel('UC1'), channel('UC2'), channel('UC3')])
+    assert store.delete_many(['UC1', 'UC3', 'UC9', '']) == 2
+    assert [ch['channel_id'] for ch in store.all()] == ['UC2']
+    assert store.subscriber_history(['UC1', 'UC2']).keys() == {'UC2'}
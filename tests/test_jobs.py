@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ytparse.crawler import DONE
+from ytparse.db import connect
+from ytparse.jobs import INTERRUPTED, QUEUED, RUNNING, STALE_AFTER, JobStore
+
+
+def insert_job(path, job_id, pid, updated_at, crawl_id='', status=RUNNING):
+    with connect(path) as conn:
+        conn.execute(
+            "INSERT INTO crawl_jobs (job_id, crawl_id, mode, status, pid, created_at, updated_at) "
+            "VALUES (?, ?, 'test', ?, ?, ?, ?)",
+            (job_id, crawl_id, status, pid, updated_at, updated_at)
+        )
+
+
+def finished_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="на Windows PID не проверяется")
+def test_only_jobs_of_finished_processes_are_interrupted(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    JobStore(path)
+    now = time.time()
+    insert_job(path, 'dead', finished_pid(), now)
+    # Родительский процесс pytest жив — как CLI, запущенный рядом с интерфейсом
+    insert_job(path, 'alive', os.getppid(), now)
+    insert_job(path, 'silent', os.getppid(), now - STALE_AFTER - 1)
+
+    statuses = {job['job_id']: job['status'] for job in JobStore(path).recent()}
+    assert statuses == {'dead': INTERRUPTED, 'alive': RUNNING, 'silent': INTERRUPTED}
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="на Windows PID не проверяется")
+def test_active_crawl_ids_cover_live_jobs_of_all_processes(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    job_store = JobStore(path)
+    now = time.time()
+    insert_job(path, 'own', os.getpid(), now, crawl_id='crawl-own', status=QUEUED)
+    insert_job(path, 'cli', os.getppid(), now, crawl_id='crawl-cli')
+    insert_job(path, 'dead', finished_pid(), now, crawl_id='crawl-dead')
+    insert_job(path, 'silent', os.getppid(), now - STALE_AFTER - 1, crawl_id='crawl-silent')
+    insert_job(path, 'done', os.getppid(), now, crawl_id='crawl-done', status=DONE)
+    insert_job(path, 'refresh', os.getppid(), now)
+    assert sorted(job_store.active_crawl_ids()) == ['crawl-cli', 'crawl-own']
@@ -0,0 +1,38 @@
+from conftest import channel
+
+
+def test_merge_many_upserts_by_channel_id(store):
+    assert store.merge_many([channel('UC1', subscribers=1000), channel('UC2'), channel('UC1', subscribers=1500)]) == (2, 0)
+    assert store.count() == 2
+    assert {ch['channel_id']: ch['subscribers'] for ch in store.all()} == {'UC1': 1500, 'UC2': 1000}
+
+    # Пользователь отметил канал и поправил описание — повторная находка этого не затирает
+    store.update_fields({'UC1': {'viewed': True, 'description': 'Моя заметка'}})
+    added, merged = store.merge_many([
+        channel('UC1', title='Новое название', subscribers=2000, description='Из API', contacts='Email: a@b.cd',
+                tags='python, code', found_via_video='Видео'),
+        channel('UC3'),
+    ])
+    assert (added, merged) == (1, 1)
+    record = {ch['channel_id']: ch for ch in store.all()}['UC1']
+    assert record['subscribers'] == 2000
+    assert record['viewed'] is True
+    assert record['description'] == 'Моя заметка'
+    # Пустые поля заполняются, заполненные (в том числе название) остаются прежними
+    assert record['contacts'] == 'Email: a@b.cd'
+    assert record['tags'] == 'python, code'
+    assert record['found_via_video'] == 'Видео'
+    assert record['title'] == 'Канал'
+
+
+def test_merge_many_records_subscriber_history(store):
+    store.merge_many([channel('UC1', subscribers=1000)])
+    store.merge_many([channel('UC1', subscribers=1200)])
+    history = store.subscriber_history(['UC1'])
+    assert [subscribers for _, subscribers in history['UC1']] == [1000, 1200]
+
+
+def test_merge_many_keeps_channels_with_the_same_title(store):
+    # Дубликаты определяются только по channel_id: одноимённые каналы — разные каналы
+    assert store.merge_many([channel('UC1', title='Music'), channel('UC2', title='Music')]) == (2, 0)
+    assert store.existing_ids(['UC1', 'UC2', 'UC3']) == {'UC1', 'UC2'}
@@ -0,0 +1,33 @@
+import threading
+
+from ytparse.ratelimit import AdaptiveRateLimiter, call_with_retry
+
+THREADS = 8
+CALLS = 200
+
+
+def test_retries_are_counted_across_threads():
+    # Запаса токенов хватает на все попытки, чтобы потоки не ждали друг друга
+    limiter = AdaptiveRateLimiter(max_rate=1000.0, burst=THREADS * CALLS * 2)
+
+    def flaky():
+        # Каждый вызов сначала обрывается, затем проходит
+        failed = []
+
+        def fn():
+            if not failed:
+                failed.append(True)
+                raise ConnectionError()
+            return True
+        return fn
+
+    def worker():
+        for _ in range(CALLS):
+            assert call_with_retry(flaky(), limiter, base_delay=0)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.retries == THREADS * CALLS
@@ -0,0 +1,62 @@
+from conftest import API_KEY, fast_limiter
+from ytparse.crawler import DONE
+from ytparse.refresh import SubscriberRefresher
+
+CHANNELS = 120  # три пачки channels.list
+
+
+def seed_store(workspace, world):
+    ids = world.channel_ids[:CHANNELS]
+    workspace.channel_store.merge_many([
+        {'title': f"Channel {i}", 'channel_id': cid, 'subscribers': 1} for i, cid in enumerate(ids)
+    ])
+    return ids
+
+
+def refresher(workspace):
+    return SubscriberRefresher(API_KEY, workspace.channel_store, workspace.usage_tracker, max_age=0,
+                               rate_limiter=fast_limiter())
+
+
+def test_refresh_updates_subscribers_then_uses_etags(mock_api, workspace):
+    ids = seed_store(workspace, mock_api.world)
+
+    first = refresher(workspace)
+    assert first.run() == DONE
+    assert (first.refreshed, first.not_modified, first.missing) == (CHANNELS, 0, 0)
+    subscribers = {ch['channel_id']: ch['subscribers'] for ch in workspace.channel_store.all()}
+    assert subscribers == {cid: mock_api.world.subscribers[mock_api.world.index[cid]] for cid in ids}
+    assert mock_api.stats()['calls'] == {'channels': 3}
+
+    # Статистика не менялась: API отвечает 304, тело не передаётся, история копирует последний снимок
+    mock_api.reset_stats()
+    second = refresher(workspace)
+    assert second.run() == DONE
+    assert (second.refreshed, second.not_modified) == (0, CHANNELS)
+    stats = mock_api.stats()
+    assert stats['not_modified'] == 3
+    assert stats['bytes'] == 0
+    history = workspace.channel_store.subscriber_history(ids[:1])[ids[0]]
+    assert [value for _, value in history] == [1, subscribers[ids[0]], subscribers[ids[0]]]
+
+
+def test_refresh_skips_fresh_channels(mock_api, workspace):
+    seed_store(workspace, mock_api.world)
+    assert refresher(workspace).run() == DONE
+    mock_api.reset_stats()
+    fresh = SubscriberRefresher(API_KEY, workspace.channel_store, workspace.usage_tracker, max_age=3600,
+                                rate_limiter=fast_limiter())
+    assert fresh.run() == DONE
+    assert fresh.total == 0
+    assert mock_api.stats()['http_calls'] == 0
+
+
+def test_refresh_keeps_channels_missing_from_api(mock_api, workspace):
+    # Удалённый или скрытый канал остаётся в базе с прежним значением и не запрашивается снова сразу же
+    gone = 'UC' + 'x' * 22
+    workspace.channel_store.merge_many([{'title': "Gone", 'channel_id': gone, 'subscribers': 777}])
+    first = refresher(workspace)
+    assert first.run() == DONE
+    assert (first.refreshed, first.missing) == (0, 1)
+    assert [ch['subscribers'] for ch in workspace.channel_store.all()] == [777]
+    assert workspace.channel_store.refresh_batches(max_age=3600) == []
@@ -0,0 +1,30 @@
+from conftest import crawl_params
+from ytparse.config import MODE_NAME
+from ytparse.crawler import EXHAUSTED
+from ytparse.store import REJECTED_MAX_AGE
+
+
+def test_rejected_channels_expire(workspace):
+    store = workspace.channel_store
+    assert store.add_rejected([{'channel_id': 'UC1', 'subscribers': 10, 'partial': True}, {'subscribers': 5}]) == 1
+    assert store.get_rejected(['UC1', 'UC2']) == {'UC1': {'channel_id': 'UC1', 'subscribers': 10, 'partial': True}}
+    with store._connect() as conn:
+        conn.execute("UPDATE rejected_channels SET rejected_at = rejected_at - ?", (REJECTED_MAX_AGE + 60,))
+    assert store.get_rejected(['UC1']) == {}
+
+
+def test_rejected_channels_are_rechecked_without_api(mock_api, workspace):
+    # Фильтр, который не проходит ни один канал: весь запрос уходит в индекс отклонённых
+    params = crawl_params(1, min_subscribers=10 ** 12, max_results=50)
+    first = workspace.crawler()
+    assert first.run(workspace.checkpoint_store.start(MODE_NAME, ['python'], params)) == EXHAUSTED
+    rejected = workspace.channel_store.rejected_count()
+    assert rejected > 0
+
+    # Страницы поиска берутся из кэша, а каналы — из индекса: к API не обращаемся
+    mock_api.reset_stats()
+    second = workspace.crawler()
+    assert second.run(workspace.checkpoint_store.start(MODE_NAME, ['python'], params)) == EXHAUSTED
+    assert second.rejected_skipped >= rejected  # канал может встретиться на нескольких страницах
+    assert mock_api.stats()['http_calls'] == 0
+    assert workspace.channel_store.count() == 0
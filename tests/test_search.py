@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import channel
+
+
+@pytest.fixture
+def searchable(store):
+    if not store.fts:
+        pytest.skip("SQLite собран без FTS5")
+    store.merge_many([
+        channel('UC1', title='Cooking Daily', description='Рецепты на каждый день, иногда про python'),
+        channel('UC2', title='Python Tutorials', tags='programming, code'),
+        channel('UC3', title='Гейминг', description='Стримы', tags='python'),
+        channel('UC4', title='Путешествия', description='Café в Париже'),
+    ])
+    return store
+
+
+def test_fts_matches_words_as_prefixes(searchable):
+    ids = {ch['channel_id'] for ch in searchable.query(search='pyth')}
+    assert ids == {'UC1', 'UC2', 'UC3'}
+    assert searchable.count(search='pyth') == 3
+    assert [ch['channel_id'] for ch in searchable.query(search='python програм')] == []
+    assert [ch['channel_id'] for ch in searchable.query(search='python progr')] == ['UC2']
+    # Диакритика не мешает поиску
+    assert [ch['channel_id'] for ch in searchable.query(search='cafe')] == ['UC4']
+
+
+def test_fts_ranks_title_above_tags_above_description(searchable):
+    ranked = [ch['channel_id'] for ch in searchable.query(search='python', order_by='rank')]
+    assert ranked == ['UC2', 'UC3', 'UC1']
+
+
+def test_fts_follows_edits_and_deletes(searchable):
+    searchable.update_fields({'UC4': {'title': 'Travel vlog'}})
+    assert [ch['channel_id'] for ch in searchable.query(search='travel')] == ['UC4']
+    searchable.delete_many(['UC2'])
+    assert {ch['channel_id'] for ch in searchable.query(search='python')} == {'UC1', 'UC3'}
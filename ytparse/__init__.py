@@ -0,0 +1 @@
+"""Вспомогательные модули YouTube Channel Parser (кэш, хранилище, работа с API)."""
@@ -0,0 +1,340 @@
+"""Запуск обхода без интерфейса Streamlit.
+
+Пример: python -m ytparse crawl --mode video --queries queries.txt --target 5000
+         python -m ytparse refresh --max-age-days 7 --budget 500
+"""
+import argparse
+import json
+import signal
+import sys
+import time
+from datetime import datetime
+
+from ytparse.cache import ResponseCache, SearchPageCache
+from ytparse.checkpoint import CheckpointStore, found_count
+from ytparse.config import (API_KEYS_FILE, API_USAGE_FILE, CACHE_FILE, DB_FILE, DATA_FILE,
+                            MODE_GRAPH, MODE_NAME, MODE_TAGS, MODE_VIDEOS)
+from ytparse.crawler import DEFAULT_GRAPH_DEPTH, DONE, EXHAUSTED, FAILED, STOPPED, Crawler
+from ytparse.export import FORMATS, export_channels, parquet_available
+from ytparse.fetch import API_ENDPOINT_ENV, DEFAULT_WORKERS
+from ytparse.files import read_json
+from ytparse.jobs import CRAWL, PROGRESS_SAVE_INTERVAL, RUNNING, Job, JobStore
+from ytparse.keys import KeyPool, key_label
+from ytparse.querystats import QueryStatsStore, plan_crawl
+from ytparse.scheduler import ADAPTIVE, ROUND_ROBIN
+from ytparse.refresh import DEFAULT_MAX_AGE, SubscriberRefresher
+from ytparse.store import ChannelStore
+from ytparse.usage import UsageAccumulator
+
+MODES = {'name': MODE_NAME, 'tags': MODE_TAGS, 'video': MODE_VIDEOS, 'graph': MODE_GRAPH}
+
+EXIT_CODES = {DONE: 0, EXHAUSTED: 0, STOPPED: 130}
+
+
+def read_queries(path):
+    """Запросы из файла: одно на строку или через | (как в интерфейсе); '-' — stdin"""
+    if path == '-':
+        text = sys.stdin.read()
+    else:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    return [q.strip() for line in text.splitlines() for q in line.split('|') if q.strip()]
+
+
+class EventLog:
+    """Пишет события обхода в stdout (текстом) и/или в JSONL-файл"""
+
+    def __init__(self, jsonl_path=None, quiet=False):
+        self.quiet = quiet
+        self.jsonl = None
+        if jsonl_path == '-':
+            self.jsonl = sys.stdout
+            self.quiet = True
+        elif jsonl_path:
+            self.jsonl = open(jsonl_path, 'a', encoding='utf-8')
+
+    def __call__(self, kind, message='', **data):
+        if self.jsonl:
+            record = {'time': datetime.now().isoformat(timespec='seconds'), 'event': kind, 'message': message}
+            record.update({k: v for k, v in data.items() if k != 'channel'})
+            if 'channel' in data:
+                record['channel_id'] = data['channel']['channel_id']
+                record['subscribers'] = data['channel']['subscribers']
+            self.jsonl.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.jsonl.flush()
+        # Отдельные запросы к API и счётчики страниц в текстовый вывод не попадают — их слишком много
+        if not self.quiet and kind not in ('api_request', 'page'):
+            stream = sys.stderr if kind == 'error' else sys.stdout
+            print(f"[{datetime.now():%H:%M:%S}] {message}", file=stream, flush=True)
+
+    def close(self):
+        if self.jsonl and self.jsonl is not sys.stdout:
+            self.jsonl.close()
+
+
+def install_stop_handler(message):
+    """Первый Ctrl+C — мягкая остановка, второй — немедленный выход. Возвращает признак остановки"""
+    stop_requested = []
+
+    def request_stop(signum, frame):
+        if stop_requested:
+            raise KeyboardInterrupt
+        stop_requested.append(signum)
+        print(f"⏹️ {message} (Ctrl+C ещё раз — прервать)...", file=sys.stderr, flush=True)
+
+    signal.signal(signal.SIGINT, request_stop)
+    return lambda: bool(stop_requested)
+
+
+def crawl(args):
+    channel_store = ChannelStore(args.db)
+    channel_store.import_json_once(DATA_FILE)
+    checkpoint_store = CheckpointStore(args.db)
+    usage_tracker = UsageAccumulator(API_USAGE_FILE)
+    key_pool = KeyPool(read_json(API_KEYS_FILE, []), usage_tracker)
+    # Обход регистрируется в таблице задач, чтобы интерфейс и другие запуски не продолжали его параллельно
+    job_store = JobStore(args.db)
+
+    if args.resume:
+        checkpoint = checkpoint_store.latest(exclude=job_store.active_crawl_ids())
+        if not checkpoint:
+            print("Нет незавершённого обхода для продолжения", file=sys.stderr)
+            return 1
+    else:
+        # Для связанных каналов запросы — исходные каналы; без них берутся крупнейшие сохранённые
+        graph_mode = MODES[args.mode] == MODE_GRAPH
+        if not args.queries and not graph_mode:
+            print("Укажите --queries или --resume", file=sys.stderr)
+            return 2
+        queries = read_queries(args.queries) if args.queries else []
+        if not queries and not (graph_mode and channel_store.count()):
+            print("Файл запросов пуст" if args.queries else "Нет сохранённых каналов — укажите исходные в --queries",
+                  file=sys.stderr)
+            return 2
+        params = {
+            'max_results': args.max_results,
+            'min_subscribers': args.min_subscribers,
+            'max_subscribers': args.max_subscribers,
+            'target': args.target,
+            'scheduler': args.scheduler,
+        }
+        if graph_mode:
+            params['max_depth'] = args.max_depth
+        checkpoint = checkpoint_store.start(MODES[args.mode], queries, params, keep_active=job_store.active_crawl_ids())
+
+    api_key = args.key or key_pool.best_key()
+    if not api_key:
+        print(f"Нет ключа с остатком квоты (см. {API_KEYS_FILE} или --key)", file=sys.stderr)
+        return 1
+
+    should_stop = install_stop_handler("Остановка после текущего запроса")
+    event_log = EventLog(args.log, quiet=args.quiet)
+    query_stats = QueryStatsStore(args.db)
+    job = Job(CRAWL, checkpoint['mode'], api_key, checkpoint['params']['target'], checkpoint=checkpoint)
+    job.status = RUNNING
+    job_store.create(job)
+    last_saved = time.monotonic()
+
+    def on_event(kind, message='', **data):
+        nonlocal last_saved
+        event_log(kind, message, **data)
+        # Прогресс в таблице задач заодно показывает другим процессам, что обход жив
+        if time.monotonic() - last_saved >= PROGRESS_SAVE_INTERVAL:
+            last_saved = time.monotonic()
+            job.api_key, job.found, job.saved = crawler.api_key, crawler.found_total(), crawler.saved_count
+            job_store.update(job)
+
+    crawler = Crawler(
+        api_key,
+        channel_store,
+        checkpoint_store,
+        ResponseCache(args.cache),
+        SearchPageCache(args.cache),
+        usage_tracker,
+        key_pool=key_pool,
+        auto_rotate_keys=not args.key,
+        fetch_workers=args.workers,
+        stream_to_store=True,
+        query_stats=query_stats,
+        on_event=on_event,
+        should_stop=should_stop,
+    )
+    event_log('info', f"▶️ Обход «{checkpoint['mode']}»: {len(checkpoint['queries'])} запросов, "
+                      f"цель {checkpoint['params']['target']} каналов (уже найдено {found_count(checkpoint)}), "
+                      f"ключ {key_label(api_key)}")
+    plan = plan_crawl(query_stats, checkpoint['mode'], checkpoint['queries'][checkpoint['query_index']:],
+                      checkpoint['params']['target'] - found_count(checkpoint), checkpoint['params']['max_results'],
+                      screened=checkpoint['params']['min_subscribers'] > 0 or checkpoint['params']['max_subscribers'] > 0)
+    available_units = key_pool.remaining(args.key) if args.key else key_pool.total_remaining()
+    if plan['units'] is None:
+        event_log('warning', "⚠️ Эти запросы раньше не дали ни одного подходящего канала", **plan)
+    elif plan['units'] > available_units:
+        event_log('warning', f"⚠️ План: ≈{plan['units']} ед. квоты, доступно {available_units} — цель может быть не достигнута",
+                  available_units=available_units, **plan)
+    else:
+        event_log('info', f"📐 План: ≈{plan['units']} ед. квоты, ≈{plan['pages']} страниц поиска, доступно {available_units}",
+                  available_units=available_units, **plan)
+    status = FAILED
+    try:
+        status = crawler.run(checkpoint)
+    finally:
+        job.status, job.api_key, job.found, job.saved = status, crawler.api_key, crawler.found_total(), crawler.saved_count
+        if status in (DONE, EXHAUSTED, STOPPED):
+            job.message = f"Найдено {job.found}, сохранено новых {job.saved}"
+        job_store.update(job)
+        event_log('finished',
+                  f"Найдено каналов: {crawler.found_total()}, сохранено новых: {crawler.saved_count}, "
+                  f"отклонённых без запроса к API: {crawler.rejected_skipped}",
+                  found=crawler.found_total(), saved=crawler.saved_count)
+        event_log.close()
+    if status not in (DONE, EXHAUSTED):
+        print("Обход можно продолжить: python -m ytparse crawl --resume", file=sys.stderr)
+    return EXIT_CODES.get(status, 1)
+
+
+def refresh(args):
+    channel_store = ChannelStore(args.db)
+    usage_tracker = UsageAccumulator(API_USAGE_FILE)
+    api_key = args.key or KeyPool(read_json(API_KEYS_FILE, []), usage_tracker).best_key()
+    if not api_key:
+        print(f"Нет ключа с остатком квоты (см. {API_KEYS_FILE} или --key)", file=sys.stderr)
+        return 1
+
+    should_stop = install_stop_handler("Остановка после текущей группы запросов")
+    event_log = EventLog(args.log, quiet=args.quiet)
+    refresher = SubscriberRefresher(
+        api_key,
+        channel_store,
+        usage_tracker,
+        max_age=args.max_age_days * 86400,
+        max_units=args.budget or None,
+        fetch_workers=args.workers,
+        on_event=event_log,
+        should_stop=should_stop,
+    )
+    try:
+        status = refresher.run()
+    finally:
+        event_log('finished',
+                  f"Обновлено: {refresher.refreshed}, без изменений: {refresher.not_modified}, "
+                  f"недоступно: {refresher.missing}",
+                  refreshed=refresher.refreshed, not_modified=refresher.not_modified, missing=refresher.missing)
+        event_log.close()
+    return EXIT_CODES.get(status, 1)
+
+
+def stats(args):
+    """Отдача запросов: принятые каналы на 100 единиц квоты, лучшие — первыми"""
+    rows = QueryStatsStore(args.db).table(MODES[args.mode] if args.mode else None)
+    if not rows:
+        print("Статистика запросов пока пуста")
+        return 0
+    print(f"{'Режим':<20} {'Запрос':<30} {'Стр.':>5} {'Ед.':>7} {'Рез.':>6} {'Повт.':>6} {'Откл.':>6} {'Прин.':>6} {'На 100 ед.':>10}")
+    for row in rows:
+        per_100_units = '—' if row['per_100_units'] is None else row['per_100_units']
+        print(f"{row['mode']:<20} {row['query'][:30]:<30} {row['pages']:>5} {row['units']:>7} {row['hits']:>6} "
+              f"{row['duplicates']:>6} {row['rejected']:>6} {row['accepted']:>6} {per_100_units:>10}")
+    return 0
+
+
+def mock_api(args):
+    # Импорт только здесь: остальным командам сервер не нужен
+    from ytparse.mockapi import MockApiServer, RecordedWorld, SyntheticWorld
+    world = RecordedWorld(args.fixtures) if args.fixtures else SyntheticWorld(seed=args.seed)
+    server = MockApiServer(world, host=args.host, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, quota=args.quota, seed=args.seed)
+    print(f"Тестовый API: {server.url} — запускайте приложение с {API_ENDPOINT_ENV}={server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Статистика: {server.stats()}")
+    return 0
+
+
+def export(args):
+    if args.format == 'parquet' and not parquet_available():
+        print("Для Parquet установите pyarrow: pip install pyarrow", file=sys.stderr)
+        return 1
+    filters = {'text': args.text, 'tag': args.tag, 'min_subscribers': args.min_subscribers,
+               'max_subscribers': args.max_subscribers, 'has_contacts': args.with_contacts}
+    if args.unviewed:
+        filters['viewed'] = False
+    path, count = export_channels(ChannelStore(args.db), args.format, args.out, **filters)
+    print(f"Выгружено каналов: {count} → {path}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ytparse', description="YouTube Channel Parser без интерфейса")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl_parser = subparsers.add_parser('crawl', help="Найти каналы и сохранить их в базу")
+    crawl_parser.add_argument('--mode', choices=sorted(MODES), default='name', help="Режим поиска (по умолчанию name)")
+    crawl_parser.add_argument('--queries', help="Файл с запросами: одно на строку или через | ('-' — stdin); "
+                                                "для graph — ID или ссылки исходных каналов")
+    crawl_parser.add_argument('--target', type=int, default=100, help="Целевое количество каналов")
+    crawl_parser.add_argument('--max-results', type=int, default=25, choices=range(1, 51), metavar='1-50',
+                              help="Результатов на страницу поиска")
+    crawl_parser.add_argument('--min-subscribers', type=int, default=100000)
+    crawl_parser.add_argument('--max-subscribers', type=int, default=0, help="0 — без верхнего лимита")
+    crawl_parser.add_argument('--scheduler', choices=(ADAPTIVE, ROUND_ROBIN), default=ADAPTIVE,
+                              help="Порядок запросов: adaptive — по отдаче новых каналов, round_robin — по очереди")
+    crawl_parser.add_argument('--max-depth', type=int, default=DEFAULT_GRAPH_DEPTH,
+                              help="Глубина обхода связанных каналов (режим graph)")
+    crawl_parser.add_argument('--key', help=f"API-ключ (по умолчанию — автовыбор из {API_KEYS_FILE})")
+    crawl_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Параллельных запросов к API")
+    crawl_parser.add_argument('--log', help="JSONL-лог событий ('-' — в stdout вместо текстового вывода)")
+    crawl_parser.add_argument('--quiet', action='store_true', help="Без текстового вывода прогресса")
+    crawl_parser.add_argument('--resume', action='store_true', help="Продолжить последний незавершённый обход")
+    crawl_parser.add_argument('--db', default=DB_FILE)
+    crawl_parser.add_argument('--cache', default=CACHE_FILE)
+    crawl_parser.set_defaults(func=crawl)
+
+    refresh_parser = subparsers.add_parser('refresh', help="Обновить подписчиков у сохранённых каналов")
+    refresh_parser.add_argument('--max-age-days', type=float, default=DEFAULT_MAX_AGE / 86400,
+                                help="Обновлять каналы, статистика которых старше стольких дней")
+    refresh_parser.add_argument('--budget', type=int, default=0,
+                                help="Максимум единиц квоты за запуск (1 ед. — 50 каналов; 0 — без лимита)")
+    refresh_parser.add_argument('--key', help=f"API-ключ (по умолчанию — автовыбор из {API_KEYS_FILE})")
+    refresh_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Параллельных запросов к API")
+    refresh_parser.add_argument('--log', help="JSONL-лог событий ('-' — в stdout вместо текстового вывода)")
+    refresh_parser.add_argument('--quiet', action='store_true', help="Без текстового вывода прогресса")
+    refresh_parser.add_argument('--db', default=DB_FILE)
+    refresh_parser.set_defaults(func=refresh)
+
+    stats_parser = subparsers.add_parser('stats', help="Показать отдачу поисковых запросов")
+    stats_parser.add_argument('--mode', choices=sorted(MODES), help="Только запросы режима")
+    stats_parser.add_argument('--db', default=DB_FILE)
+    stats_parser.set_defaults(func=stats)
+
+    export_parser = subparsers.add_parser('export', help="Выгрузить сохранённые каналы в файл")
+    export_parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    export_parser.add_argument('--out', required=True, help="Путь к файлу выгрузки")
+    export_parser.add_argument('--unviewed', action='store_true', help="Только непросмотренные")
+    export_parser.add_argument('--with-contacts', action='store_true', help="Только с найденными контактами")
+    export_parser.add_argument('--text', default='', help="Подстрока в названии, описании или контактах")
+    export_parser.add_argument('--tag', default='', help="Подстрока в тегах канала или видео")
+    export_parser.add_argument('--min-subscribers', type=int, default=0)
+    export_parser.add_argument('--max-subscribers', type=int, default=0, help="0 — без верхнего лимита")
+    export_parser.add_argument('--db', default=DB_FILE)
+    export_parser.set_defaults(func=export)
+
+    mock_parser = subparsers.add_parser('mock-api', help="Запустить локальную замену YouTube API (без сети и квоты)")
+    mock_parser.add_argument('--host', default='127.0.0.1')
+    mock_parser.add_argument('--port', type=int, default=8765)
+    mock_parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа, с")
+    mock_parser.add_argument('--error-rate', type=float, default=0.0, help="Доля ответов 503")
+    mock_parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Доля ответов 403 rateLimitExceeded")
+    mock_parser.add_argument('--quota', type=int, default=None, help="Единиц квоты на ключ (по умолчанию без лимита)")
+    mock_parser.add_argument('--seed', type=int, default=0)
+    mock_parser.add_argument('--fixtures', help="Файл записанных ответов вместо синтетических данных")
+    mock_parser.set_defaults(func=mock_api)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import json
+import threading
+import time
+
+from ytparse.db import chunks, connect
+
+# Срок жизни каждой части ответа (в секундах): подписчики устаревают быстро,
+# названия, описания и ключевые слова — медленно
+DEFAULT_TTL = {
+    'statistics': 6 * 3600,
+    'snippet': 30 * 86400,
+    'brandingSettings': 30 * 86400,
+    'contentDetails': 30 * 86400,
+}
+DEFAULT_PART_TTL = 7 * 86400
+DEFAULT_MAX_ENTRIES = 100000
+# Сколько считать свежей закэшированную страницу search.list
+DEFAULT_SEARCH_MAX_AGE = 24 * 3600
+# Дольше этого страницы не хранятся: окно свежести у сессий разное, но не больше этого срока
+SEARCH_PAGE_RETENTION = 30 * 86400
+
+
+class ResponseCache:
+    """Локальный кэш ответов channels.list / videos.list в одном файле SQLite.
+
+    Ключ — тип ресурса + ID. Для каждой части ответа (snippet, statistics, ...)
+    хранится время получения, поэтому устаревшие части можно запросить отдельно.
+    Размер ограничен max_entries, лишние записи вытесняются по давности обращения (LRU).
+    """
+
+    def __init__(self, path, ttl=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    resource TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    part_times TEXT NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (resource, item_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+
+    def _connect(self):
+        return connect(self.path)
+
+    def _part_ttl(self, part):
+        return self.ttl.get(part, DEFAULT_PART_TTL)
+
+    def get_many(self, resource, ids, parts):
+        """Возвращает (свежие записи {id: item}, устаревшие части {id: set(parts)}) для списка ID"""
+        ids = list(dict.fromkeys(i for i in ids if i))
+        parts = [p.strip() for p in parts.split(',')] if isinstance(parts, str) else list(parts)
+        now = time.time()
+        rows = {}
+        with self._lock, self._connect() as conn:
+            for chunk in chunks(ids):
+                placeholders = ','.join('?' * len(chunk))
+                for item_id, data, part_times in conn.execute(
+                    f"SELECT item_id, data, part_times FROM responses WHERE resource = ? AND item_id IN ({placeholders})",
+                    [resource, *chunk]
+                ):
+                    rows[item_id] = (json.loads(data), json.loads(part_times))
+
+            fresh = {}
+            stale = {}
+            for item_id in ids:
+                if item_id not in rows:
+                    stale[item_id] = set(parts)
+                    continue
+                item, part_times = rows[item_id]
+                expired = {p for p in parts if now - part_times.get(p, 0) > self._part_ttl(p)}
+                if expired:
+                    stale[item_id] = expired
+                else:
+                    fresh[item_id] = item
+
+            if fresh:
+                conn.executemany(
+                    "UPDATE responses SET last_access = ? WHERE resource = ? AND item_id = ?",
+                    [(now, resource, item_id) for item_id in fresh]
+                )
+            self.hits += len(fresh)
+            self.misses += len(stale)
+        return fresh, stale
+
+    def put_many(self, resource, items, parts):
+        """Сохраняет элементы ответа API, объединяя их с уже закэшированными частями.
+
+        Возвращает объединённые записи {id: item}.
+        """
+        parts = [p.strip() for p in parts.split(',')] if isinstance(parts, str) else list(parts)
+        items = [item for item in items if item.get('id')]
+        if not items:
+            return {}
+        now = time.time()
+        merged = {}
+        with self._lock, self._connect() as conn:
+            ids = [item['id'] for item in items]
+            existing = {}
+            for chunk in chunks(ids):
+                placeholders = ','.join('?' * len(chunk))
+                for item_id, data, part_times in conn.execute(
+                    f"SELECT item_id, data, part_times FROM responses WHERE resource = ? AND item_id IN ({placeholders})",
+                    [resource, *chunk]
+                ):
+                    existing[item_id] = (json.loads(data), json.loads(part_times))
+
+            rows = []
+            for item in items:
+                data, part_times = existing.get(item['id'], ({}, {}))
+                data.update(item)
+                for part in parts:
+                    part_times[part] = now
+                merged[item['id']] = data
+                rows.append((resource, item['id'], json.dumps(data, ensure_ascii=False), json.dumps(part_times), now))
+            conn.executemany(
+                "INSERT OR REPLACE INTO responses (resource, item_id, data, part_times, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict(conn)
+        return merged
+
+    def _evict(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': self.size(),
+        }
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+        self.hits = 0
+        self.misses = 0
+
+
+class SearchPageCache:
+    """Кэш страниц search.list (100 единиц квоты каждая) в том же файле SQLite.
+
+    Ключ — (query, type, order, maxResults, pageToken). Сохраняется весь ответ вместе с
+    nextPageToken, поэтому цепочку страниц можно повторно пройти без обращения к API,
+    пока страницы не старше max_age секунд. max_age действует только при чтении: кэш общий
+    для всех сессий, и страница, устаревшая для одной, может быть свежей для другой.
+    """
+
+    def __init__(self, path, max_age=DEFAULT_SEARCH_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_pages (
+                    query TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    search_order TEXT NOT NULL,
+                    max_results INTEGER NOT NULL,
+                    page_token TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (query, type, search_order, max_results, page_token)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_pages_fetched ON search_pages(fetched_at)")
+
+    def _connect(self):
+        return connect(self.path)
+
+    @staticmethod
+    def _key(query, search_type, order, max_results, page_token):
+        return (query.strip().lower(), search_type, order or '', int(max_results), page_token or '')
+
+    def get(self, query, search_type, order, max_results, page_token):
+        """Возвращает закэшированный ответ search.list или None, если страницы нет или она старше max_age"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, fetched_at FROM search_pages "
+                "WHERE query = ? AND type = ? AND search_order = ? AND max_results = ? AND page_token = ?",
+                self._key(query, search_type, order, max_results, page_token)
+            ).fetchone()
+        if row and time.time() - row[1] <= self.max_age:
+            self.hits += 1
+            return json.loads(row[0])
+        self.misses += 1
+        return None
+
+    def put(self, query, search_type, order, max_results, page_token, response):
+        if self.max_age <= 0:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_pages "
+                "(query, type, search_order, max_results, page_token, response, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*self._key(query, search_type, order, max_results, page_token), json.dumps(response, ensure_ascii=False), now)
+            )
+            # Страницы старше наибольшего допустимого окна свежести уже никому не понадобятся
+            conn.execute("DELETE FROM search_pages WHERE fetched_at < ?", (now - SEARCH_PAGE_RETENTION,))
+
+    def size(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM search_pages").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': self.size(),
+        }
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM search_pages")
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,89 @@
+import json
+import time
+import uuid
+
+from ytparse.db import connect
+
+ACTIVE = 'active'
+FINISHED = 'finished'
+ABANDONED = 'abandoned'
+
+
+def found_count(state):
+    """Сколько каналов обход уже нашёл за все запуски (у старых контрольных точек — по несохранённым)"""
+    return state.get('found_count', len(state['channels_data']))
+
+
+class CheckpointStore:
+    """Контрольные точки обхода запросов: позволяют продолжить поиск с последней страницы.
+
+    Состояние обхода (индекс запроса, pageToken следующей страницы, обработанные ID,
+    число найденных каналов и ещё не сохранённые каналы) записывается после каждой страницы поиска.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                    crawl_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_status ON crawl_checkpoints(status, updated_at)")
+
+    def _connect(self):
+        return connect(self.path)
+
+    def start(self, mode, queries, params, keep_active=()):
+        """Создаёт новую контрольную точку; прежние незавершённые обходы помечаются брошенными.
+
+        keep_active — crawl_id обходов, которые сейчас выполняются и должны остаться активными.
+        """
+        now = time.time()
+        state = {
+            'crawl_id': uuid.uuid4().hex,
+            'status': ACTIVE,
+            'mode': mode,
+            'queries': list(queries),
+            'params': dict(params),
+            'query_index': 0,
+            'page_token': None,
+            'page_count': 0,
+            'processed_ids': [],
+            'channels_data': [],
+            'found_count': 0,
+            'created_at': now,
+        }
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE crawl_checkpoints SET status = ? WHERE status = ? AND crawl_id NOT IN ({','.join('?' * len(keep_active))})",
+                (ABANDONED, ACTIVE, *keep_active)
+            )
+        self.save(state)
+        return state
+
+    def save(self, state):
+        state['updated_at'] = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO crawl_checkpoints (crawl_id, status, state, updated_at) VALUES (?, ?, ?, ?)",
+                (state['crawl_id'], state['status'], json.dumps(state, ensure_ascii=False), state['updated_at'])
+            )
+
+    def finish(self, state):
+        state['status'] = FINISHED
+        state['channels_data'] = []
+        self.save(state)
+
+    def latest(self, exclude=()):
+        """Последний незавершённый обход (кроме crawl_id из exclude) или None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT state FROM crawl_checkpoints WHERE status = ? AND crawl_id NOT IN ({','.join('?' * len(exclude))}) "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (ACTIVE, *exclude)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
@@ -0,0 +1,16 @@
+# Файлы данных (пути относительно рабочей директории, как и раньше в pythonParse.py)
+DB_FILE = "youtube_channels.db"
+DATA_FILE = "youtube_channels.json"  # Старый формат, импортируется в DB_FILE при первом запуске
+API_KEYS_FILE = "api_keys.json"
+API_USAGE_FILE = "api_usage.json"
+CACHE_FILE = "api_cache.db"
+
+# channels.list и videos.list принимают не более 50 ID за один запрос
+CHANNELS_BATCH_SIZE = 50
+
+# Режимы поиска (названия совпадают с выбором в интерфейсе)
+MODE_NAME = "По названию канала"
+MODE_TAGS = "По тегам канала"
+MODE_VIDEOS = "По видео"
+MODE_GRAPH = "По связанным каналам"
+SEARCH_MODES = [MODE_NAME, MODE_TAGS, MODE_VIDEOS, MODE_GRAPH]
@@ -0,0 +1,684 @@
+import heapq
+import re
+from collections import Counter
+
+from ytparse.checkpoint import found_count
+from ytparse.config import CHANNELS_BATCH_SIZE, MODE_GRAPH, MODE_NAME, MODE_TAGS, MODE_VIDEOS
+from ytparse.fetch import DEFAULT_WORKERS, ConcurrentFetcher, FetchCancelled, execute, youtube_client
+from ytparse.keys import SEARCH_COST, key_label
+from ytparse.profiles import CHANNEL_SECTIONS_FIELDS, SEARCH_FIELDS, items_fields
+from ytparse.ratelimit import QUOTA, AdaptiveRateLimiter, call_with_retry, classify_error
+from ytparse.scheduler import ADAPTIVE, QueryScheduler
+from ytparse.usage import next_reset
+
+# Итог обхода
+DONE = 'done'            # набрано целевое количество каналов
+EXHAUSTED = 'exhausted'  # пройдены все запросы
+STOPPED = 'stopped'      # остановлен пользователем
+QUOTA_EXHAUSTED = 'quota'
+FAILED = 'error'
+
+# Чем режимы отличаются друг от друга
+MODE_SPECS = {
+    MODE_NAME: {
+        'search_type': 'channel',
+        'order': None,
+        'log_label': "Поиск каналов",
+        'query_message': "🔍 Поиск каналов по названию",
+        'exhausted_message': "Обход всех запросов завершён. Больше каналов не найдено.",
+    },
+    MODE_TAGS: {
+        'search_type': 'channel',
+        'order': None,
+        'log_label': "Поиск по тегам",
+        'query_message': "🔍 Поиск каналов по тегам",
+        'exhausted_message': "Обход всех тегов завершён. Больше каналов не найдено.",
+    },
+    MODE_VIDEOS: {
+        'search_type': 'video',
+        'order': 'relevance',
+        'log_label': "Поиск видео",
+        'query_message': "🔍 Поиск каналов через видео",
+        'exhausted_message': "Обход всех тем видео завершён. Больше каналов не найдено.",
+    },
+    MODE_GRAPH: {
+        'search_type': None,
+        'order': None,
+        'log_label': "Связанные каналы",
+        'query_message': "🕸️ Обход связанных каналов",
+        'exhausted_message': "Связанные каналы в пределах заданной глубины закончились.",
+    },
+}
+
+# Обход связанных каналов: глубина по умолчанию, сколько каналов раскрывать за шаг,
+# сколько сохранённых каналов брать исходными, если они не указаны
+DEFAULT_GRAPH_DEPTH = 2
+GRAPH_EXPAND_BATCH = 10
+GRAPH_STORE_SEEDS = 50
+CHANNEL_ID_PATTERN = re.compile(r'UC[\w-]{22}')
+
+
+def parse_channel_ids(values):
+    """ID каналов из строк с ID или ссылками вида youtube.com/channel/UC..."""
+    return list(dict.fromkeys(cid for value in values for cid in CHANNEL_ID_PATTERN.findall(value)))
+
+
+def extract_contacts(description):
+    contacts = {'contacts': 'Не найдено'}
+    if description:
+        email = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', description)
+        links = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', description)
+        telegram = re.findall(r'@[\w]+', description)
+
+        contacts_list = []
+        if email:
+            contacts_list.append(f"Email: {email.group()}")
+        if links:
+            contacts_list.extend([f"Ссылка: {link}" for link in links])
+        if telegram:
+            contacts_list.extend([f"Telegram: {t}" for t in telegram])
+
+        if contacts_list:
+            contacts = {'contacts': '; '.join(contacts_list)}
+    return contacts
+
+
+def subscriber_count(item):
+    return int(item['statistics'].get('subscriberCount', 0))
+
+
+def parse_channel_item(item):
+    """Преобразует элемент ответа channels.list в запись канала"""
+    channel_id = item['id']
+    title = item['snippet']['title']
+    description = item['snippet'].get('description', '')
+    subscribers = subscriber_count(item)
+
+    # Получаем теги канала
+    channel_tags = []
+    if 'brandingSettings' in item and 'channel' in item['brandingSettings']:
+        keywords = item['brandingSettings']['channel'].get('keywords', '')
+        if keywords:
+            channel_tags = [tag.strip() for tag in keywords.split(',')]
+
+    contacts = extract_contacts(description)
+    return {
+        'title': title,
+        'channel_id': channel_id,  # Добавляем ID канала для точной проверки дубликатов
+        'channel_url': f"https://www.youtube.com/channel/{channel_id}",
+        'subscribers': subscribers,
+        'description': description,
+        'contacts': contacts.get('contacts', 'Не найдено'),
+        'viewed': False,
+        'tags': ', '.join(channel_tags) if channel_tags else 'Нет тегов'
+    }
+
+
+def format_video_tags(tags):
+    return ', '.join(tags[:10]) if tags else 'Нет тегов'  # Первые 10 тегов
+
+
+def channel_matches_tag(channel_details, search_tag):
+    """Проверяет, содержит ли канал искомый тег в ключевых словах или описании"""
+    channel_tags = [] if channel_details['tags'] == 'Нет тегов' else channel_details['tags'].split(', ')
+    search_tag_lower = search_tag.lower()
+    return any(search_tag_lower in tag.lower() for tag in channel_tags) or search_tag_lower in channel_details['description'].lower()
+
+
+class Crawler:
+    """Обход поисковых запросов YouTube во всех режимах без привязки к Streamlit.
+
+    Состояние обхода хранится в контрольной точке (CheckpointStore), найденные каналы
+    копятся в списке accepted. О ходе работы сообщается через on_event(kind, message, **data):
+    kind — 'query', 'accepted', 'page', 'api_request', 'retry', 'key_rotated', 'warning', 'error'.
+    on_event вызывается только из потока, запустившего run(); should_stop — ещё и из потоков
+    пула загрузки (в паузах между повторами), поэтому должен быть потокобезопасным.
+    Если задан query_stats (QueryStatsStore), после каждой страницы поиска в него пишется её отдача.
+    """
+
+    def __init__(self, api_key, channel_store, checkpoint_store, response_cache, search_cache, usage_tracker,
+                 key_pool=None, auto_rotate_keys=False, rate_limiter=None, fetch_workers=DEFAULT_WORKERS,
+                 accepted=None, stream_to_store=False, query_stats=None, on_event=None, should_stop=None,
+                 client_factory=youtube_client):
+        self.api_key = api_key
+        self.channel_store = channel_store
+        self.checkpoint_store = checkpoint_store
+        self.response_cache = response_cache
+        self.search_cache = search_cache
+        self.usage_tracker = usage_tracker
+        self.key_pool = key_pool
+        self.auto_rotate_keys = auto_rotate_keys and key_pool is not None
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.fetch_workers = fetch_workers
+        self.accepted = accepted if accepted is not None else []
+        self.stream_to_store = stream_to_store
+        self.query_stats = query_stats
+        self.on_event = on_event
+        self.should_stop = should_stop or (lambda: False)
+        self.client_factory = client_factory
+        self.youtube = None
+        self.checkpoint = None
+        # Каналы, найденные прошлыми запусками этого обхода (цель считается вместе с ними)
+        self.found_before = 0
+        self.rejected_skipped = 0
+        self.saved_count = 0
+        # Кэш данных каналов, уже полученных за этот запуск (общий для всех страниц и запросов)
+        self._resolved_channels = {}
+        self._fetcher = None
+        # Счётчики текущей страницы поиска (см. querystats.STAT_FIELDS)
+        self._page_stats = Counter()
+
+    def _emit(self, kind, message='', **data):
+        if self.on_event:
+            self.on_event(kind, message, **data)
+
+    def _log_request(self, request_type, query, cost):
+        self._page_stats['units'] += cost
+        self.usage_tracker.add(key_label(self.api_key), request_type, cost)
+        self._emit('api_request', f"{request_type}: '{query}' (стоимость: {cost})",
+                   request_type=request_type, query=query, cost=cost)
+
+    def _log_retry(self, kind, reason, attempt, delay):
+        self._emit('retry', f"Повтор #{attempt} через {delay:.1f} с: {kind} ({reason})",
+                   error_kind=kind, reason=reason, attempt=attempt, delay=delay)
+
+    # --- Ключи API ---
+
+    def _switch_key(self, next_key, reason):
+        self.api_key = next_key
+        self.youtube = self.client_factory(next_key)
+        self._emit('key_rotated',
+                   f"🔄 {reason}, продолжаем с ключом {key_label(next_key)} "
+                   f"(осталось {self.key_pool.remaining(next_key)} ед.)",
+                   key=key_label(next_key))
+
+    def rotate_api_key(self):
+        """После quotaExceeded помечает текущий ключ исчерпанным и переключается на ключ с наибольшим остатком квоты"""
+        self.key_pool.mark_exhausted(self.api_key)
+        next_key = self.key_pool.best_key()
+        if not next_key:
+            return False
+        self._switch_key(next_key, "Квота ключа исчерпана")
+        return True
+
+    def _ensure_search_quota(self):
+        """Переходит на другой ключ, если на текущем не хватит квоты на страницу поиска.
+
+        Текущий ключ исчерпанным не помечается: остаток пригодится для дешёвых запросов,
+        а если другого ключа нет, поиск идёт на текущем до настоящего quotaExceeded.
+        """
+        if self.key_pool.remaining(self.api_key) >= SEARCH_COST:
+            return
+        next_key = self.key_pool.best_key(min_remaining=SEARCH_COST, exclude={self.api_key})
+        if next_key:
+            self._switch_key(next_key, f"На ключе {key_label(self.api_key)} меньше {SEARCH_COST} ед.")
+
+    # --- Запросы к API ---
+
+    def search_page(self, spec, query, max_results, page_token):
+        """Возвращает страницу search.list; к API идёт только за пределами кэша"""
+        order = spec['order']
+        response = self.search_cache.get(query, spec['search_type'], order, max_results, page_token)
+        if response is not None:
+            self._page_stats['cached_pages'] += 1
+            self._log_request(f"{spec['log_label']} (из кэша)", query, 0)
+            return response
+        if self.auto_rotate_keys:
+            self._ensure_search_quota()
+        self._log_request(spec['log_label'], query, SEARCH_COST)
+        params = dict(part='snippet', q=query, type=spec['search_type'], maxResults=max_results, pageToken=page_token,
+                      fields=SEARCH_FIELDS)
+        if order:
+            params['order'] = order
+        response = call_with_retry(
+            lambda: execute(self.youtube.search().list(**params)),
+            self.rate_limiter,
+            should_stop=self.should_stop,
+            on_retry=self._log_retry
+        )
+        self.search_cache.put(query, spec['search_type'], order, max_results, page_token, response)
+        return response
+
+    def fetch_items_cached(self, resource, ids, parts, log_label):
+        """Возвращает {id: item} из кэша, запрашивая в API только отсутствующие или устаревшие части"""
+        items, stale = self.response_cache.get_many(resource, ids, parts)
+        # Группируем ID по набору устаревших частей, чтобы запрашивать только их
+        groups = {}
+        for item_id, stale_parts in stale.items():
+            group_parts = ','.join(p for p in parts.split(',') if p in stale_parts)
+            groups.setdefault(group_parts, []).append(item_id)
+        tasks = []
+        for group_parts, group_ids in groups.items():
+            for i in range(0, len(group_ids), CHANNELS_BATCH_SIZE):
+                chunk = group_ids[i:i + CHANNELS_BATCH_SIZE]
+                self._log_request(log_label, f"{len(chunk)} шт.: {chunk[0]}...", 1)
+                endpoint = self.youtube.channels() if resource == 'channels' else self.youtube.videos()
+                params = dict(part=group_parts, id=','.join(chunk), maxResults=len(chunk))
+                fields = items_fields(resource, group_parts)
+                if fields:
+                    params['fields'] = fields
+                tasks.append((group_parts, endpoint.list(**params)))
+        # Пачки выполняются параллельно, результаты разбираются здесь в исходном порядке.
+        # Повторы в потоках пула не логируются: on_event вызывается только из потока run()
+        responses = self._fetcher.map(
+            lambda task: call_with_retry(lambda: execute(task[1]), self.rate_limiter, should_stop=self.should_stop),
+            tasks,
+            should_stop=self.should_stop
+        )
+        for (group_parts, _), response in zip(tasks, responses):
+            items.update(self.response_cache.put_many(resource, response.get('items', []), group_parts))
+        return items
+
+    def get_channels_details_batch(self, channel_ids, screen=None):
+        """Получает данные каналов пачками до 50 ID за один запрос channels.list (через кэш).
+
+        Если задан screen(subscribers), сначала запрашивается только статистика, а snippet
+        и brandingSettings — лишь для прошедших проверку (их статистика берётся из первого
+        ответа). Не прошедшие возвращаются
+        неполными записями {'channel_id', 'subscribers', 'partial': True}.
+        """
+        unique_ids = [cid for cid in dict.fromkeys(channel_ids) if cid and cid not in self._resolved_channels]
+        parts = 'snippet,statistics,brandingSettings'
+        stats = {}
+        if unique_ids and screen:
+            stats = self.fetch_items_cached('channels', unique_ids, 'statistics', "Статистика каналов")
+            for cid in unique_ids:
+                if cid not in stats:
+                    self._resolved_channels[cid] = None
+                elif not screen(subscriber_count(stats[cid])):
+                    self._resolved_channels[cid] = {'channel_id': cid, 'subscribers': subscriber_count(stats[cid]), 'partial': True}
+            unique_ids = [cid for cid in unique_ids if cid not in self._resolved_channels]
+            # Статистика прошедших уже получена — повторно её не запрашиваем (даже при нулевом сроке кэша)
+            parts = 'snippet,brandingSettings'
+        if unique_ids:
+            items = self.fetch_items_cached('channels', unique_ids, parts, "Получение данных каналов")
+            for cid in unique_ids:
+                item = items.get(cid)
+                if item and cid in stats:
+                    item = {**item, 'statistics': stats[cid]['statistics']}
+                # Каналы, которых нет в ответе (удалены/скрыты), тоже запоминаем
+                self._resolved_channels[cid] = parse_channel_item(item) if item else None
+        # Возвращаем копии, чтобы доп. поля режима не попадали в общий кэш
+        return {cid: dict(self._resolved_channels[cid]) if self._resolved_channels.get(cid) else None
+                for cid in channel_ids if cid}
+
+    def get_featured_channels(self, channel_ids):
+        """Связанные каналы: {channel_id: [ID каналов из его разделов и избранного]}.
+
+        Разделы канала (channelSections.list, 1 единица на канал) запрашиваются параллельно
+        и кэшируются; избранные каналы из brandingSettings берутся из уже полученных данных канала.
+        """
+        sections, stale = self.response_cache.get_many('channelSections', channel_ids, 'contentDetails')
+        stale_ids = list(stale)
+        for cid in stale_ids:
+            self._log_request("Разделы канала", cid, 1)
+        responses = self._fetcher.map(
+            lambda cid: call_with_retry(
+                lambda: execute(self.youtube.channelSections().list(
+                    part='contentDetails', channelId=cid, fields=CHANNEL_SECTIONS_FIELDS
+                )),
+                self.rate_limiter,
+                should_stop=self.should_stop
+            ),
+            stale_ids,
+            should_stop=self.should_stop
+        )
+        sections.update(self.response_cache.put_many('channelSections', [
+            {'id': cid, 'contentDetails': {'channels': [
+                related for section in response.get('items', [])
+                for related in section.get('contentDetails', {}).get('channels', [])
+            ]}}
+            for cid, response in zip(stale_ids, responses)
+        ], 'contentDetails'))
+        branding, _ = self.response_cache.get_many('channels', channel_ids, 'brandingSettings')
+        featured = {}
+        for cid in channel_ids:
+            related = sections.get(cid, {}).get('contentDetails', {}).get('channels', [])
+            urls = branding.get(cid, {}).get('brandingSettings', {}).get('channel', {}).get('featuredChannelsUrls', [])
+            featured[cid] = [r for r in dict.fromkeys([*related, *urls]) if r != cid]
+        return featured
+
+    def get_videos_tags_batch(self, video_ids):
+        """Получает теги видео пачками до 50 ID за один запрос videos.list (через кэш).
+
+        Ошибки API (квота, неверный ключ, исчерпанные повторы) пробрасываются, чтобы страница
+        повторилась с другим ключом или обход остановился; заглушка ставится только видео
+        с испорченными данными в ответе.
+        """
+        unique_ids = list(dict.fromkeys(vid for vid in video_ids if vid))
+        if not unique_ids:
+            return {}
+        items = self.fetch_items_cached('videos', unique_ids, 'snippet', "Получение тегов видео")
+        tags = {}
+        for vid in unique_ids:
+            try:
+                tags[vid] = format_video_tags(items[vid]['snippet'].get('tags', [])) if vid in items else 'Нет тегов'
+            except (KeyError, TypeError, AttributeError):
+                tags[vid] = 'Ошибка получения тегов'
+        return tags
+
+    # --- Обход ---
+
+    def subscribers_in_range(self, subscribers):
+        params = self.checkpoint['params']
+        if subscribers < params['min_subscribers']:
+            return False
+        return params['max_subscribers'] <= 0 or subscribers <= params['max_subscribers']
+
+    def passes_subscriber_filter(self, channel_details):
+        return self.subscribers_in_range(channel_details['subscribers'])
+
+    def _subscriber_screen(self):
+        """Проверка подписчиков до запроса snippet/brandingSettings или None, если фильтр не задан"""
+        params = self.checkpoint['params']
+        if params['min_subscribers'] <= 0 and params['max_subscribers'] <= 0:
+            return None
+        return self.subscribers_in_range
+
+    def get_page_channels(self, response, processed_channels):
+        """Данные новых каналов со страницы поиска: {channel_id: запись}.
+
+        Уже сохранённые каналы проверяются по базе на каждой странице, поэтому их не берут
+        повторно и параллельные обходы. Ранее отклонённые фильтрами каналы берутся из индекса
+        отклонённых без запроса к API и проверяются по текущим фильтрам заново;
+        остальные запрашиваются одной пачкой: сначала статистика, затем остальные части
+        только для каналов, прошедших фильтр подписчиков.
+        """
+        page_ids = [
+            item['snippet']['channelId'] for item in response['items']
+            if item['snippet']['channelId'] not in processed_channels
+        ]
+        saved_ids = self.channel_store.existing_ids(page_ids)
+        new_ids = [cid for cid in page_ids if cid not in saved_ids]
+        # Повторы: каналы, уже найденные этим обходом или сохранённые раньше (в том числе дважды на странице)
+        self._page_stats['hits'] += len(response['items'])
+        self._page_stats['duplicates'] += len(response['items']) - len(set(new_ids))
+        screen = self._subscriber_screen()
+        rejected_before = self.channel_store.get_rejected(new_ids)
+        # Неполные записи, прошедшие текущий фильтр подписчиков, нужно дозапросить
+        rejected_before = {cid: record for cid, record in rejected_before.items()
+                           if not record.get('partial') or (screen and not screen(record['subscribers']))}
+        self.rejected_skipped += len(rejected_before)
+        details_by_id = self.get_channels_details_batch([cid for cid in new_ids if cid not in rejected_before], screen=screen)
+        details_by_id.update(rejected_before)
+        return details_by_id
+
+    def found_total(self):
+        return self.found_before + len(self.accepted)
+
+    def _target_reached(self, extra=0):
+        return self.found_total() + extra >= self.checkpoint['params']['target']
+
+    def _process_page(self, mode, query, response, processed_channels):
+        # Собираем новые ID со всей страницы и получаем их данные одной пачкой
+        details_by_id = self.get_page_channels(response, processed_channels)
+        page_accepted = []
+        page_rejected = []
+        page_ids = set()
+        for item in response['items']:
+            if self._target_reached(len(page_accepted)) or self.should_stop():
+                break
+            channel_id = item['snippet']['channelId']
+            if channel_id in processed_channels or channel_id in page_ids:
+                continue
+            # Нет в словаре — уже сохранён или недоступен в API
+            channel_details = details_by_id.get(channel_id)
+            if not channel_details:
+                continue
+            # Сначала подписчики: у неполных записей (только статистика) нет тегов и описания
+            if not self.passes_subscriber_filter(channel_details):
+                page_rejected.append(channel_details)
+                continue
+            if mode == MODE_TAGS and not channel_matches_tag(channel_details, query):
+                page_rejected.append(channel_details)
+                continue
+            if mode == MODE_VIDEOS:
+                # Добавляем информацию о видео
+                channel_details['found_via_video'] = item['snippet']['title'][:80] + "..."
+            page_accepted.append((item, channel_details))
+            page_ids.add(channel_id)
+        self.channel_store.add_rejected(page_rejected)
+        self._page_stats['rejected'] += len(page_rejected)
+        self._page_stats['accepted'] += len(page_accepted)
+
+        if mode == MODE_VIDEOS:
+            # Теги видео запрашиваем одной пачкой и только для каналов, прошедших фильтры
+            video_tags_by_id = self.get_videos_tags_batch([item['id']['videoId'] for item, _ in page_accepted])
+            for item, channel_details in page_accepted:
+                channel_details['video_tags'] = video_tags_by_id.get(item['id']['videoId'], 'Нет тегов')
+
+        # Страница принята целиком: при ошибке выше её каналы не считаются обработанными и повторятся
+        processed_channels.update(page_ids)
+        for item, channel_details in page_accepted:
+            self.accepted.append(channel_details)
+            message = f"✅ {channel_details['title']} ({channel_details['subscribers']} подписчиков)"
+            if mode == MODE_VIDEOS:
+                message += f" - через видео: {item['snippet']['title'][:50]}..."
+            self._emit('accepted', message, channel=channel_details)
+        if self.stream_to_store and page_accepted:
+            self.saved_count += self.channel_store.merge_many([ch for _, ch in page_accepted])[0]
+
+    def _record_page(self, mode, query):
+        """Записывает отдачу страницы в статистику запросов и начинает счёт следующей.
+
+        У обхода связанных каналов нет поисковых запросов («глубина N» — только подпись шага),
+        поэтому в статистику запросов он не пишется.
+        """
+        page_stats, self._page_stats = self._page_stats, Counter()
+        page_stats['pages'] = 1
+        if self.query_stats and mode != MODE_GRAPH:
+            self.query_stats.record(mode, query, page_stats)
+        self._emit('page', '', query=query, **page_stats)
+        return page_stats
+
+    def _save_checkpoint(self, query_index, page_token, page_count, processed_channels):
+        """Сохраняет позицию обхода и ещё не сохранённые каналы после каждой страницы"""
+        self.checkpoint.update({
+            'query_index': query_index,
+            'page_token': page_token,
+            'page_count': page_count,
+            'processed_ids': sorted(processed_channels),
+            'channels_data': [] if self.stream_to_store else self.accepted,
+            'found_count': self.found_total(),
+        })
+        self.checkpoint_store.save(self.checkpoint)
+
+    def progress(self):
+        """Поля прогресса для задачи: найдено, сохранено новых, пропущено по индексу отклонённых"""
+        return {'found': self.found_total(), 'saved': self.saved_count, 'rejected_skipped': self.rejected_skipped}
+
+    def run(self, checkpoint):
+        """Обходит запросы с позиции контрольной точки, пока не наберётся целевое число каналов.
+
+        Возвращает итог: DONE, EXHAUSTED, STOPPED, QUOTA_EXHAUSTED или FAILED.
+        """
+        self.checkpoint = checkpoint
+        if not self.stream_to_store and not self.accepted:
+            # Без потоковой записи несохранённые каналы прошлого запуска продолжают копиться в accepted
+            self.accepted.extend(checkpoint['channels_data'])
+        self.found_before = found_count(checkpoint) - (0 if self.stream_to_store else len(self.accepted))
+        if self.stream_to_store and checkpoint['channels_data']:
+            # Каналы, не сохранённые прошлым запуском (до потоковой записи), сохраняем сразу
+            self.saved_count += self.channel_store.merge_many(checkpoint['channels_data'])[0]
+            checkpoint['channels_data'] = []
+        self.youtube = self.client_factory(self.api_key)
+        self._fetcher = ConcurrentFetcher(self.fetch_workers)
+        try:
+            status = self._run_queries()
+        finally:
+            self._fetcher.shutdown()
+            self.usage_tracker.flush()
+        # Обход завершён (цель достигнута или запросы кончились) — продолжать нечего
+        if status in (DONE, EXHAUSTED):
+            self.checkpoint_store.finish(checkpoint)
+        return status
+
+    def _handle_page_error(self, error):
+        """Итог обхода после ошибки страницы или None, если страницу нужно повторить с другим ключом"""
+        if isinstance(error, FetchCancelled):
+            return STOPPED
+        error_kind, error_reason = classify_error(error)
+        if error_kind == QUOTA:
+            # Переключаемся на следующий ключ и повторяем ту же страницу
+            if self.auto_rotate_keys and self.rotate_api_key():
+                return None
+            if self.key_pool:
+                self.key_pool.mark_exhausted(self.api_key)
+            self._emit('error', f"❌ Квота API исчерпана! Обнуление квоты: "
+                                f"{next_reset().astimezone():%d.%m %H:%M} (местное время).",
+                       error_kind=error_kind, reason=error_reason)
+            return QUOTA_EXHAUSTED
+        self._emit('error', f"Ошибка API ({error_kind}: {error_reason}): {error}",
+                   error_kind=error_kind, reason=error_reason)
+        return FAILED
+
+    def _run_queries(self):
+        if self.checkpoint['mode'] == MODE_GRAPH:
+            return self._run_graph()
+        if self.checkpoint['params'].get('scheduler') == ADAPTIVE:
+            return self._run_adaptive()
+        mode = self.checkpoint['mode']
+        spec = MODE_SPECS[mode]
+        queries = self.checkpoint['queries']
+        max_results = self.checkpoint['params']['max_results']
+        current_query_index = self.checkpoint['query_index']
+        processed_channels = set(self.checkpoint['processed_ids'])
+
+        while not self._target_reached() and not self.should_stop():
+            query = queries[current_query_index].strip()
+            if not query:
+                current_query_index = (current_query_index + 1) % len(queries)
+                continue
+            self._emit('query', f"{spec['query_message']}: '{query}' (найдено: {self.found_total()})",
+                       query=query, found=self.found_total())
+
+            # Для нового запроса в контрольной точке (None, 0), при продолжении — последняя страница
+            next_page_token = self.checkpoint['page_token']
+            page_count = self.checkpoint['page_count']
+            while next_page_token is not None or page_count == 0:
+                if self._target_reached() or self.should_stop():
+                    break
+                try:
+                    response = self.search_page(spec, query, max_results, next_page_token)
+                    self._process_page(mode, query, response, processed_channels)
+                    self._record_page(mode, query)
+                    next_page_token = response.get('nextPageToken')
+                    page_count += 1
+                    self._save_checkpoint(current_query_index, next_page_token, page_count, processed_channels)
+                except Exception as e:
+                    status = self._handle_page_error(e)
+                    if status:
+                        return status
+
+            # Остановка посреди запроса — позиция остаётся на текущей странице
+            if self._target_reached() or self.should_stop():
+                break
+            current_query_index = (current_query_index + 1) % len(queries)
+            self._save_checkpoint(current_query_index, None, 0, processed_channels)
+            if current_query_index == 0:
+                self._emit('warning', spec['exhausted_message'])
+                return EXHAUSTED
+
+        return DONE if self._target_reached() else STOPPED
+
+    def _run_adaptive(self):
+        """Обход с чередованием запросов: каждая страница достаётся запросу с лучшей отдачей"""
+        mode = self.checkpoint['mode']
+        spec = MODE_SPECS[mode]
+        queries = self.checkpoint['queries']
+        max_results = self.checkpoint['params']['max_results']
+        processed_channels = set(self.checkpoint['processed_ids'])
+        scheduler = QueryScheduler(queries, self.checkpoint.get('scheduler_state'))
+        previous_index = None
+
+        while not self._target_reached() and not self.should_stop():
+            index = scheduler.next_query()
+            if index is None:
+                self._emit('warning', spec['exhausted_message'])
+                return EXHAUSTED
+            query = queries[index].strip()
+            if index != previous_index:
+                self._emit('query', f"{spec['query_message']}: '{query}' (найдено: {self.found_total()})",
+                           query=query, found=self.found_total())
+                previous_index = index
+            try:
+                response = self.search_page(spec, query, max_results, scheduler.page_token(index))
+                self._process_page(mode, query, response, processed_channels)
+                page_stats = self._record_page(mode, query)
+            except Exception as e:
+                status = self._handle_page_error(e)
+                if status:
+                    return status
+                continue
+            if scheduler.record(index, page_stats, response.get('nextPageToken')):
+                self._emit('warning', f"⏭️ Запрос '{query}' исключён: почти все результаты — уже известные каналы",
+                           query=query)
+            self.checkpoint['scheduler_state'] = scheduler.state()
+            self._save_checkpoint(index, scheduler.page_token(index), scheduler.arms[index]['pages'], processed_channels)
+
+        return DONE if self._target_reached() else STOPPED
+
+    def _run_graph(self):
+        """Обход в ширину от исходных каналов по связанным каналам вместо поиска (1 единица на канал).
+
+        Очередь — куча (глубина, -подписчики, ID): сначала ближние к исходным, среди них — крупные.
+        Раскрываются только принятые фильтрами каналы, не глубже max_depth.
+        """
+        mode = self.checkpoint['mode']
+        spec = MODE_SPECS[mode]
+        max_depth = self.checkpoint['params'].get('max_depth', DEFAULT_GRAPH_DEPTH)
+        processed_channels = set(self.checkpoint['processed_ids'])
+        frontier = self.checkpoint.get('frontier')
+        if frontier is None:
+            seeds = [[0, 0, cid] for cid in parse_channel_ids(self.checkpoint['queries'])]
+            if not seeds:
+                # Исходные каналы не указаны — начинаем с самых крупных сохранённых
+                seeds = [[0, -channel['subscribers'], channel['channel_id']] for channel in self.channel_store.query(
+                    order_by='subscribers', descending=True, limit=GRAPH_STORE_SEEDS
+                )]
+            frontier = seeds
+            heapq.heapify(frontier)
+        expanded = set(self.checkpoint.get('expanded', []))
+
+        while not self._target_reached() and not self.should_stop():
+            batch = []
+            while frontier and len(batch) < GRAPH_EXPAND_BATCH:
+                node = heapq.heappop(frontier)
+                if node[2] not in expanded:
+                    batch.append(node)
+            if not batch:
+                self._emit('warning', spec['exhausted_message'])
+                return EXHAUSTED
+            depth = batch[0][0]
+            label = f"глубина {depth}"
+            self._emit('query', f"{spec['query_message']}: {len(batch)} шт., {label} (найдено: {self.found_total()})",
+                       query=label, found=self.found_total())
+            try:
+                featured = self.get_featured_channels([cid for _, _, cid in batch])
+                # Связанные каналы разбираются как страница поиска: повторы, фильтры, сохранение
+                candidates = list(dict.fromkeys(
+                    related for _, _, cid in batch for related in featured[cid] if related not in expanded
+                ))
+                accepted_before = len(self.accepted)
+                self._process_page(mode, label, {'items': [{'snippet': {'channelId': cid}} for cid in candidates]},
+                                   processed_channels)
+                self._record_page(mode, label)
+            except Exception as e:
+                for node in batch:
+                    heapq.heappush(frontier, node)
+                status = self._handle_page_error(e)
+                if status:
+                    return status
+                continue
+            expanded.update(cid for _, _, cid in batch)
+            for node_depth, _, cid in batch:
+                if node_depth + 1 > max_depth:
+                    continue
+                for channel in self.accepted[accepted_before:]:
+                    if channel['channel_id'] in featured[cid]:
+                        heapq.heappush(frontier, [node_depth + 1, -channel['subscribers'], channel['channel_id']])
+            self.checkpoint['frontier'] = frontier
+            self.checkpoint['expanded'] = sorted(expanded)
+            self._save_checkpoint(0, None, len(expanded), processed_channels)
+
+        return DONE if self._target_reached() else STOPPED
@@ -0,0 +1,34 @@
+import sqlite3
+from contextlib import contextmanager
+
+# Ограничение SQLite на число параметров в одном запросе
+SQL_CHUNK = 500
+
+
+def chunks(items, size=SQL_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+@contextmanager
+def connect(path, immediate=False):
+    """Открывает соединение SQLite (WAL), фиксирует транзакцию при выходе и закрывает его.
+
+    immediate=True сразу берёт блокировку записи (BEGIN IMMEDIATE): чтение и запись внутри
+    транзакции видят одно состояние базы, даже если параллельно пишут другие сессии и процессы.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Встроенный lower() в SQLite понимает только латиницу
+        conn.create_function('casefold', 1, _casefold, deterministic=True)
+        with conn:
+            if immediate:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+    finally:
+        conn.close()
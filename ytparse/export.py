@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from ytparse.store import CHANNEL_FIELDS, OPTIONAL_FIELDS
+
+EXPORT_CHUNK = 1000  # каналов за одно чтение из базы
+
+# Формат: (название, MIME-тип, расширение файла)
+FORMATS = {
+    'csv': ("CSV", 'text/csv', 'csv'),
+    'jsonl': ("JSON Lines", 'application/x-ndjson', 'jsonl'),
+    'parquet': ("Parquet", 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available():
+    """Parquet пишется через pyarrow — необязательную зависимость"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt != 'parquet' or parquet_available()]
+
+
+def _write_csv_rows(chunks, f):
+    writer = csv.DictWriter(f, fieldnames=CHANNEL_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    count = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+
+def _write_csv(chunks, path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        return _write_csv_rows(chunks, f)
+
+
+def csv_text(records):
+    """CSV небольшого списка каналов в памяти (результаты одной задачи поиска)"""
+    buffer = io.StringIO(newline='')
+    _write_csv_rows([records], buffer)
+    return buffer.getvalue()
+
+
+def _write_jsonl(chunks, path):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in chunk)
+            count += len(chunk)
+    return count
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'subscribers': pa.int64(), 'viewed': pa.bool_()}
+    schema = pa.schema([pa.field(field, types.get(field, pa.string()), nullable=field in OPTIONAL_FIELDS)
+                        for field in CHANNEL_FIELDS])
+    count = 0
+    # Каждая пачка — отдельная группа строк, файл дописывается по мере чтения из базы
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            columns = {field: [record.get(field) for record in chunk] for field in CHANNEL_FIELDS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {'csv': _write_csv, 'jsonl': _write_jsonl, 'parquet': _write_parquet}
+
+
+def write_export(chunks, fmt, path):
+    """Записывает пачки каналов в файл формата fmt. Возвращает число записанных каналов"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    return WRITERS[fmt](chunks, path)
+
+
+def export_channels(channel_store, fmt, path=None, chunk_size=EXPORT_CHUNK, **filters):
+    """Выгружает каналы под фильтрами ChannelStore.query() потоково, пачками по chunk_size.
+
+    Без path файл создаётся во временной директории (удалить его — задача вызывающего).
+    Возвращает (путь к файлу, число каналов).
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix='youtube_channels_', suffix='.' + FORMATS[fmt][2])
+        os.close(fd)
+    try:
+        count = write_export(channel_store.iter_chunks(chunk_size, **filters), fmt, path)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return path, count
@@ -0,0 +1,96 @@
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httplib2
+
+DEFAULT_WORKERS = 4
+HTTP_TIMEOUT = 30  # секунд
+# Адрес API вместо googleapis.com, например локальный mockapi: http://127.0.0.1:8765/
+API_ENDPOINT_ENV = 'YTPARSE_API_ENDPOINT'
+
+_local = threading.local()
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class FetchCancelled(Exception):
+    """Загрузка прервана остановкой поиска"""
+
+
+def thread_http():
+    """httplib2.Http не потокобезопасен, поэтому у каждого потока свой экземпляр (с keep-alive)"""
+    if not hasattr(_local, 'http'):
+        _local.http = httplib2.Http(timeout=HTTP_TIMEOUT)
+    return _local.http
+
+
+def execute(request):
+    """Выполняет запрос googleapiclient через HTTP-соединение текущего потока"""
+    return request.execute(http=thread_http())
+
+
+def youtube_client(api_key):
+    """Клиент YouTube Data API для ключа, один на процесс.
+
+    Discovery-документ берётся из установленной библиотеки (без загрузки и разбора по сети
+    при каждом поиске). Клиент только собирает запросы, выполняются они через execute(),
+    поэтому его можно разделять между потоками. Адрес API можно подменить через YTPARSE_API_ENDPOINT.
+    """
+    endpoint = os.environ.get(API_ENDPOINT_ENV)
+    with _clients_lock:
+        client = _clients.get((api_key, endpoint))
+        if client is None:
+            # googleapiclient.discovery импортируется долго — только при первом поиске
+            from googleapiclient.discovery import build
+            client_options = {'api_endpoint': endpoint} if endpoint else None
+            client = build('youtube', 'v3', developerKey=api_key, static_discovery=True, cache_discovery=False,
+                           client_options=client_options)
+            _clients[(api_key, endpoint)] = client
+    return client
+
+
+class ConcurrentFetcher:
+    """Пул из max_workers потоков для параллельного выполнения запросов к API.
+
+    map() возвращает результаты в порядке входных элементов. Функции, выполняемые в пуле,
+    не должны обращаться к Streamlit — логирование и запись в кэш делаются в вызывающем потоке.
+    Единственная пачка выполняется прямо в вызывающем потоке, и map() не может прервать её
+    на середине, поэтому fn должна сама передавать should_stop в call_with_retry.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self._executor = None
+
+    def map(self, fn, items, should_stop=None):
+        items = list(items)
+        if self.max_workers == 1 or len(items) <= 1:
+            results = []
+            for item in items:
+                if should_stop and should_stop():
+                    raise FetchCancelled()
+                results.append(fn(item))
+            return results
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ytparse-fetch')
+        futures = [self._executor.submit(fn, item) for item in items]
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Первая же ошибка прерывает всю пачку
+                    future.result()
+                if pending and should_stop and should_stop():
+                    raise FetchCancelled()
+        finally:
+            for future in pending:
+                future.cancel()
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
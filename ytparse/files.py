@@ -0,0 +1,77 @@
+import copy
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# {путь: (подпись файла, разобранный JSON)} для read_json_cached
+_json_cache = {}
+
+
+@contextmanager
+def file_lock(path):
+    """Межпроцессная блокировка на время чтения-изменения-записи файла (через path + '.lock')"""
+    with open(path + '.lock', 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_json(path, default):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return default
+    return default
+
+
+def read_json_cached(path, default):
+    """read_json с кэшем по времени изменения и размеру файла.
+
+    Streamlit перезапускает скрипт на каждое действие, а файлы меняются редко.
+    Возвращается копия, её можно изменять.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return copy.deepcopy(default)
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _json_cache.get(path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, read_json(path, default))
+        _json_cache[path] = cached
+    return copy.deepcopy(cached[1])
+
+
+def atomic_write_json(path, data):
+    """Записывает JSON во временный файл рядом и атомарно подменяет им исходный"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,347 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from ytparse.crawler import DONE, EXHAUSTED, FAILED, STOPPED, Crawler
+from ytparse.db import connect
+from ytparse.keys import key_label
+from ytparse.refresh import SubscriberRefresher
+
+QUEUED = 'queued'
+RUNNING = 'running'
+INTERRUPTED = 'interrupted'  # процесс завершился, пока задача выполнялась
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Виды задач
+CRAWL = 'crawl'
+REFRESH = 'refresh'
+REFRESH_TITLE = "Обновление подписчиков"
+
+DEFAULT_MAX_PARALLEL = 2
+# Как часто записывать прогресс выполняющейся задачи в таблицу
+PROGRESS_SAVE_INTERVAL = 2.0
+# Задача другого процесса, не обновлявшаяся столько секунд, считается прерванной (даже если PID занят)
+STALE_AFTER = 600
+# Как часто задача в очереди отмечается в таблице, что её процесс жив
+QUEUED_HEARTBEAT_INTERVAL = 60.0
+
+
+def pid_alive(pid):
+    """Есть ли процесс с таким PID. На Windows os.kill(pid, 0) завершает процесс, поэтому там
+    проверки нет и устаревшие задачи определяются только по времени обновления"""
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+def job_alive(pid, updated_at, now=None):
+    """Жива ли активная задача по записи в таблице: процесс есть и задача недавно обновлялась"""
+    if pid == os.getpid():
+        return True
+    return (now or time.time()) - updated_at <= STALE_AFTER and pid_alive(pid)
+
+
+class JobStore:
+    """Таблица задач: состояние, прогресс и итог каждой задачи.
+
+    Задачи, оставшиеся «в работе» от завершившегося процесса (его PID не существует
+    или задача давно не обновлялась), при открытии помечаются прерванными — их обход
+    можно продолжить с контрольной точки. Задачи других живых процессов (например,
+    CLI рядом с интерфейсом) не трогаются.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    crawl_id TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    api_key TEXT NOT NULL DEFAULT '',
+                    found INTEGER NOT NULL DEFAULT 0,
+                    saved INTEGER NOT NULL DEFAULT 0,
+                    message TEXT NOT NULL DEFAULT '',
+                    pid INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON crawl_jobs(created_at)")
+            active = conn.execute(
+                f"SELECT job_id, pid, updated_at FROM crawl_jobs "
+                f"WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))}) AND pid != ?",
+                (*ACTIVE_STATUSES, os.getpid())
+            ).fetchall()
+            now = time.time()
+            stale = [(INTERRUPTED, job_id) for job_id, pid, updated_at in active if not job_alive(pid, updated_at, now)]
+            conn.executemany("UPDATE crawl_jobs SET status = ? WHERE job_id = ?", stale)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def create(self, job):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO crawl_jobs (job_id, crawl_id, mode, status, api_key, pid, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.checkpoint['crawl_id'] if job.checkpoint else '', job.title, job.status,
+                 key_label(job.api_key), os.getpid(), now, now)
+            )
+
+    def update(self, job):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE crawl_jobs SET status = ?, api_key = ?, found = ?, saved = ?, message = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (job.status, key_label(job.api_key), job.found, job.saved, job.message, time.time(), job.job_id)
+            )
+
+    def active_crawl_ids(self):
+        """crawl_id обходов, которые сейчас выполняются в любом живом процессе — в этой
+        или другой сессии интерфейса или в CLI. Их контрольные точки нельзя продолжать и бросать"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT crawl_id, pid, updated_at FROM crawl_jobs "
+                f"WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))}) AND crawl_id != ''",
+                ACTIVE_STATUSES
+            ).fetchall()
+        now = time.time()
+        return [crawl_id for crawl_id, pid, updated_at in rows if job_alive(pid, updated_at, now)]
+
+    def recent(self, limit=20):
+        """Последние задачи (в том числе других сессий и CLI) для истории запусков в интерфейсе"""
+        with self._connect() as conn:
+            conn.row_factory = lambda cursor, row: {col[0]: value for col, value in zip(cursor.description, row)}
+            return conn.execute(
+                "SELECT job_id, crawl_id, mode, status, api_key, found, saved, message, created_at, updated_at "
+                "FROM crawl_jobs ORDER BY created_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+
+class Job:
+    """Одна задача (обход или обновление подписчиков), выполняемая в собственном потоке.
+
+    Поток пишет только в поля задачи; интерфейс читает их при опросе.
+    """
+
+    def __init__(self, kind, title, api_key, target, checkpoint=None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.title = title
+        self.checkpoint = checkpoint
+        self.api_key = api_key
+        self.target = target
+        self.status = QUEUED
+        self.message = ''
+        self.found = 0
+        self.saved = 0
+        self.rejected_skipped = 0
+        self.accepted = []
+        self.events = deque(maxlen=200)
+        self.api_log = deque(maxlen=50)
+        self.cancel_event = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+        self.thread = None
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def cancel(self):
+        """Останавливает задачу: ожидающие запросы отменяются, выполняющийся — не дожидается повторов"""
+        self.cancel_event.set()
+
+    def drain_api_log(self):
+        """Забирает накопленные строки лога API-запросов"""
+        lines = []
+        while self.api_log:
+            lines.append(self.api_log.popleft())
+        return lines
+
+
+class JobRunner:
+    """Очередь задач: каждая задача — поток с собственным Crawler или SubscriberRefresher.
+
+    Одновременно выполняется не больше max_parallel задач, остальные ждут в очереди.
+    Общие объекты (хранилище, кэши, учёт квоты, ограничитель) потокобезопасны
+    и разделяются всеми задачами.
+    """
+
+    def __init__(self, job_store, channel_store, checkpoint_store, response_cache, search_cache, usage_tracker,
+                 key_pool, rate_limiter, max_parallel=DEFAULT_MAX_PARALLEL, query_stats=None):
+        self.job_store = job_store
+        self.channel_store = channel_store
+        self.checkpoint_store = checkpoint_store
+        self.response_cache = response_cache
+        self.search_cache = search_cache
+        self.usage_tracker = usage_tracker
+        self.key_pool = key_pool
+        self.rate_limiter = rate_limiter
+        self.max_parallel = max_parallel
+        self.query_stats = query_stats
+        self.jobs = {}
+        self._slots = threading.Condition()
+        self._running = 0
+
+    def _start(self, job, make_worker):
+        self.jobs[job.job_id] = job
+        self.job_store.create(job)
+        job.thread = threading.Thread(
+            target=self._run, args=(job, make_worker),
+            name=f"{job.kind}-{job.job_id[:8]}", daemon=True
+        )
+        job.thread.start()
+        return job
+
+    def submit(self, checkpoint, api_key, auto_rotate_keys=False, fetch_workers=None):
+        """Запускает обход по контрольной точке"""
+        job = Job(CRAWL, checkpoint['mode'], api_key, checkpoint['params']['target'], checkpoint=checkpoint)
+        worker_kwargs = {'fetch_workers': fetch_workers} if fetch_workers else {}
+
+        def make_worker(on_event):
+            return Crawler(
+                job.api_key,
+                self.channel_store,
+                self.checkpoint_store,
+                self.response_cache,
+                self.search_cache,
+                self.usage_tracker,
+                key_pool=self.key_pool,
+                auto_rotate_keys=auto_rotate_keys,
+                rate_limiter=self.rate_limiter,
+                accepted=job.accepted,
+                stream_to_store=True,
+                query_stats=self.query_stats,
+                on_event=on_event,
+                should_stop=job.cancel_event.is_set,
+                **worker_kwargs
+            )
+
+        return self._start(job, make_worker)
+
+    def submit_refresh(self, api_key, max_age, max_units=None, fetch_workers=None):
+        """Запускает обновление подписчиков у каналов, статистика которых старше max_age секунд"""
+        job = Job(REFRESH, REFRESH_TITLE, api_key, 0)
+        worker_kwargs = {'fetch_workers': fetch_workers} if fetch_workers else {}
+
+        def make_worker(on_event):
+            return SubscriberRefresher(
+                job.api_key,
+                self.channel_store,
+                self.usage_tracker,
+                rate_limiter=self.rate_limiter,
+                max_age=max_age,
+                max_units=max_units,
+                on_event=on_event,
+                should_stop=job.cancel_event.is_set,
+                **worker_kwargs
+            )
+
+        return self._start(job, make_worker)
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if job.active]
+
+    def busy_keys(self):
+        """Ключи, на которых сейчас идут обходы (для выбора ключа новой задаче)"""
+        return {job.api_key for job in self.active_jobs()}
+
+    def active_crawl_ids(self):
+        """Обходы этого запуска и все выполняющиеся обходы других сессий и процессов"""
+        own = [job.checkpoint['crawl_id'] for job in self.active_jobs() if job.checkpoint]
+        return list(dict.fromkeys([*own, *self.job_store.active_crawl_ids()]))
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def forget(self, job_id):
+        """Убирает завершённую задачу из списка (в таблице задач она остаётся)"""
+        job = self.jobs.get(job_id)
+        if job and not job.active:
+            del self.jobs[job_id]
+
+    def rejected_skipped(self):
+        return sum(job.rejected_skipped for job in self.jobs.values())
+
+    def _acquire_slot(self, job):
+        last_saved = time.monotonic()
+        with self._slots:
+            while self._running >= self.max_parallel:
+                if job.cancel_event.is_set():
+                    return False
+                self._slots.wait(0.5)
+                if time.monotonic() - last_saved >= QUEUED_HEARTBEAT_INTERVAL:
+                    last_saved = time.monotonic()
+                    self.job_store.update(job)
+            self._running += 1
+            return True
+
+    def _release_slot(self):
+        with self._slots:
+            self._running -= 1
+            self._slots.notify_all()
+
+    def _update_progress(self, job, worker):
+        for field, value in worker.progress().items():
+            setattr(job, field, value)
+
+    def _run(self, job, make_worker):
+        if not self._acquire_slot(job):
+            job.status = STOPPED
+            job.message = "Отменена до запуска"
+            job.finished_at = time.time()
+            self.job_store.update(job)
+            return
+        last_saved = 0.0
+
+        def on_event(kind, message, **data):
+            nonlocal last_saved
+            timestamp = time.strftime("%H:%M:%S")
+            if kind in ('api_request', 'retry'):
+                job.api_log.append(f"[{timestamp}] {message}")
+            elif kind != 'page':
+                if kind == 'key_rotated':
+                    # В событии только сокращённое имя ключа (оно попадает в журналы), сам ключ — у обходчика
+                    job.api_key = worker.api_key
+                job.events.append((kind, f"[{timestamp}] {message}"))
+                self._update_progress(job, worker)
+            # Любое событие обновляет запись задачи: по updated_at другие процессы видят, что она жива
+            if time.monotonic() - last_saved >= PROGRESS_SAVE_INTERVAL:
+                last_saved = time.monotonic()
+                self.job_store.update(job)
+
+        worker = make_worker(on_event)
+        job.status = RUNNING
+        job.started_at = time.time()
+        self.job_store.update(job)
+        try:
+            job.status = worker.run(job.checkpoint) if job.checkpoint else worker.run()
+        except Exception as e:
+            job.status = FAILED
+            job.events.append(('error', f"Общая ошибка: {e}"))
+        finally:
+            self._release_slot()
+            self._update_progress(job, worker)
+            job.message = next((message for kind, message in reversed(job.events) if kind == 'error'), '')
+            if job.status in (DONE, EXHAUSTED, STOPPED):
+                if job.kind == REFRESH:
+                    job.message = f"Проверено {job.found} из {job.target}, обновлено {job.saved}"
+                else:
+                    job.message = f"Найдено {job.found}, сохранено новых {job.saved}"
+            job.finished_at = time.time()
+            self.job_store.update(job)
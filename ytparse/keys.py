@@ -0,0 +1,62 @@
+from ytparse.usage import day_total, quota_day
+
+DAILY_QUOTA = 10000  # единиц в сутки на ключ по умолчанию
+SEARCH_COST = 100
+
+
+def key_label(key):
+    """Сокращённое имя ключа, под которым он хранится в api_usage.json"""
+    return key[:10] + "..." if key else "unknown"
+
+
+class KeyPool:
+    """Пул API-ключей из api_keys.json с учётом остатка дневной квоты.
+
+    Остаток считается по api_usage.json (через UsageAccumulator) за текущие квотные сутки.
+    Ключ, получивший quotaExceeded, считается исчерпанным до следующего обнуления.
+    """
+
+    def __init__(self, keys, usage_tracker, daily_quota=DAILY_QUOTA):
+        self.keys = [k for k in keys if k.get('key')]
+        self.usage_tracker = usage_tracker
+        self.daily_quota = daily_quota
+        self._exhausted = {}  # {ключ: квотные сутки, в которые он исчерпан}
+
+    def set_keys(self, keys):
+        self.keys = [k for k in keys if k.get('key')]
+
+    def is_exhausted(self, key):
+        return self._exhausted.get(key) == quota_day()
+
+    def mark_exhausted(self, key):
+        self._exhausted[key] = quota_day()
+
+    def used_today(self, key, usage_data=None):
+        usage_data = usage_data if usage_data is not None else self.usage_tracker.snapshot()
+        return day_total(usage_data.get(key_label(key), {}).get(quota_day(), 0))
+
+    def remaining(self, key, usage_data=None):
+        if self.is_exhausted(key):
+            return 0
+        return max(0, self.daily_quota - self.used_today(key, usage_data))
+
+    def capacity(self):
+        """Остаток квоты по каждому ключу: [{'name', 'key', 'used', 'remaining', 'exhausted'}]"""
+        usage_data = self.usage_tracker.snapshot()
+        return [{
+            'name': k.get('name', ''),
+            'key': k['key'],
+            'used': self.used_today(k['key'], usage_data),
+            'remaining': self.remaining(k['key'], usage_data),
+            'exhausted': self.is_exhausted(k['key']),
+        } for k in self.keys]
+
+    def total_remaining(self):
+        return sum(k['remaining'] for k in self.capacity())
+
+    def best_key(self, min_remaining=1, exclude=()):
+        """Ключ с наибольшим остатком квоты (не меньше min_remaining) или None"""
+        candidates = [k for k in self.capacity() if k['key'] not in exclude and k['remaining'] >= min_remaining]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda k: k['remaining'])['key']
@@ -0,0 +1,391 @@
+"""Локальная замена YouTube Data API для проверок и замеров без сети и расхода квоты.
+
+Сервер отвечает на search, channels, videos и channelSections так же, как API
+(включая fields=, ETag/304 и ошибки в формате Google), данные берутся из
+синтетического мира или из файла записанных ответов. Чтобы клиент ходил на него,
+задайте YTPARSE_API_ENDPOINT=http://127.0.0.1:<порт>/ (см. fetch.youtube_client).
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ytparse.keys import SEARCH_COST
+
+# Стоимость методов в единицах квоты
+ENDPOINT_COSTS = {'search': SEARCH_COST, 'channels': 1, 'videos': 1, 'channelSections': 1}
+
+TOPICS = [
+    'python', 'programming', 'coding', 'tech', 'gaming', 'music', 'cooking', 'travel', 'fitness', 'science',
+    'history', 'finance', 'design', 'photography', 'cars', 'movies', 'education', 'news', 'art', 'diy',
+]
+
+
+def parse_fields(spec):
+    """Разбирает маску fields= ('items(id,snippet/tags),nextPageToken') в дерево {имя: поддерево}"""
+
+    def parse(i):
+        tree = {}
+        while i < len(spec):
+            j = i
+            while j < len(spec) and spec[j] not in ',/()':
+                j += 1
+            node = tree.setdefault(spec[i:j], {})
+            while j < len(spec) and spec[j] == '/':
+                k = j + 1
+                while k < len(spec) and spec[k] not in ',/()':
+                    k += 1
+                node = node.setdefault(spec[j + 1:k], {})
+                j = k
+            if j < len(spec) and spec[j] == '(':
+                subtree, j = parse(j + 1)
+                node.update(subtree)
+                j += 1
+            if j < len(spec) and spec[j] == ')':
+                return tree, j
+            i = j + 1
+        return tree, i
+
+    return parse(0)[0]
+
+
+def apply_fields(value, tree):
+    """Оставляет в ответе только поля из дерева маски (пустое поддерево — значение целиком)"""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: apply_fields(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+def make_id(prefix, *parts, length=22):
+    digest = hashlib.sha1(':'.join(map(str, parts)).encode('utf-8')).digest()
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+    return prefix + ''.join(alphabet[b % 64] for b in (digest * 2)[:length])
+
+
+class SyntheticWorld:
+    """Воспроизводимый набор каналов и видео, выдача поиска и связи между каналами.
+
+    Выдача запроса — каналы его темы вперемешку с «популярными» каналами, которые
+    встречаются во многих запросах (доля overlap), поэтому у обходов есть повторы.
+    Подписчики распределены лог-равномерно от 100 до 10 млн.
+    """
+
+    def __init__(self, seed=0, channels=20000, results_per_query=300, overlap=0.3, popular=300):
+        self.seed = seed
+        self.results_per_query = results_per_query
+        self.overlap = overlap
+        rng = random.Random(seed)
+        self.channel_ids = [make_id('UC', seed, 'channel', i) for i in range(channels)]
+        self.index = {cid: i for i, cid in enumerate(self.channel_ids)}
+        self.subscribers = [int(10 ** rng.uniform(2, 7)) for _ in range(channels)]
+        self.topics = [rng.sample(TOPICS, 3) for _ in range(channels)]
+        self.popular = list(range(popular))
+        self.by_topic = {}
+        for i, topics in enumerate(self.topics):
+            for topic in topics:
+                self.by_topic.setdefault(topic, []).append(i)
+        self._search = {}
+        self._lock = threading.Lock()
+
+    def _results(self, query):
+        with self._lock:
+            if query not in self._search:
+                rng = random.Random(f"{self.seed}:{query}")
+                words = [w for w in query.lower().split() if w in self.by_topic]
+                pool = [i for w in words for i in self.by_topic[w]] or list(range(len(self.channel_ids)))
+                results = []
+                for _ in range(self.results_per_query):
+                    source = self.popular if rng.random() < self.overlap else pool
+                    results.append(rng.choice(source))
+                self._search[query] = results
+            return self._search[query]
+
+    def search_items(self, query, search_type):
+        items = []
+        for position, i in enumerate(self._results(query)):
+            channel_id = self.channel_ids[i]
+            snippet = {
+                'channelId': channel_id,
+                'title': f"{' '.join(self.topics[i])} #{position}",
+                'description': f"Видео о {self.topics[i][0]}",
+                'thumbnails': {size: {'url': f"https://i.ytimg.com/{channel_id}/{size}.jpg", 'width': 120, 'height': 90}
+                               for size in ('default', 'medium', 'high')},
+                'channelTitle': f"Channel {i}",
+                'publishedAt': '2024-01-01T00:00:00Z',
+            }
+            if search_type == 'video':
+                video_id = make_id('', self.seed, 'video', query, position, length=11)
+                items.append({'kind': 'youtube#searchResult', 'id': {'kind': 'youtube#video', 'videoId': video_id}, 'snippet': snippet})
+            else:
+                items.append({'kind': 'youtube#searchResult', 'id': {'kind': 'youtube#channel', 'channelId': channel_id}, 'snippet': snippet})
+        return items
+
+    def channel(self, channel_id):
+        i = self.index.get(channel_id)
+        if i is None:
+            return None
+        email = f" Связь: channel{i}@example.com" if i % 3 == 0 else ''
+        return {
+            'kind': 'youtube#channel',
+            'id': channel_id,
+            'snippet': {
+                'title': f"Channel {i}",
+                'description': f"Канал про {', '.join(self.topics[i])}.{email}",
+                'customUrl': f"@channel{i}",
+                'publishedAt': '2015-01-01T00:00:00Z',
+                'thumbnails': {size: {'url': f"https://yt3.ggpht.com/{channel_id}/{size}", 'width': 88, 'height': 88}
+                               for size in ('default', 'medium', 'high')},
+                'localized': {'title': f"Channel {i}", 'description': f"Канал про {', '.join(self.topics[i])}."},
+            },
+            'statistics': {
+                'viewCount': str(self.subscribers[i] * 40),
+                'subscriberCount': str(self.subscribers[i]),
+                'hiddenSubscriberCount': False,
+                'videoCount': str(50 + i % 500),
+            },
+            'brandingSettings': {
+                'channel': {'title': f"Channel {i}", 'keywords': ' '.join(self.topics[i]), 'unsubscribedTrailer': ''},
+                'image': {'bannerExternalUrl': f"https://yt3.ggpht.com/{channel_id}/banner"},
+            },
+        }
+
+    def video(self, video_id):
+        rng = random.Random(f"{self.seed}:video:{video_id}")
+        return {
+            'kind': 'youtube#video',
+            'id': video_id,
+            'snippet': {'title': f"Видео {video_id}", 'tags': rng.sample(TOPICS, 4), 'description': 'Описание видео'},
+        }
+
+    def sections(self, channel_id):
+        i = self.index.get(channel_id)
+        if i is None:
+            return []
+        rng = random.Random(f"{self.seed}:sections:{i}")
+        # Связанные каналы — в основном той же темы
+        same_topic = self.by_topic[self.topics[i][0]]
+        featured = [self.channel_ids[rng.choice(same_topic)] for _ in range(rng.randint(0, 8))]
+        if not featured:
+            return []
+        return [{
+            'kind': 'youtube#channelSection',
+            'id': make_id('', self.seed, 'section', i),
+            'snippet': {'type': 'multiplechannels', 'channelId': channel_id, 'position': 0},
+            'contentDetails': {'channels': list(dict.fromkeys(featured))},
+        }]
+
+    def export_fixtures(self, path, queries, search_type='channel'):
+        """Записывает выдачу запросов и все встреченные каналы в файл для RecordedWorld"""
+        fixtures = {'search': {}, 'channels': {}, 'videos': {}, 'channelSections': {}}
+        for query in queries:
+            items = self.search_items(query, search_type)
+            fixtures['search'][f"{search_type}|{query}"] = items
+            for item in items:
+                channel_id = item['snippet']['channelId']
+                fixtures['channels'][channel_id] = self.channel(channel_id)
+                fixtures['channelSections'][channel_id] = self.sections(channel_id)
+                if 'videoId' in item['id']:
+                    fixtures['videos'][item['id']['videoId']] = self.video(item['id']['videoId'])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(fixtures, f, ensure_ascii=False)
+
+
+class RecordedWorld:
+    """Ответы из файла: {'search': {'тип|запрос': [items]}, 'channels': {id: item},
+    'videos': {id: item}, 'channelSections': {id: [sections]}}"""
+
+    def __init__(self, path):
+        with open(path, encoding='utf-8') as f:
+            self.fixtures = json.load(f)
+
+    def search_items(self, query, search_type):
+        return self.fixtures.get('search', {}).get(f"{search_type}|{query}", [])
+
+    def channel(self, channel_id):
+        return self.fixtures.get('channels', {}).get(channel_id)
+
+    def video(self, video_id):
+        return self.fixtures.get('videos', {}).get(video_id)
+
+    def sections(self, channel_id):
+        return self.fixtures.get('channelSections', {}).get(channel_id, [])
+
+
+def error_body(code, reason, message):
+    return {'error': {'code': code, 'message': message, 'errors': [{'reason': reason, 'domain': 'youtube', 'message': message}]}}
+
+
+class MockApiServer:
+    """HTTP-сервер с ответами YouTube Data API v3 поверх SyntheticWorld или RecordedWorld.
+
+    latency/jitter — задержка ответа в секундах; error_rate — доля ответов 503 backendError,
+    rate_limit_rate — доля 403 rateLimitExceeded; quota — единиц на ключ, после чего
+    все запросы ключа получают 403 quotaExceeded. Счётчики вызовов, единиц и байт
+    доступны в stats() и обнуляются reset_stats().
+    """
+
+    def __init__(self, world=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, quota=None, seed=0):
+        self.world = world or SyntheticWorld(seed=seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quota = quota
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Заголовки и тело уходят одним пакетом, иначе keep-alive упирается в задержку ACK
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = Counter()
+            self.parts = Counter()
+            self.units = Counter()
+            self.bytes_sent = 0
+            self.injected_errors = 0
+            self.not_modified = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'parts': dict(self.parts),
+                'http_calls': sum(self.calls.values()),
+                'units': sum(self.units.values()),
+                'bytes': self.bytes_sent,
+                'injected_errors': self.injected_errors,
+                'not_modified': self.not_modified,
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-youtube-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    # --- Обработка запросов ---
+
+    def _send(self, handler, status, body=None, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=UTF-8')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+        with self._lock:
+            self.bytes_sent += len(data)
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        key = params.get('key', '')
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        if endpoint not in ENDPOINT_COSTS:
+            self._send(handler, 404, error_body(404, 'notFound', f"Unknown method {endpoint}"))
+            return
+
+        with self._lock:
+            self.calls[endpoint] += 1
+            # Запрошенные части ресурса: 'channels.statistics' и т.п.
+            self.parts.update(f"{endpoint}.{part}" for part in params.get('part', '').split(',') if part)
+            if self.quota is not None and self.units[key] + ENDPOINT_COSTS[endpoint] > self.quota:
+                error = (403, 'quotaExceeded', "The request cannot be completed because you have exceeded your quota.")
+            elif self._rng.random() < self.rate_limit_rate:
+                error = (403, 'rateLimitExceeded', "Rate limit exceeded.")
+            elif self._rng.random() < self.error_rate:
+                error = (503, 'backendError', "Backend Error")
+            else:
+                error = None
+                self.units[key] += ENDPOINT_COSTS[endpoint]
+            if error and error[1] != 'quotaExceeded':
+                self.injected_errors += 1
+        if error:
+            self._send(handler, error[0], error_body(*error))
+            return
+
+        body = getattr(self, f"_{endpoint}")(params)
+        if 'fields' in params:
+            body = apply_fields(body, parse_fields(params['fields']))
+        etag = hashlib.md5(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+        if 'fields' not in params or 'etag' in parse_fields(params['fields']):
+            body['etag'] = etag
+        if handler.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            self._send(handler, 304, headers={'ETag': etag})
+            return
+        self._send(handler, 200, body, headers={'ETag': etag})
+
+    def _search(self, params):
+        items = self.world.search_items(params.get('q', ''), params.get('type', 'video'))
+        max_results = min(50, int(params.get('maxResults', 5)))
+        start = int(params.get('pageToken') or 0)
+        body = {'kind': 'youtube#searchListResponse', 'items': items[start:start + max_results],
+                'pageInfo': {'totalResults': len(items), 'resultsPerPage': max_results}}
+        if start + max_results < len(items):
+            body['nextPageToken'] = str(start + max_results)
+        return body
+
+    def _list(self, params, lookup, kind):
+        parts = set(params.get('part', '').split(','))
+        items = []
+        for item_id in params.get('id', '').split(',')[:50]:
+            item = lookup(item_id)
+            if item:
+                items.append({name: value for name, value in item.items() if name in ('kind', 'id') or name in parts})
+        return {'kind': kind, 'items': items, 'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)}}
+
+    def _channels(self, params):
+        return self._list(params, self.world.channel, 'youtube#channelListResponse')
+
+    def _videos(self, params):
+        return self._list(params, self.world.video, 'youtube#videoListResponse')
+
+    def _channelSections(self, params):
+        return {'kind': 'youtube#channelSectionListResponse', 'items': self.world.sections(params.get('channelId', ''))}
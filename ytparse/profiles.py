@@ -0,0 +1,28 @@
+# Маски fields= для запросов к API: в ответ попадают только поля, которые читает парсер.
+# Без маски channels.list и search.list возвращают миниатюры, локализации и прочее,
+# что только увеличивает ответ, время разбора JSON и размер кэша.
+
+SEARCH_FIELDS = 'nextPageToken,items(id/videoId,snippet(channelId,title))'
+CHANNEL_SECTIONS_FIELDS = 'items/contentDetails/channels'
+REFRESH_FIELDS = 'etag,items(id,statistics(subscriberCount,hiddenSubscriberCount,viewCount,videoCount))'
+
+# Поля каждой части ответа по типу ресурса
+PART_FIELDS = {
+    'channels': {
+        'statistics': 'statistics(subscriberCount,hiddenSubscriberCount)',
+        'snippet': 'snippet(title,description)',
+        'brandingSettings': 'brandingSettings/channel(keywords,featuredChannelsUrls)',
+    },
+    'videos': {
+        'snippet': 'snippet/tags',
+    },
+}
+
+
+def items_fields(resource, parts):
+    """Маска для channels.list / videos.list с указанными частями или None, если часть не описана"""
+    part_fields = PART_FIELDS.get(resource, {})
+    parts = [p.strip() for p in parts.split(',')]
+    if not all(part in part_fields for part in parts):
+        return None
+    return f"items(id,{','.join(part_fields[part] for part in parts)})"
@@ -0,0 +1,143 @@
+import time
+
+from ytparse.config import MODE_GRAPH, MODE_VIDEOS
+from ytparse.crawler import GRAPH_EXPAND_BATCH
+from ytparse.db import chunks, connect
+from ytparse.keys import SEARCH_COST
+
+# Счётчики страницы поиска, которые копятся по паре (режим, запрос)
+STAT_FIELDS = ('pages', 'cached_pages', 'units', 'hits', 'duplicates', 'rejected', 'accepted')
+
+# Доля принятых каналов от результатов поиска, пока по режиму нет истории (осторожная оценка)
+DEFAULT_ACCEPT_RATE = 0.1
+
+
+def page_units(mode, screened=True):
+    """Единицы квоты на одну некэшированную страницу: поиск + пачки каналов (+ пачка видео).
+
+    С фильтром подписчиков (screened) каналы запрашиваются двумя пачками: сначала статистика,
+    затем остальные части для прошедших фильтр. Для связанных каналов «страница» — шаг обхода:
+    разделы каждого раскрываемого канала + пачки каналов. Статистики по ним не копится,
+    поэтому их оценка всегда по умолчанию.
+    """
+    channel_batches = 2 if screened else 1
+    if mode == MODE_GRAPH:
+        return GRAPH_EXPAND_BATCH + channel_batches
+    return SEARCH_COST + channel_batches + (1 if mode == MODE_VIDEOS else 0)
+
+
+def accepted_per_100_units(stats):
+    return round(100 * stats['accepted'] / stats['units'], 2) if stats['units'] else None
+
+
+class QueryStatsStore:
+    """Накопленная отдача поисковых запросов: страницы, потраченные единицы квоты,
+    результаты, повторы, отказы фильтров и принятые каналы по каждому (режим, запрос).
+
+    Счётчики пополняются после каждой страницы обхода и общие для всех запусков,
+    поэтому показывают, какие запросы окупают свои 100 единиц за страницу.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        columns = ',\n'.join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in STAT_FIELDS)
+        with self._connect() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS query_stats (
+                    mode TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    {columns},
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (mode, query)
+                )
+            """)
+
+    def _connect(self, immediate=False):
+        return connect(self.path, immediate=immediate)
+
+    def record(self, mode, query, page_stats):
+        """Прибавляет счётчики одной страницы к итогам запроса"""
+        values = [int(page_stats.get(field, 0)) for field in STAT_FIELDS]
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                f"INSERT INTO query_stats (mode, query, {', '.join(STAT_FIELDS)}, updated_at) "
+                f"VALUES (?, ?, {', '.join('?' * len(STAT_FIELDS))}, ?) "
+                f"ON CONFLICT(mode, query) DO UPDATE SET "
+                f"{', '.join(f'{field} = {field} + excluded.{field}' for field in STAT_FIELDS)}, "
+                f"updated_at = excluded.updated_at",
+                (mode, query, *values, time.time())
+            )
+
+    def _rows(self, sql, params=()):
+        with self._connect() as conn:
+            conn.row_factory = lambda cursor, row: {col[0]: value for col, value in zip(cursor.description, row)}
+            return conn.execute(sql, params).fetchall()
+
+    def for_queries(self, mode, queries):
+        """Итоги по указанным запросам режима: {query: {поле: значение}}"""
+        stats = {}
+        for chunk in chunks(list(dict.fromkeys(queries))):
+            for row in self._rows(
+                f"SELECT query, {', '.join(STAT_FIELDS)} FROM query_stats "
+                f"WHERE mode = ? AND query IN ({','.join('?' * len(chunk))})",
+                (mode, *chunk)
+            ):
+                stats[row.pop('query')] = row
+        return stats
+
+    def mode_totals(self, mode):
+        """Суммарные счётчики режима по всем запросам"""
+        return self._rows(
+            f"SELECT {', '.join(f'coalesce(SUM({field}), 0) AS {field}' for field in STAT_FIELDS)} "
+            f"FROM query_stats WHERE mode = ?",
+            (mode,)
+        )[0]
+
+    def table(self, mode=None):
+        """Все запросы (или запросы режима) с числом принятых каналов на 100 единиц, лучшие — первыми"""
+        where, params = ("WHERE mode = ?", (mode,)) if mode else ("", ())
+        rows = self._rows(f"SELECT mode, query, {', '.join(STAT_FIELDS)}, updated_at FROM query_stats {where}", params)
+        for row in rows:
+            row['per_100_units'] = accepted_per_100_units(row)
+        rows.sort(key=lambda row: (row['per_100_units'] is None, -(row['per_100_units'] or 0), -row['units']))
+        return rows
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM query_stats")
+
+
+def plan_crawl(query_stats, mode, queries, target, max_results, screened=True):
+    """Оценка квоты, нужной для набора target каналов, по прошлой отдаче запросов.
+
+    Отдача берётся по запускаемым запросам, при их отсутствии — по режиму в целом,
+    иначе — DEFAULT_ACCEPT_RATE от max_results. Страницы считаются некэшированными
+    (оценка сверху); screened — задан ли фильтр подписчиков (см. page_units).
+    Фильтры подписчиков прошлых запусков могли отличаться, поэтому это ориентир, а не гарантия.
+    Возвращает {'units', 'pages', 'per_100_units', 'basis'}, basis — 'queries', 'mode' или 'default'.
+    """
+    queries = [q.strip() for q in queries if q.strip()]
+    history = query_stats.for_queries(mode, queries)
+    totals = {field: sum(stats[field] for stats in history.values()) for field in STAT_FIELDS}
+    basis = 'queries'
+    if not totals['pages']:
+        totals = query_stats.mode_totals(mode)
+        basis = 'mode'
+    if totals['pages']:
+        accepted_per_page = totals['accepted'] / totals['pages']
+        uncached_pages = totals['pages'] - totals['cached_pages']
+        units_per_page = totals['units'] / uncached_pages if uncached_pages and totals['units'] else page_units(mode, screened)
+    else:
+        basis = 'default'
+        accepted_per_page = max_results * DEFAULT_ACCEPT_RATE
+        units_per_page = page_units(mode, screened)
+    if accepted_per_page <= 0:
+        # Запросы пока ничего не дали — оценить нельзя
+        return {'units': None, 'pages': None, 'per_100_units': 0.0, 'basis': basis}
+    pages = -(-target // accepted_per_page)
+    return {
+        'units': int(pages * units_per_page),
+        'pages': int(pages),
+        'per_100_units': round(100 * accepted_per_page / units_per_page, 2),
+        'basis': basis,
+    }
@@ -0,0 +1,136 @@
+import json
+import random
+import socket
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from ytparse.fetch import FetchCancelled
+
+# Классы ошибок API
+QUOTA = 'quota'            # квота ключа исчерпана — повтор бесполезен, нужен другой ключ
+RATE_LIMIT = 'rate_limit'  # API просит снизить частоту — повторяем и замедляемся
+TRANSIENT = 'transient'    # 5xx, таймауты, обрывы соединения — повторяем
+FATAL = 'fatal'            # неверный запрос, ключ и т.п. — повтор не поможет
+
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+TRANSIENT_REASONS = {'backendError', 'internalError'}
+RETRYABLE = {RATE_LIMIT, TRANSIENT}
+
+
+def http_error_reason(exc):
+    """Поле reason из тела ответа HttpError (например, 'quotaExceeded')"""
+    try:
+        error = json.loads(exc.content.decode('utf-8')).get('error', {})
+    except (ValueError, AttributeError):
+        return ''
+    errors = error.get('errors') or []
+    if errors:
+        return errors[0].get('reason', '')
+    return error.get('status', '')
+
+
+def classify_error(exc):
+    """Возвращает (класс ошибки, причина) для исключения, возникшего при запросе к API"""
+    if isinstance(exc, HttpError):
+        status = exc.resp.status
+        reason = http_error_reason(exc)
+        if reason in QUOTA_REASONS:
+            return QUOTA, reason
+        if reason in RATE_LIMIT_REASONS or status == 429:
+            return RATE_LIMIT, reason or str(status)
+        if reason in TRANSIENT_REASONS or status >= 500:
+            return TRANSIENT, reason or str(status)
+        return FATAL, reason or str(status)
+    if isinstance(exc, (socket.timeout, TimeoutError, ConnectionError)):
+        return TRANSIENT, type(exc).__name__
+    # httplib2 и ssl поднимают свои исключения при обрывах соединения
+    if type(exc).__module__.split('.')[0] in ('httplib2', 'ssl') or isinstance(exc, OSError):
+        return TRANSIENT, type(exc).__name__
+    if 'quotaExceeded' in str(exc):
+        return QUOTA, 'quotaExceeded'
+    return FATAL, type(exc).__name__
+
+
+class AdaptiveRateLimiter:
+    """Ограничитель частоты запросов по алгоритму token bucket.
+
+    Начинает с максимальной скорости и не вносит задержек, пока API не начнёт
+    отвечать rateLimitExceeded/429: тогда скорость уменьшается вдвое, а после
+    серии успешных ответов плавно возвращается к максимуму (AIMD).
+    """
+
+    def __init__(self, max_rate=20.0, min_rate=0.5, burst=10):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.burst = burst
+        self.throttle_events = 0
+        self.retries = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttle_events += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_retry(self):
+        # Один ограничитель делят потоки пула, поэтому счётчик меняется под блокировкой
+        with self._lock:
+            self.retries += 1
+
+
+def call_with_retry(fn, limiter, max_retries=5, base_delay=1.0, max_delay=32.0, should_stop=None, on_retry=None):
+    """Выполняет fn() с ограничением частоты и повторами при временных ошибках.
+
+    Задержка между попытками растёт экспоненциально с полным джиттером
+    (random(0, min(max_delay, base_delay * 2^attempt))). Ошибки квоты и
+    неисправимые ошибки пробрасываются сразу.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            kind, reason = classify_error(e)
+            if kind == RATE_LIMIT:
+                limiter.on_throttle()
+            if kind not in RETRYABLE or attempt >= max_retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            attempt += 1
+            limiter.on_retry()
+            if on_retry:
+                on_retry(kind, reason, attempt, delay)
+            # Ждём небольшими шагами, чтобы остановка поиска срабатывала сразу
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline:
+                if should_stop and should_stop():
+                    raise FetchCancelled() from e
+                time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+            continue
+        limiter.on_success()
+        return result
@@ -0,0 +1,167 @@
+import hashlib
+import time
+
+from googleapiclient.errors import HttpError
+
+from ytparse.config import CHANNELS_BATCH_SIZE
+from ytparse.crawler import DONE, FAILED, QUOTA_EXHAUSTED, STOPPED
+from ytparse.db import chunks, connect
+from ytparse.fetch import DEFAULT_WORKERS, ConcurrentFetcher, FetchCancelled, execute, youtube_client
+from ytparse.keys import key_label
+from ytparse.profiles import REFRESH_FIELDS
+from ytparse.ratelimit import QUOTA, AdaptiveRateLimiter, call_with_retry, classify_error
+from ytparse.usage import next_reset
+
+DEFAULT_MAX_AGE = 7 * 86400  # обновлять статистику каналов раз в неделю
+REFRESH_REQUEST_TYPE = "Обновление подписчиков"
+
+
+def batch_key(channel_ids):
+    return hashlib.sha1(','.join(channel_ids).encode('utf-8')).hexdigest()
+
+
+class EtagStore:
+    """ETag последних ответов channels.list по пачкам каналов (для условных запросов)"""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS refresh_etags (
+                    batch_key TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT etag FROM refresh_etags WHERE batch_key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, etag):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO refresh_etags (batch_key, etag, updated_at) VALUES (?, ?, ?)",
+                (key, etag, time.time())
+            )
+
+
+def _optional_int(value):
+    return int(value) if value is not None else None
+
+
+class SubscriberRefresher:
+    """Обновление статистики сохранённых каналов пачками по 50 ID (1 единица квоты за пачку).
+
+    Берутся только пачки с каналами старше max_age, поэтому повторный запуск продолжает
+    с того места, где остановился предыдущий. max_units ограничивает расход квоты за запуск.
+    Каждое обновление добавляет снимок в историю подписчиков.
+    """
+
+    def __init__(self, api_key, channel_store, usage_tracker, etag_store=None, rate_limiter=None,
+                 max_age=DEFAULT_MAX_AGE, max_units=None, fetch_workers=DEFAULT_WORKERS,
+                 on_event=None, should_stop=None, client_factory=youtube_client):
+        self.api_key = api_key
+        self.channel_store = channel_store
+        self.usage_tracker = usage_tracker
+        self.etag_store = etag_store or EtagStore(channel_store.path)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.max_age = max_age
+        self.max_units = max_units
+        self.fetch_workers = fetch_workers
+        self.on_event = on_event
+        self.should_stop = should_stop or (lambda: False)
+        self.client_factory = client_factory
+        self.youtube = None
+        self.total = 0
+        self.refreshed = 0
+        self.not_modified = 0
+        self.missing = 0
+
+    def _emit(self, kind, message='', **data):
+        if self.on_event:
+            self.on_event(kind, message, **data)
+
+    def progress(self):
+        """Поля прогресса для задачи: обработано, обновлено, всего к обновлению"""
+        return {'found': self.refreshed + self.not_modified + self.missing, 'saved': self.refreshed, 'target': self.total}
+
+    def _fetch_batch(self, channel_ids):
+        """Статистика пачки каналов или None, если с прошлого раза ничего не изменилось (304)"""
+        request = self.youtube.channels().list(
+            part='statistics', id=','.join(channel_ids), maxResults=len(channel_ids), fields=REFRESH_FIELDS
+        )
+        etag = self.etag_store.get(batch_key(channel_ids))
+        if etag:
+            request.headers['If-None-Match'] = etag
+
+        def fetch():
+            try:
+                return execute(request)
+            except HttpError as e:
+                if e.resp.status == 304:
+                    return None
+                raise
+
+        return call_with_retry(fetch, self.rate_limiter, should_stop=self.should_stop)
+
+    def _record(self, channel_ids, response):
+        if response is None:
+            self.channel_store.record_refresh({}, not_modified=channel_ids)
+            self.not_modified += len(channel_ids)
+            return
+        stats = {}
+        for item in response.get('items', []):
+            statistics = item.get('statistics', {})
+            stats[item['id']] = {
+                'subscribers': None if statistics.get('hiddenSubscriberCount') else _optional_int(statistics.get('subscriberCount')),
+                'views': _optional_int(statistics.get('viewCount')),
+                'videos': _optional_int(statistics.get('videoCount')),
+            }
+        missing = [cid for cid in channel_ids if cid not in stats]
+        self.channel_store.record_refresh(stats, missing=missing)
+        if response.get('etag'):
+            self.etag_store.put(batch_key(channel_ids), response['etag'])
+        self.refreshed += len(stats)
+        self.missing += len(missing)
+
+    def run(self):
+        """Обновляет устаревшие пачки. Возвращает DONE, STOPPED, QUOTA_EXHAUSTED или FAILED"""
+        batches = self.channel_store.refresh_batches(self.max_age, CHANNELS_BATCH_SIZE)
+        if self.max_units is not None:
+            batches = batches[:self.max_units]
+        self.total = sum(len(batch) for batch in batches)
+        self._emit('info', f"📈 Обновление статистики: {self.total} каналов, {len(batches)} запросов (≈{len(batches)} ед. квоты)")
+        self.youtube = self.client_factory(self.api_key)
+        fetcher = ConcurrentFetcher(self.fetch_workers)
+        try:
+            # Пачки идут группами: запросы группы параллельно, запись в базу — после каждой группы
+            for group in chunks(batches, self.fetch_workers * 4):
+                if self.should_stop():
+                    return STOPPED
+                for channel_ids in group:
+                    self.usage_tracker.add(key_label(self.api_key), REFRESH_REQUEST_TYPE, 1)
+                    self._emit('api_request', f"{REFRESH_REQUEST_TYPE}: {len(channel_ids)} шт.: {channel_ids[0]}... (стоимость: 1)")
+                responses = fetcher.map(self._fetch_batch, group, should_stop=self.should_stop)
+                for channel_ids, response in zip(group, responses):
+                    self._record(channel_ids, response)
+                self._emit('progress', f"Проверено {self.progress()['found']} из {self.total}, обновлено {self.refreshed} "
+                                       f"(без изменений: {self.not_modified}, недоступно: {self.missing})")
+        except FetchCancelled:
+            return STOPPED
+        except Exception as e:
+            error_kind, error_reason = classify_error(e)
+            if error_kind == QUOTA:
+                self._emit('error', f"❌ Квота API исчерпана! Обнуление квоты: {next_reset().astimezone():%d.%m %H:%M} (местное время). "
+                                    f"Оставшиеся каналы обновятся при следующем запуске.")
+                return QUOTA_EXHAUSTED
+            self._emit('error', f"Ошибка API ({error_kind}: {error_reason}): {e}")
+            return FAILED
+        finally:
+            fetcher.shutdown()
+            self.usage_tracker.flush()
+        return DONE
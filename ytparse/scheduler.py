@@ -0,0 +1,76 @@
+import math
+
+# Порядок обхода запросов
+ROUND_ROBIN = 'round_robin'  # запросы по очереди, каждый до последней страницы, один проход
+ADAPTIVE = 'adaptive'        # страницы достаются запросам с лучшей недавней отдачей
+
+# Вес свежей страницы в скользящей отдаче запроса
+RECENT_WEIGHT = 0.5
+# Насколько охотно пробовать запросы с малым числом страниц (UCB)
+EXPLORATION = 0.3
+# Запрос исключается, если после стольких страниц повторы составляют такую долю результатов
+MIN_PAGES_BEFORE_DROP = 2
+DROP_DUPLICATE_SHARE = 0.8
+
+
+class QueryScheduler:
+    """Выбор следующего запроса для страницы поиска (многорукий бандит, UCB1).
+
+    Отдача запроса — доля новых принятых каналов среди результатов страницы,
+    усреднённая со сдвигом к последним страницам. Сначала каждый запрос получает
+    по одной странице, затем страница достаётся запросу с наибольшей отдачей плюс
+    бонус за малое число попыток. Запросы, где почти одни повторы, исключаются рано.
+    Состояние (позиции и отдача по запросам) хранится в контрольной точке.
+    """
+
+    def __init__(self, queries, state=None):
+        self.queries = queries
+        self.arms = (state or {}).get('arms') or [
+            {'page_token': None, 'pages': 0, 'yield': 0.0, 'duplicates': 0.0, 'done': not query.strip(), 'dropped': False}
+            for query in queries
+        ]
+
+    def state(self):
+        return {'arms': self.arms}
+
+    def page_token(self, index):
+        return self.arms[index]['page_token']
+
+    def total_pages(self):
+        return sum(arm['pages'] for arm in self.arms)
+
+    def next_query(self):
+        """Индекс запроса для следующей страницы или None, если запросы кончились"""
+        candidates = [index for index, arm in enumerate(self.arms) if not arm['done']]
+        if not candidates:
+            return None
+        untried = [index for index in candidates if not self.arms[index]['pages']]
+        if untried:
+            return untried[0]
+        log_total = math.log(self.total_pages())
+
+        def score(index):
+            arm = self.arms[index]
+            return arm['yield'] + EXPLORATION * math.sqrt(log_total / arm['pages'])
+
+        return max(candidates, key=score)
+
+    def record(self, index, page_stats, next_page_token):
+        """Учитывает отдачу страницы. Возвращает True, если запрос исключён из-за повторов"""
+        arm = self.arms[index]
+        hits = page_stats.get('hits', 0)
+        page_yield = page_stats.get('accepted', 0) / hits if hits else 0.0
+        duplicate_share = page_stats.get('duplicates', 0) / hits if hits else 1.0
+        if arm['pages']:
+            arm['yield'] = RECENT_WEIGHT * page_yield + (1 - RECENT_WEIGHT) * arm['yield']
+            arm['duplicates'] = RECENT_WEIGHT * duplicate_share + (1 - RECENT_WEIGHT) * arm['duplicates']
+        else:
+            arm['yield'], arm['duplicates'] = page_yield, duplicate_share
+        arm['pages'] += 1
+        arm['page_token'] = next_page_token
+        if next_page_token is None:
+            arm['done'] = True
+        elif arm['pages'] >= MIN_PAGES_BEFORE_DROP and arm['duplicates'] >= DROP_DUPLICATE_SHARE:
+            arm['done'] = arm['dropped'] = True
+            return True
+        return False
@@ -0,0 +1,518 @@
+import json
+import os
+import re
+import sqlite3
+import time
+
+from ytparse.db import chunks, connect
+
+# Поля записи канала в том порядке, в котором они хранились в youtube_channels.json
+CHANNEL_FIELDS = [
+    'title', 'channel_id', 'channel_url', 'subscribers', 'description',
+    'contacts', 'viewed', 'tags', 'found_via_video', 'video_tags'
+]
+# Необязательные поля (есть только у каналов, найденных через видео)
+OPTIONAL_FIELDS = {'found_via_video', 'video_tags'}
+# Значения по умолчанию для пустых текстовых полей
+TEXT_DEFAULTS = {'contacts': 'Не найдено', 'tags': 'Нет тегов'}
+# Сколько доверять сохранённым данным отклонённого канала, прежде чем запросить его заново
+REJECTED_MAX_AGE = 30 * 86400
+# Поля, по которым можно сортировать выборку каналов ('rank' — релевантность полнотекстового поиска)
+SORT_FIELDS = ('added_at', 'subscribers', 'title', 'rank')
+# Полнотекстовый индекс (FTS5) и веса колонок при ранжировании bm25
+FTS_FIELDS = ('title', 'description', 'tags', 'video_tags', 'contacts')
+FTS_WEIGHTS = (10.0, 1.0, 4.0, 2.0, 1.0)
+
+
+def _channel_id_from_record(record):
+    channel_id = record.get('channel_id')
+    if not channel_id and record.get('channel_url'):
+        channel_id = record['channel_url'].rstrip('/').rsplit('/', 1)[-1]
+    return channel_id or None
+
+
+def _optional_text(value):
+    # После pandas отсутствующие значения приходят как NaN
+    return value if isinstance(value, str) else None
+
+
+def _field_value(field, value):
+    """Значение поля записи в том виде, в котором оно хранится в таблице channels"""
+    if field == 'viewed':
+        return 1 if value == True else 0  # noqa: E712 — bool из pandas бывает numpy.bool_
+    if field == 'subscribers':
+        return int(value or 0)
+    if field in OPTIONAL_FIELDS:
+        return _optional_text(value)
+    return _optional_text(value) or TEXT_DEFAULTS.get(field, '')
+
+
+def _record_to_row(record, now):
+    values = [_field_value(field, record.get(field)) for field in CHANNEL_FIELDS]
+    values[CHANNEL_FIELDS.index('channel_id')] = _channel_id_from_record(record)
+    return (*values, now, now)
+
+
+def fts_query(search):
+    """Поисковая строка пользователя → запрос FTS5: все слова, каждое как префикс"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', search))
+
+
+def _filter_sql(text='', tag='', viewed=None, min_subscribers=0, max_subscribers=0, has_contacts=False,
+                search='', fts=True):
+    """Условие WHERE и параметры для фильтров выборки каналов"""
+    conditions = []
+    params = []
+    if search and fts_query(search):
+        if fts:
+            conditions.append("rowid IN (SELECT rowid FROM channels_fts WHERE channels_fts MATCH ?)")
+            params.append(fts_query(search))
+        else:
+            # SQLite без FTS5: поиск подстрокой по тем же полям (полный просмотр таблицы)
+            haystack = " || ' ' || ".join(f"coalesce({field}, '')" for field in FTS_FIELDS)
+            for word in re.findall(r'\w+', search):
+                conditions.append(f"instr(casefold({haystack}), ?) > 0")
+                params.append(word.casefold())
+    if has_contacts:
+        conditions.append("contacts != ?")
+        params.append(TEXT_DEFAULTS['contacts'])
+    if text:
+        conditions.append("instr(casefold(title || ' ' || description || ' ' || contacts), ?) > 0")
+        params.append(text.casefold())
+    if tag:
+        conditions.append("instr(casefold(tags || ' ' || coalesce(video_tags, '')), ?) > 0")
+        params.append(tag.casefold())
+    if viewed is not None:
+        conditions.append("viewed = ?")
+        params.append(1 if viewed else 0)
+    if min_subscribers:
+        conditions.append("subscribers >= ?")
+        params.append(int(min_subscribers))
+    if max_subscribers:
+        conditions.append("subscribers <= ?")
+        params.append(int(max_subscribers))
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def _row_to_record(row):
+    record = {}
+    for field, value in zip(CHANNEL_FIELDS, row):
+        if field in OPTIONAL_FIELDS and value is None:
+            continue
+        record[field] = bool(value) if field == 'viewed' else value
+    return record
+
+
+class ChannelStore:
+    """Хранилище сохранённых каналов в SQLite.
+
+    Первичный ключ — channel_id, индексы по subscribers и viewed. Все изменения
+    выполняются построчно (upsert/delete), без перезаписи всей базы. Каждая операция —
+    отдельная транзакция, поэтому хранилище можно использовать из нескольких сессий,
+    потоков и процессов одновременно; дубликаты отсекаются только по channel_id.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS channels (
+                    title TEXT NOT NULL DEFAULT '',
+                    channel_id TEXT PRIMARY KEY,
+                    channel_url TEXT NOT NULL DEFAULT '',
+                    subscribers INTEGER NOT NULL DEFAULT 0,
+                    description TEXT NOT NULL DEFAULT '',
+                    contacts TEXT NOT NULL DEFAULT 'Не найдено',
+                    viewed INTEGER NOT NULL DEFAULT 0,
+                    tags TEXT NOT NULL DEFAULT 'Нет тегов',
+                    found_via_video TEXT,
+                    video_tags TEXT,
+                    added_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    refreshed_at REAL
+                )
+            """)
+            # Базы, созданные до обновления статистики, получают недостающую колонку
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(channels)")}
+            if 'refreshed_at' not in columns:
+                conn.execute("ALTER TABLE channels ADD COLUMN refreshed_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_channels_subscribers ON channels(subscribers)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_channels_viewed ON channels(viewed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_channels_added ON channels(added_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Каналы, которые уже получали из API, но отклонили фильтрами (подписчики/теги).
+            # Хранится полная запись, чтобы при смене фильтров проверить канал заново без запроса
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rejected_channels (
+                    channel_id TEXT PRIMARY KEY,
+                    subscribers INTEGER NOT NULL,
+                    record TEXT NOT NULL,
+                    rejected_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rejected_subscribers ON rejected_channels(subscribers)")
+            # История статистики каналов: строка на каждое обновление (для графиков роста)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS subscriber_history (
+                    channel_id TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    subscribers INTEGER,
+                    views INTEGER,
+                    videos INTEGER,
+                    PRIMARY KEY (channel_id, fetched_at)
+                )
+            """)
+            self.fts = self._create_fts(conn)
+
+    def _create_fts(self, conn):
+        """Полнотекстовый индекс по каналам, синхронизируемый триггерами. False, если FTS5 недоступен"""
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'channels_fts'").fetchone()
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS channels_fts USING fts5(
+                    {', '.join(FTS_FIELDS)},
+                    content='channels', content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return False
+        new_values = ', '.join(f"new.{field}" for field in FTS_FIELDS)
+        old_values = ', '.join(f"old.{field}" for field in FTS_FIELDS)
+        conn.executescript(f"""
+            CREATE TRIGGER IF NOT EXISTS channels_fts_insert AFTER INSERT ON channels BEGIN
+                INSERT INTO channels_fts (rowid, {', '.join(FTS_FIELDS)}) VALUES (new.rowid, {new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS channels_fts_delete AFTER DELETE ON channels BEGIN
+                INSERT INTO channels_fts (channels_fts, rowid, {', '.join(FTS_FIELDS)}) VALUES ('delete', old.rowid, {old_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS channels_fts_update AFTER UPDATE OF {', '.join(FTS_FIELDS)} ON channels BEGIN
+                INSERT INTO channels_fts (channels_fts, rowid, {', '.join(FTS_FIELDS)}) VALUES ('delete', old.rowid, {old_values});
+                INSERT INTO channels_fts (rowid, {', '.join(FTS_FIELDS)}) VALUES (new.rowid, {new_values});
+            END;
+        """)
+        if not exists:
+            # Индекс появился в уже заполненной базе — строим его по всем каналам
+            conn.execute("INSERT INTO channels_fts (channels_fts) VALUES ('rebuild')")
+        return True
+
+    def _connect(self, immediate=False):
+        return connect(self.path, immediate)
+
+    def import_json_once(self, json_path):
+        """Однократно переносит каналы из старого JSON-файла.
+
+        Возвращает число импортированных каналов или None, если импорт уже выполнялся.
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return None
+        imported = 0
+        if os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                channels = json.load(f)
+            imported = self.insert_new(channels)[0]
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)", (json_path,))
+        return imported
+
+    def _touch(self, conn):
+        # Отметка последнего изменения таблицы channels — по ней сбрасываются кэши выборок
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('channels_modified_at', ?)", (repr(time.time()),))
+
+    def modified_at(self):
+        """Время последнего изменения каналов (0.0, если база не менялась)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'channels_modified_at'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def all(self):
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {', '.join(CHANNEL_FIELDS)} FROM channels ORDER BY added_at, rowid").fetchall()
+        return [_row_to_record(row) for row in rows]
+
+    def query(self, text='', tag='', viewed=None, min_subscribers=0, max_subscribers=0, has_contacts=False,
+              search='', order_by='added_at', descending=False, limit=None, offset=0):
+        """Страница каналов с фильтрацией и сортировкой на стороне SQLite.
+
+        text ищется подстрокой в названии, описании и контактах, tag — в тегах канала и видео
+        (без учёта регистра); search — по полнотекстовому индексу (слова как префиксы);
+        max_subscribers=0 — без верхнего лимита. order_by='rank' сортирует по релевантности
+        search (без search — по дате добавления).
+        Число каналов под фильтром возвращает count() с теми же аргументами.
+        """
+        if order_by not in SORT_FIELDS:
+            raise ValueError(f"Неизвестное поле сортировки: {order_by}")
+        ranked = order_by == 'rank' and self.fts and bool(fts_query(search))
+        if order_by == 'rank' and not ranked:
+            order_by = 'added_at'
+        where, params = _filter_sql(text, tag, viewed, min_subscribers, max_subscribers, has_contacts,
+                                    '' if ranked else search, self.fts)
+        direction = "DESC" if descending else "ASC"
+        fields = ', '.join(f"channels.{field}" for field in CHANNEL_FIELDS)
+        if ranked:
+            # bm25 тем меньше, чем релевантнее канал; заголовок и теги весят больше описания
+            sql = (
+                f"WITH ranked AS (SELECT rowid AS ranked_rowid, bm25(channels_fts, {', '.join(map(str, FTS_WEIGHTS))}) AS score "
+                f"FROM channels_fts WHERE channels_fts MATCH ?) "
+                f"SELECT {fields} FROM channels JOIN ranked ON ranked_rowid = channels.rowid {where} "
+                f"ORDER BY score, channels.rowid LIMIT ? OFFSET ?"
+            )
+            params = [fts_query(search), *params]
+        else:
+            sql = (
+                f"SELECT {fields} FROM channels {where} "
+                f"ORDER BY {order_by} {direction}, rowid {direction} LIMIT ? OFFSET ?"
+            )
+        with self._connect() as conn:
+            rows = conn.execute(sql, [*params, -1 if limit is None else limit, offset]).fetchall()
+        return [_row_to_record(row) for row in rows]
+
+    def iter_chunks(self, chunk_size=1000, **filters):
+        """Все каналы под фильтрами query() пачками по chunk_size в порядке добавления.
+
+        Каждая пачка читается отдельным запросом от последнего rowid, поэтому в памяти
+        одновременно только одна пачка и база не блокируется на время выгрузки.
+        """
+        where, params = _filter_sql(**filters, fts=self.fts)
+        where = f"{where} AND rowid > ?" if where else "WHERE rowid > ?"
+        last_rowid = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT rowid, {', '.join(CHANNEL_FIELDS)} FROM channels {where} ORDER BY rowid LIMIT ?",
+                    [*params, last_rowid, chunk_size]
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [_row_to_record(row[1:]) for row in rows]
+
+    def existing_ids(self, channel_ids):
+        """Какие из channel_ids уже сохранены (по первичному ключу, без загрузки всех ID)"""
+        channel_ids = [cid for cid in dict.fromkeys(channel_ids) if cid]
+        existing = set()
+        with self._connect() as conn:
+            for chunk in chunks(channel_ids):
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT channel_id FROM channels WHERE channel_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+        return existing
+
+    def count(self, text='', tag='', viewed=None, min_subscribers=0, max_subscribers=0, has_contacts=False, search=''):
+        """Число каналов (под фильтрами query(), если они заданы)"""
+        where, params = _filter_sql(text, tag, viewed, min_subscribers, max_subscribers, has_contacts, search, self.fts)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM channels {where}", params).fetchone()[0]
+
+    def viewed_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM channels WHERE viewed = 1").fetchone()[0]
+
+    def insert_new(self, channels):
+        """Добавляет только каналы, которых ещё нет в базе. Возвращает (добавлено, дубликатов)"""
+        now = time.time()
+        rows = [_record_to_row(ch, now) for ch in channels]
+        valid_rows = [row for row in rows if row[1]]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO channels ({', '.join(CHANNEL_FIELDS)}, added_at, updated_at) "
+                f"VALUES ({', '.join('?' * (len(CHANNEL_FIELDS) + 2))})",
+                valid_rows
+            )
+            added = conn.total_changes - before
+            if added:
+                self._touch(conn)
+        return added, len(rows) - added
+
+    def merge_many(self, channels):
+        """Сохраняет найденные каналы с объединением по channel_id. Возвращает (добавлено, объединено).
+
+        Новые каналы добавляются целиком. У уже сохранённых обновляется число подписчиков
+        и заполняются только пустые поля — отметки и правки пользователей не затираются.
+        Всё выполняется одной транзакцией под блокировкой записи, поэтому параллельные
+        обходы и сессии не теряют строки друг друга.
+        """
+        now = time.time()
+        rows = list({row[1]: row for row in (_record_to_row(ch, now) for ch in channels) if row[1]}.values())
+        if not rows:
+            return 0, 0
+        fill_empty = ', '.join(
+            f"{field} = CASE WHEN channels.{field} IN ('', {default!r}) THEN excluded.{field} ELSE channels.{field} END"
+            for field, default in (('description', ''), ('contacts', TEXT_DEFAULTS['contacts']), ('tags', TEXT_DEFAULTS['tags']))
+        )
+        keep_optional = ', '.join(f"{field} = coalesce(channels.{field}, excluded.{field})" for field in sorted(OPTIONAL_FIELDS))
+        with self._connect(immediate=True) as conn:
+            existing = set()
+            for chunk in chunks([row[1] for row in rows]):
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT channel_id FROM channels WHERE channel_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+            conn.executemany(
+                f"INSERT INTO channels ({', '.join(CHANNEL_FIELDS)}, added_at, updated_at) "
+                f"VALUES ({', '.join('?' * (len(CHANNEL_FIELDS) + 2))}) "
+                f"ON CONFLICT(channel_id) DO UPDATE SET subscribers = excluded.subscribers, "
+                f"{fill_empty}, {keep_optional}, updated_at = excluded.updated_at",
+                rows
+            )
+            # Число подписчиков на момент находки — первая точка истории
+            subscribers_index = CHANNEL_FIELDS.index('subscribers')
+            conn.executemany(
+                "INSERT OR REPLACE INTO subscriber_history (channel_id, fetched_at, subscribers) VALUES (?, ?, ?)",
+                [(row[1], now, row[subscribers_index]) for row in rows]
+            )
+            self._touch(conn)
+        return len(rows) - len(existing), len(existing)
+
+    def update_fields(self, changes):
+        """Точечно обновляет изменённые поля: {channel_id: {поле: значение}}.
+
+        Все изменения записываются одной транзакцией. Возвращает число обновлённых каналов.
+        """
+        now = time.time()
+        updated = 0
+        with self._connect() as conn:
+            for channel_id, fields in changes.items():
+                fields = {field: value for field, value in fields.items() if field in CHANNEL_FIELDS and field != 'channel_id'}
+                if not channel_id or not fields:
+                    continue
+                cursor = conn.execute(
+                    f"UPDATE channels SET {', '.join(f'{field} = ?' for field in fields)}, updated_at = ? WHERE channel_id = ?",
+                    [*(_field_value(field, value) for field, value in fields.items()), now, channel_id]
+                )
+                updated += cursor.rowcount
+            if updated:
+                self._touch(conn)
+        return updated
+
+    def refresh_batches(self, max_age, batch_size=50):
+        """Пачки channel_id, статистику которых пора обновить (самые давние — первыми).
+
+        Каналы делятся на пачки по batch_size в порядке добавления, поэтому состав пачек
+        стабилен между запусками и для них работают ETag. Пачка попадает в выборку, если
+        хотя бы один её канал не обновлялся дольше max_age секунд.
+        """
+        cutoff = time.time() - max_age
+        with self._connect() as conn:
+            rows = conn.execute("SELECT channel_id, coalesce(refreshed_at, added_at) FROM channels ORDER BY rowid").fetchall()
+        batches = []
+        for chunk in chunks(rows, batch_size):
+            oldest = min(refreshed_at for _, refreshed_at in chunk)
+            if oldest < cutoff:
+                batches.append((oldest, [channel_id for channel_id, _ in chunk]))
+        batches.sort(key=lambda batch: batch[0])
+        return [ids for _, ids in batches]
+
+    def stale_count(self, max_age):
+        """Сколько каналов не обновлялось дольше max_age секунд"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM channels WHERE coalesce(refreshed_at, added_at) < ?",
+                (time.time() - max_age,)
+            ).fetchone()[0]
+
+    def record_refresh(self, stats, not_modified=(), missing=()):
+        """Записывает результат обновления одной транзакцией.
+
+        stats — {channel_id: {'subscribers', 'views', 'videos'}} из свежего ответа API
+        (None — значение скрыто владельцем), not_modified — каналы из пачек с ответом 304
+        (в историю копируется последний снимок), missing — каналы, которых API больше не вернул.
+        """
+        now = time.time()
+        with self._connect(immediate=True) as conn:
+            conn.executemany(
+                "UPDATE channels SET subscribers = coalesce(?, subscribers), refreshed_at = ? WHERE channel_id = ?",
+                [(values['subscribers'], now, channel_id) for channel_id, values in stats.items()]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO subscriber_history (channel_id, fetched_at, subscribers, views, videos) VALUES (?, ?, ?, ?, ?)",
+                [(channel_id, now, values['subscribers'], values['views'], values['videos']) for channel_id, values in stats.items()]
+            )
+            for chunk in chunks(list(not_modified)):
+                placeholders = ','.join('?' * len(chunk))
+                conn.execute(
+                    f"INSERT OR REPLACE INTO subscriber_history (channel_id, fetched_at, subscribers, views, videos) "
+                    f"SELECT channel_id, ?, subscribers, views, videos FROM subscriber_history h "
+                    f"WHERE channel_id IN ({placeholders}) "
+                    f"AND fetched_at = (SELECT MAX(fetched_at) FROM subscriber_history WHERE channel_id = h.channel_id)",
+                    [now, *chunk]
+                )
+            conn.executemany(
+                "UPDATE channels SET refreshed_at = ? WHERE channel_id = ?",
+                [(now, channel_id) for channel_id in [*not_modified, *missing]]
+            )
+            if stats:
+                self._touch(conn)
+
+    def subscriber_history(self, channel_ids):
+        """Снимки подписчиков по каналам: {channel_id: [(fetched_at, subscribers), ...]} по времени"""
+        history = {}
+        with self._connect() as conn:
+            for chunk in chunks([cid for cid in dict.fromkeys(channel_ids) if cid]):
+                for channel_id, fetched_at, subscribers in conn.execute(
+                    f"SELECT channel_id, fetched_at, subscribers FROM subscriber_history "
+                    f"WHERE channel_id IN ({','.join('?' * len(chunk))}) ORDER BY fetched_at",
+                    chunk
+                ):
+                    history.setdefault(channel_id, []).append((fetched_at, subscribers))
+        return history
+
+    def delete_many(self, channel_ids):
+        channel_ids = [cid for cid in channel_ids if cid]
+        deleted = 0
+        with self._connect() as conn:
+            for chunk in chunks(channel_ids):
+                cursor = conn.execute(
+                    f"DELETE FROM channels WHERE channel_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                deleted += cursor.rowcount
+                conn.execute(
+                    f"DELETE FROM subscriber_history WHERE channel_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+            if deleted:
+                self._touch(conn)
+        return deleted
+
+    def add_rejected(self, channels):
+        """Запоминает каналы, отклонённые фильтрами, вместе с полученными данными"""
+        now = time.time()
+        rows = [
+            (ch['channel_id'], int(ch.get('subscribers') or 0), json.dumps(ch, ensure_ascii=False), now)
+            for ch in channels if ch.get('channel_id')
+        ]
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rejected_channels (channel_id, subscribers, record, rejected_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def get_rejected(self, channel_ids, max_age=REJECTED_MAX_AGE):
+        """Ранее отклонённые каналы из списка, данные которых не старше max_age: {channel_id: запись}"""
+        channel_ids = [cid for cid in dict.fromkeys(channel_ids) if cid]
+        min_time = time.time() - max_age
+        rejected = {}
+        with self._connect() as conn:
+            for chunk in chunks(channel_ids):
+                for channel_id, record in conn.execute(
+                    f"SELECT channel_id, record FROM rejected_channels "
+                    f"WHERE rejected_at >= ? AND channel_id IN ({','.join('?' * len(chunk))})",
+                    [min_time, *chunk]
+                ):
+                    rejected[channel_id] = json.loads(record)
+        return rejected
+
+    def rejected_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM rejected_channels").fetchone()[0]
+
+    def clear_rejected(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM rejected_channels")
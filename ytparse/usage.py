@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ytparse.files import atomic_write_json, file_lock, read_json, read_json_cached
+
+DEFAULT_FLUSH_INTERVAL = 30  # секунд
+
+# Квота YouTube Data API обнуляется в полночь по тихоокеанскому времени,
+# поэтому расход учитывается по тихоокеанским суткам
+try:
+    PACIFIC = ZoneInfo("America/Los_Angeles")
+except ZoneInfoNotFoundError:  # Windows без пакета tzdata
+    PACIFIC = timezone(timedelta(hours=-8))
+
+
+def quota_day(now=None):
+    """Текущие квотные сутки (дата по тихоокеанскому времени) в формате YYYY-MM-DD"""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(PACIFIC).strftime("%Y-%m-%d")
+
+
+def next_reset(now=None):
+    """Момент следующего обнуления квоты (aware datetime)"""
+    now = (now or datetime.now(timezone.utc)).astimezone(PACIFIC)
+    tomorrow = (now + timedelta(days=1)).date()
+    return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=PACIFIC)
+
+
+def day_entry(value):
+    """Приводит запись за день к виду {'total': N, 'types': {тип запроса: N}}.
+
+    В старом формате api_usage.json за день хранилось одно число.
+    """
+    if isinstance(value, dict):
+        return {'total': value.get('total', 0), 'types': dict(value.get('types', {}))}
+    return {'total': value or 0, 'types': {}}
+
+
+def day_total(value):
+    return day_entry(value)['total']
+
+
+def merge_usage(usage_data, pending):
+    """Добавляет счётчики {ключ: {день: {тип: единицы}}} к данным api_usage.json"""
+    for key, days in pending.items():
+        key_days = usage_data.setdefault(key, {})
+        for day, types in days.items():
+            entry = day_entry(key_days.get(day))
+            for request_type, units in types.items():
+                entry['types'][request_type] = entry['types'].get(request_type, 0) + units
+                entry['total'] += units
+            key_days[day] = entry
+    return usage_data
+
+
+class UsageAccumulator:
+    """Учёт расхода квоты API в памяти процесса.
+
+    Запросы только увеличивают счётчики в памяти; в api_usage.json они сбрасываются
+    не чаще раза в flush_interval секунд и явно через flush() (при остановке/завершении поиска).
+    Запись идёт под файловой блокировкой с объединением с текущим содержимым файла
+    и атомарной подменой, поэтому параллельные сессии не затирают счётчики друг друга.
+    """
+
+    def __init__(self, path, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = {}  # {ключ: {день: {тип запроса: единицы}}}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, key, request_type, cost, day=None):
+        if cost <= 0:
+            return
+        day = day or quota_day()
+        with self._lock:
+            types = self._pending.setdefault(key, {}).setdefault(day, {})
+            types[request_type] = types.get(request_type, 0) + cost
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает накопленные счётчики в файл. Возвращает число сброшенных единиц"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            with file_lock(self.path):
+                usage_data = read_json(self.path, {})
+                merge_usage(usage_data, pending)
+                atomic_write_json(self.path, usage_data)
+        except Exception:
+            # Не теряем счётчики при ошибке записи — возвращаем их в буфер
+            with self._lock:
+                for key, days in pending.items():
+                    for day, types in days.items():
+                        target = self._pending.setdefault(key, {}).setdefault(day, {})
+                        for request_type, units in types.items():
+                            target[request_type] = target.get(request_type, 0) + units
+            raise
+        return sum(sum(types.values()) for days in pending.values() for types in days.values())
+
+    def snapshot(self):
+        """Данные файла вместе с ещё не сброшенными счётчиками (для отображения)"""
+        usage_data = read_json_cached(self.path, {})
+        with self._lock:
+            merge_usage(usage_data, self._pending)
+        return usage_data